@@ -0,0 +1,175 @@
+"""
+Admission Module for RecapFlow
+Local token estimates, calibrated against the provider's own counts, used
+to reject or chunk oversized requests, enforce per-client token budgets and
+report the expected cost of a call before it is made
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+from typing import Dict, Optional, Tuple
+
+from cachetools import LRUCache, TTLCache
+
+from config import get_settings
+from metrics import TOKEN_ESTIMATE_RATIO
+from ratelimit import TokenBucket
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.Admission")
+
+# Words and individual punctuation marks; subword tokenizers split along these and then some
+PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Texts shorter than this are counted directly, since hashing them costs about as much
+CACHE_MIN_CHARS = 1024
+# Texts longer than this are counted in a worker thread
+THREAD_CHARS = 256 * 1024
+# Uncached prompts longer than this are not counted again just to calibrate
+CALIBRATE_MAX_CHARS = 64 * 1024
+# Weight of each new observation in the calibrated ratio
+CALIBRATION_WEIGHT = 0.05
+
+# USD per million input/output tokens, for models without an AI_MODEL_PRICES entry
+DEFAULT_PRICES = "gemini-2.5-flash=0.30/2.50,gemini-2.5-flash-lite=0.10/0.40,gemini-2.5-pro=1.25/10.00"
+
+class RequestTooLarge(Exception):
+    """Raised when a request's estimated size exceeds what it may send upstream"""
+
+    def __init__(self, message: str, tokens: int):
+        super().__init__(message)
+        self.tokens = tokens
+
+class BudgetExceeded(Exception):
+    """Raised when a client has spent its token budget for the current window"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenEstimator:
+    """
+    Token counts without a round trip to the provider
+
+    Text is split into words and punctuation, and the piece count is scaled
+    by a tokens-per-piece ratio. Every call that reports its real input
+    token count moves the ratio towards the observed one, so estimates track
+    the provider's tokenizer for the text this service actually sees. Piece
+    counts of longer texts are cached by content hash, so a transcript
+    estimated at admission is not split again for the call or calibration.
+    """
+
+    def __init__(self):
+        """Read estimator configuration from settings"""
+        settings = get_settings()
+        self.ratio = settings.token_estimate_ratio
+        self.samples = 0
+        self._pieces = LRUCache(maxsize=settings.token_estimate_cache_size)
+        TOKEN_ESTIMATE_RATIO.set(self.ratio)
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def pieces(self, text: str) -> int:
+        """Words and punctuation marks in ``text``"""
+        if len(text) < CACHE_MIN_CHARS:
+            return sum(1 for _ in PIECE_PATTERN.finditer(text))
+        key = self._key(text)
+        count = self._pieces.get(key)
+        if count is None:
+            count = self._pieces[key] = sum(1 for _ in PIECE_PATTERN.finditer(text))
+        return count
+
+    def estimate(self, text: str) -> int:
+        """Estimated tokens in ``text``"""
+        return round(self.pieces(text) * self.ratio)
+
+    async def estimate_async(self, text: str) -> int:
+        """``estimate``, in a worker thread for long texts"""
+        if len(text) > THREAD_CHARS:
+            return round(await asyncio.to_thread(self.pieces, text) * self.ratio)
+        return self.estimate(text)
+
+    def calibrate(self, text: str, actual_tokens: int) -> None:
+        """Fold the provider's token count for ``text`` into the ratio"""
+        if not actual_tokens or (len(text) > CALIBRATE_MAX_CHARS and self._key(text) not in self._pieces):
+            return
+        pieces = self.pieces(text)
+        if not pieces:
+            return
+        observed = actual_tokens / pieces
+        # The first observations count fully, so a bad initial ratio is corrected quickly
+        weight = max(CALIBRATION_WEIGHT, 1 / (self.samples + 1))
+        self.ratio += (observed - self.ratio) * weight
+        self.samples += 1
+        TOKEN_ESTIMATE_RATIO.set(self.ratio)
+
+def load_prices() -> Dict[str, Tuple[float, float]]:
+    """
+    Per-model prices from ``AI_MODEL_PRICES``
+
+    Format: ``model=input/output,...`` in USD per million tokens; entries
+    override the built-in defaults for the same model.
+    """
+    prices = {}
+    for spec in (DEFAULT_PRICES, get_settings().ai_model_prices):
+        for entry in spec.split(","):
+            model, _, price = entry.partition("=")
+            if not price:
+                continue
+            try:
+                input_price, output_price = (float(value) for value in price.split("/"))
+            except ValueError:
+                logger.warning(f"⚠️ Ignoring malformed AI_MODEL_PRICES entry: {entry}")
+                continue
+            prices[model.strip()] = (input_price, output_price)
+    return prices
+
+def estimate_cost(prices: Dict[str, Tuple[float, float]], model: str, input_tokens: int, output_tokens: int) -> Optional[float]:
+    """Estimated USD cost of a call, or None for a model without a known price"""
+    price = prices.get(model)
+    if price is None:
+        return None
+    return round((input_tokens * price[0] + output_tokens * price[1]) / 1_000_000, 6)
+
+class ClientBudgets:
+    """
+    Estimated tokens each client may spend per time window
+
+    Each client has a token bucket of ``limit`` tokens refilled over
+    ``window`` seconds, so one client sending huge transcripts cannot use
+    up the Gemini quota every other client depends on. With a shared state
+    backend the buckets are shared by all workers.
+    """
+
+    def __init__(self, state=None):
+        """Read budget configuration from settings"""
+        settings = get_settings()
+        self.limit = settings.client_token_budget
+        self.window = settings.client_budget_window
+        self.rate = self.limit / self.window
+        self.state = state
+        # A bucket untouched for a whole window is full again, so it can be dropped
+        self._buckets = TTLCache(maxsize=settings.client_budget_max_clients, ttl=self.window)
+        logger.info(f"🎫 Client token budgets enabled - {self.limit:.0f} tokens per {self.window:.0f}s")
+
+    async def charge(self, client: str, tokens: int) -> float:
+        """
+        Take ``tokens`` from a client's budget
+
+        Returns:
+            float: 0 if the budget covered them, otherwise seconds until it will
+
+        Raises:
+            RequestTooLarge: If ``tokens`` exceeds the whole budget
+        """
+        if tokens > self.limit:
+            raise RequestTooLarge(f"Request needs about {tokens} tokens, more than the per-client budget of {self.limit:.0f}", tokens)
+        if self.state is not None:
+            return await asyncio.to_thread(self.state.take, f"client:{client}", self.rate, self.limit, tokens)
+        bucket = self._buckets.get(client) or TokenBucket(self.rate, self.limit)
+        # Stored again on every charge, so only buckets idle for a whole window expire
+        self._buckets[client] = bucket
+        return bucket.take(tokens)
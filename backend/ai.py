@@ -3,14 +3,101 @@ AI Module for RecapFlow
 Handles Gemini API calls for text summarization and processing
 """
 
-import os
-from typing import Optional
-from google import genai
-from dotenv import load_dotenv
+import asyncio
+import itertools
+import math
+import time
+from typing import AsyncIterator, List, Optional, Tuple
 import logging
 
-# Load environment variables
-load_dotenv()
+from admission import BudgetExceeded, ClientBudgets, RequestTooLarge, TokenEstimator, estimate_cost, load_prices
+from cache import SummaryCache
+from chunking import chunk_transcript
+from compaction import compact_transcript, configured_steps
+from config import get_settings
+from contexts import ContextManager
+from metrics import ADMISSIONS, AI_MODEL_FALLBACKS, AI_MODEL_TOKENS, AI_PROMPT_CHARS, AI_RESPONSE_CHARS, AI_RETRIES, AI_STAGE_LATENCY, record_error
+from model_router import ModelRouter
+from providers import ContextUnavailable, create_provider
+from shared_state import get_shared_state
+from singleflight import SingleFlight
+from ratelimit import (
+    CircuitBreaker, QuotaReserved, RateLimiter, UpstreamUnavailable,
+    backoff_delay, is_retryable, retry_after, status_code
+)
+
+# Instruction per rephrase style offered by the frontend; unknown styles fall back to professional
+REPHRASE_STYLES = {
+    "professional": "Transform the following content into a professional, business-appropriate format:",
+    "casual": "Rewrite the following content in a casual, friendly tone:",
+    "technical": "Restructure the following content with technical detail and precision:",
+    "executive": "Convert the following content into an executive briefing highlighting key decisions:"
+}
+
+# Context caching: the transcript is uploaded once as this text, and prompts refer to it
+CONTEXT_TEMPLATE = "Meeting transcript:\n{transcript}"
+CONTEXT_REFERENCE = "(the meeting transcript above)"
+
+# Live summarization: fold the newest part of a running meeting into the summary so far
+INCREMENTAL_PROMPT = """
+You are keeping the summary of a meeting that is still in progress up to date.
+Update the current summary with the new part of the transcript:
+- Keep everything in the current summary that is still accurate
+- Add new topics, decisions, action items (with owners and deadlines), dates and numbers
+- Revise points that the new part changes or resolves
+- Keep the same structure and bullet points, with no introductory phrases
+{instructions}
+Current summary:
+{summary}
+
+New part of the transcript:
+{segment}
+"""
+
+# Near-duplicate resubmission: patch an existing summary with a transcript diff
+REVISION_PROMPT = """
+The transcript of a meeting you already summarized has been revised.
+Update the summary to match the revised transcript:
+- Remove or correct points that only the removed lines support
+- Add topics, decisions, action items (with owners and deadlines), dates and numbers from the added lines
+- Leave everything else unchanged, with the same structure and no introductory phrases
+{instructions}
+Current summary:
+{summary}
+
+Removed lines:
+{removed}
+
+Added lines:
+{added}
+"""
+
+# Map step of chunked summarization: extract everything the final summary may need
+SEGMENT_PROMPT = """
+You are reading part {index} of {total} of a longer meeting transcript.
+Write concise notes for this part only:
+- Key topics discussed and decisions made
+- Action items with owners and deadlines
+- Important dates, numbers and commitments
+Do not add introductions or conclusions.
+
+Transcript part:
+{segment}
+"""
+
+# Admission estimates: tokens the summary instructions add to a prompt, and the
+# output assumed for a model before its first call has reported real usage
+SUMMARY_PROMPT_TOKENS = 80
+SEGMENT_PROMPT_TOKENS = 70
+DEFAULT_OUTPUT_TOKENS = 600
+
+# Failures that move a call on to the next model instead of failing it
+FALLBACK_ERRORS = (asyncio.TimeoutError, UpstreamUnavailable)
+
+# Map-reduce rounds after which partial notes are reduced as they are, even if still long
+MAX_REDUCE_ROUNDS = 4
+# Transcripts longer than this are compacted in a worker thread
+COMPACTION_THREAD_CHARS = 256 * 1024
 
 # Configure logger
 logger = logging.getLogger("RecapFlow.AI")
@@ -24,47 +111,456 @@ class RecapFlowAI:
         """Initialize Gemini AI with API key from environment"""
         logger.info("🤖 Initializing Gemini AI client...")
         try:
-            self.client = genai.Client()
-            self.model="gemini-2.5-flash"
-            logger.info(f"✅ Gemini AI client initialized with model: {self.model}")
+            self.settings = settings = get_settings()
+            self.provider = create_provider()
+            self.router = ModelRouter()
+            # Cache and quota buckets are shared across worker processes when configured
+            self.shared_state = get_shared_state()
+            self.max_concurrency = settings.gemini_max_concurrency
+            self.timeout = settings.gemini_timeout
+            # Caps the number of Gemini calls in flight on this worker
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            # Per-model quota limits shared by every caller, with retries and a breaker for 429/5xx
+            self._limiters = {}
+            self._breakers = {}
+            self.max_retries = settings.gemini_max_retries
+            self.retry_base_delay = settings.gemini_retry_base_delay
+            self.retry_max_delay = settings.gemini_retry_max_delay
+            # Share of each quota bucket background work (e.g. speculative rephrasing) leaves to users
+            self.background_reserve = settings.gemini_background_reserve
+            # Identical prompts already in flight share one upstream call
+            self._flights = SingleFlight()
+            # Transcripts above the threshold are summarized map-reduce style
+            self.chunk_tokens = settings.summary_chunk_tokens
+            self.chunk_fanout = settings.summary_chunk_fanout
+            self.chunk_threshold = settings.summary_chunk_threshold
+            # Transcripts are sized locally before any call; oversized ones are chunked or rejected
+            self.estimator = TokenEstimator()
+            self.prices = load_prices()
+            self.max_prompt_tokens = settings.admission_max_prompt_tokens
+            self.max_request_tokens = settings.admission_max_request_tokens
+            self.budgets = None
+            if settings.client_token_budget > 0:
+                self.budgets = ClientBudgets(self.shared_state)
+            # Filler, timestamps and repeated turns are stripped before prompts are built
+            self.compaction_enabled = settings.compaction_enabled
+            self.compaction_steps = configured_steps()
+            self.cache = None
+            if settings.summary_cache_enabled:
+                self.cache = SummaryCache(
+                    max_bytes=settings.summary_cache_max_bytes,
+                    ttl=settings.summary_cache_ttl,
+                    db_path=settings.summary_cache_db,
+                    shared=self.shared_state,
+                    disk_max_bytes=settings.summary_cache_db_max_bytes
+                )
+            # Long transcripts are uploaded once and reused by every later prompt about them
+            self.contexts = None
+            if settings.context_cache_enabled:
+                self.contexts = ContextManager(self.provider, self.estimator)
+            logger.info(f"✅ AI client initialized with provider: {self.provider.name} (max concurrency: {self.max_concurrency}, timeout: {self.timeout}s)")
         except Exception as e:
             logger.error(f"❌ Failed to initialize Gemini AI: {str(e)}")
             raise e
         
-    def invoke(self,prompt:str)->str:
-        """Returns the result for given prompt"""
-        logger.debug(f"🔄 Sending request to Gemini - prompt length: {len(prompt)} chars")
-        try:
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt
+    async def warm_up(self) -> None:
+        """Open the provider's connection so the first request skips DNS and TLS setup"""
+        start = time.perf_counter()
+        await asyncio.wait_for(self.provider.warm_up(self.router.fast_model), self.timeout)
+        logger.info(f"🔥 AI provider warmed up in {time.perf_counter() - start:.2f}s")
+
+    def _limiter(self, model: str) -> RateLimiter:
+        """Rate limiter for a model; Gemini quotas apply per model"""
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            limiter = self._limiters[model] = RateLimiter(
+                requests_per_minute=self.settings.gemini_rpm,
+                tokens_per_minute=self.settings.gemini_tpm,
+                state=self.shared_state,
+                name=f"gemini:{model}"
+            )
+        return limiter
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        """Circuit breaker for a model, so one degraded model fails over to another"""
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(
+                model,
+                threshold=self.settings.gemini_breaker_threshold,
+                cooldown=self.settings.gemini_breaker_cooldown
             )
-            logger.debug(f"✅ Received response from Gemini - response length: {len(response.text)} chars")
-            return response.text
+        return breaker
+
+    async def _admit(self, model: str, tokens: int, background: bool = False) -> None:
+        """
+        Pass the model's circuit breaker and wait for rate limiter capacity
+
+        ``tokens`` is the call's estimated prompt size; tokens read from a
+        cached context count against the quota too, so it includes them.
+        Background calls never wait: they only go ahead while a concurrency
+        slot is free and the model's quota keeps ``background_reserve`` of
+        its capacity for user requests, and raise ``QuotaReserved`` otherwise.
+        """
+        breaker = self._breaker(model)
+        breaker.before_call()
+        try:
+            if background:
+                if self._semaphore.locked() or not await self._limiter(model).acquire_spare(tokens, self.background_reserve):
+                    raise QuotaReserved(f"{model} quota is close to its limit, background call skipped")
+                waited = 0.0
+            else:
+                waited = await self._limiter(model).acquire(tokens)
+        except BaseException:
+            breaker.release()
+            raise
+        if waited > 1:
+            logger.debug("⏳ Waited %.1fs for %s rate limit", waited, model)
+
+    def _retry_delay(self, model: str, error: Exception, attempt: int, max_retries: int) -> float:
+        """
+        Record a failed upstream call and decide whether to retry it
+
+        Args:
+            model (str): Model that was called
+            error (Exception): The failure
+            attempt (int): Number of attempts made so far
+            max_retries (int): Retries allowed on this model
+
+        Returns:
+            float: Seconds to wait before the next attempt
+
+        Raises:
+            The original error if it is not retryable, or ``UpstreamUnavailable``
+            once a retryable error has used up ``max_retries``
+        """
+        breaker = self._breaker(model)
+        if not isinstance(error, asyncio.TimeoutError) and not is_retryable(error):
+            # The upstream answered; the request itself was bad
+            breaker.record_success()
+            raise error
+        self.router.record_failure(model)
+        breaker.record_failure()
+        if isinstance(error, asyncio.TimeoutError):
+            raise error
+        requested = retry_after(error)
+        if breaker.is_open():
+            raise UpstreamUnavailable(f"{model} unavailable, circuit open: {error}", retry_after=breaker.cooldown) from error
+        if attempt > max_retries:
+            raise UpstreamUnavailable(f"{model} unavailable after {attempt} attempts: {error}", retry_after=requested) from error
+        if requested is not None and status_code(error) == 429:
+            # Quota exhausted: hold back every caller of this model, not just this one
+            self._limiter(model).pause(requested)
+        delay = requested if requested is not None else backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay)
+        AI_RETRIES.inc(reason=str(status_code(error) or type(error).__name__))
+        logger.warning(f"⚠️ {model} call failed ({error}), retry {attempt}/{max_retries} in {delay:.1f}s")
+        return delay
+
+    @staticmethod
+    def with_context(context: Optional[str], prompt: str) -> str:
+        """The prompt as the model sees it: context content first, then the prompt"""
+        return f"{context}\n\n{prompt}" if context else prompt
+
+    def _context_info(self, context: Optional[str], model: str, info: Optional[dict]) -> None:
+        if info is not None and context is not None:
+            info["context_cached"] = self.contexts.holds(context, model)
+
+    async def invoke(self,prompt:str, info: Optional[dict] = None, task: str = "summary", context: Optional[str] = None, background: bool = False, tokens: Optional[int] = None)->str:
+        """
+        Returns the result for given prompt
+
+        The model router picks the model for ``task`` and prompt size. Calls
+        go through the provider's async client so the event loop stays free
+        while the model generates. At most ``max_concurrency`` calls run at
+        once and each call is bounded by ``timeout`` seconds; cancelling the
+        awaiting task (e.g. when the HTTP client disconnects) cancels the
+        upstream request. Responses are served from the summary cache when
+        the same prompt was already answered for the same routing choice.
+
+        Calls wait for the model's rate limiter, and 429/5xx and connection
+        errors are retried with jittered exponential backoff (or after the
+        delay Gemini asks for). If the preferred model times out, is rate
+        limited or has its circuit open, the call falls back to the next
+        model instead of retrying.
+
+        Concurrent calls with an identical prompt are coalesced: only the
+        first reaches the model and the rest await its result (or error).
+
+        Args:
+            prompt (str): Final prompt sent to the model
+            info (dict, optional): Filled with call metadata such as ``cached``,
+                ``coalesced`` and ``model``
+            task (str): ``summary``, ``segment`` or ``rephrase``; guides routing
+            context (str, optional): Content the prompt refers to, e.g. a
+                transcript. With context caching enabled it is uploaded to the
+                provider once and reused across calls; otherwise it is sent
+                ahead of the prompt. ``info["context_cached"]`` tells which.
+            background (bool): Speculative work that runs at lower priority
+                than user requests: it is not coalesced with them, never waits
+                for the rate limiter and is not retried
+            tokens (int, optional): Estimated tokens of the prompt and context,
+                when the caller already has them (e.g. from ``admit``), so
+                routing and rate limiting use the same figure it reported;
+                otherwise estimated with ``estimator``
+
+        Raises:
+            asyncio.TimeoutError: If no model answers within the timeout
+            UpstreamUnavailable: If every model stays rate limited or
+                unavailable, or their circuits are open
+            QuotaReserved: If a background call would use quota kept for users
+        """
+        if context is not None and self.contexts is None:
+            prompt, context = self.with_context(context, prompt), None
+        full_prompt = self.with_context(context, prompt)
+        if tokens is None:
+            tokens = await self.estimator.estimate_async(full_prompt)
+        models = self.router.candidates(task, tokens)
+        with AI_STAGE_LATENCY.time(stage="cache_lookup"):
+            key = SummaryCache.make_key(models[0], full_prompt)
+            cached = await self.cache.get(key) if self.cache is not None else None
+        if info is not None:
+            info["cached"] = cached is not None
+            info["model"] = models[0]
+        if cached is not None:
+            logger.debug("⚡ Serving model response from cache - key: %.12s", key)
+            return cached
+
+        if background:
+            # Not registered as a flight, so a user request never inherits a skipped call
+            (result, model), shared = await self._generate(prompt, key, models, tokens, context, background=True), False
+        else:
+            (result, model), shared = await self._flights.do(key, lambda: self._generate(prompt, key, models, tokens, context))
+        if info is not None:
+            info["coalesced"] = shared
+            info["model"] = model
+        self._context_info(context, model, info)
+        return result
+
+    async def _generate(self, prompt: str, key: str, models: List[str], tokens: int, context: Optional[str] = None, background: bool = False) -> Tuple[str, str]:
+        """Try each model in turn, caching the first response under ``key``"""
+        AI_PROMPT_CHARS.observe(len(prompt))
+        try:
+            for index, model in enumerate(models):
+                last = index == len(models) - 1
+                try:
+                    retries = self.max_retries if last and not background else 0
+                    text = await self._call_model(model, prompt, retries, tokens, context, background)
+                except QuotaReserved:
+                    # Background work is dropped rather than moved to another model
+                    raise
+                except FALLBACK_ERRORS as e:
+                    if last:
+                        raise
+                    AI_MODEL_FALLBACKS.inc(model=model, reason=type(e).__name__)
+                    logger.warning(f"↪️ {model} unavailable ({type(e).__name__}), falling back to {models[index + 1]}")
+                    continue
+                AI_RESPONSE_CHARS.observe(len(text))
+                if self.cache is not None and text:
+                    await self.cache.set(key, text)
+                return text, model
+        except QuotaReserved:
+            raise
+        except asyncio.TimeoutError as e:
+            record_error("ai", e)
+            logger.error(f"❌ Model call timed out after {self.timeout}s")
+            raise
         except Exception as e:
-            logger.error(f"❌ Gemini API call failed: {str(e)}")
+            record_error("ai", e)
+            logger.error(f"❌ Model call failed: {str(e)}")
             raise e
-        
-    async def summarize_transcript(self, transcript: str, custom_prompt: Optional[str] = None) -> str:
+
+    async def _open_context(self, model: str, prompt: str, context: Optional[str]) -> Tuple[str, Optional[str], Optional[str]]:
         """
-        Summarize a transcript using Gemini API
-        
-        Args:
-            transcript (str): The input transcript text
-            custom_prompt (str, optional): Custom instruction for summarization
-            
+        Resolve ``context`` for a call to ``model``
+
         Returns:
-            str: Summarized text
+            tuple: The prompt to send, the context content it refers to and the
+            provider's context name; without a usable context, the content is
+            folded into the prompt and both are None
         """
-        logger.info(f"📝 Starting transcript summarization - length: {len(transcript)} chars, custom_prompt: {bool(custom_prompt)}")
-        
+        if context is None:
+            return prompt, None, None
+        name = await self.contexts.acquire(context, model)
+        if name is None:
+            return self.with_context(context, prompt), None, None
+        return prompt, context, name
+
+    def _context_lost(self, model: str, prompt: str, context: str) -> str:
+        """Forget a context the provider no longer has; returns the full prompt to send instead"""
+        self._breaker(model).record_success()
+        self.contexts.invalidate(context, model)
+        logger.warning(f"⚠️ Context for {model} expired upstream, sending the full prompt")
+        return self.with_context(context, prompt)
+
+    def _record_usage(self, model: str, start_time: float, usage: dict, prompt: str, name: Optional[str]) -> None:
+        self.router.record(model, time.perf_counter() - start_time, usage.get("input_tokens"), usage.get("output_tokens"))
+        if usage.get("cached_tokens"):
+            AI_MODEL_TOKENS.inc(usage["cached_tokens"], model=model, kind="cached")
+        elif name is None and usage.get("input_tokens"):
+            # Only a fully sent prompt's token count can be compared with its text
+            self.estimator.calibrate(prompt, usage["input_tokens"])
+
+    async def _call_model(self, model: str, prompt: str, max_retries: int, tokens: int, context: Optional[str] = None, background: bool = False) -> str:
+        """Call one model with rate limiting and retries"""
+        logger.debug("🔄 Sending request to %s - prompt length: %d chars", model, len(prompt))
+        prompt, context, name = await self._open_context(model, prompt, context)
+        for attempt in itertools.count(1):
+            await self._admit(model, tokens, background)
+            start_time = time.perf_counter()
+            try:
+                async with self._semaphore:
+                    with AI_STAGE_LATENCY.time(stage="model_call"):
+                        response = await asyncio.wait_for(
+                            self.provider.generate(model, prompt, context=name),
+                            timeout=self.timeout
+                        )
+            except asyncio.CancelledError:
+                self._breaker(model).release()
+                raise
+            except ContextUnavailable:
+                prompt, context, name = self._context_lost(model, prompt, context), None, None
+                continue
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(model, e, attempt, max_retries))
+                continue
+            self._breaker(model).record_success()
+            self._record_usage(model, start_time, response, prompt, name)
+            logger.debug("✅ Received response from %s - response length: %d chars", model, len(response['text']))
+            return response["text"]
+
+    async def invoke_stream(self, prompt: str, info: Optional[dict] = None, task: str = "summary", context: Optional[str] = None, tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Yields the result for given prompt as the model generates it
+
+        Shares routing, the concurrency limit, rate limiters, circuit breakers
+        and cache with ``invoke``; a cache hit is yielded as a single chunk, as
+        is the result of an identical non-streaming call that is already in
+        flight. Retries and fallback to another model only happen before the
+        first chunk has been yielded. ``timeout`` bounds the wait for each
+        chunk rather than the whole generation.
+
+        Args:
+            prompt (str): Final prompt sent to the model
+            info (dict, optional): Filled with call metadata such as ``cached``,
+                ``coalesced`` and ``model``
+            task (str): ``summary``, ``segment`` or ``rephrase``; guides routing
+            context (str, optional): Content the prompt refers to, as for ``invoke``
+            tokens (int, optional): Estimated tokens of the prompt and context, as for ``invoke``
+
+        Raises:
+            asyncio.TimeoutError: If the model stalls for longer than the timeout
+            UpstreamUnavailable: If every model stays rate limited or
+                unavailable, or their circuits are open
+        """
+        if context is not None and self.contexts is None:
+            prompt, context = self.with_context(context, prompt), None
+        full_prompt = self.with_context(context, prompt)
+        if tokens is None:
+            tokens = await self.estimator.estimate_async(full_prompt)
+        models = self.router.candidates(task, tokens)
+        with AI_STAGE_LATENCY.time(stage="cache_lookup"):
+            key = SummaryCache.make_key(models[0], full_prompt)
+            cached = await self.cache.get(key) if self.cache is not None else None
+        if info is not None:
+            info["cached"] = cached is not None
+            info["model"] = models[0]
+        if cached is not None:
+            logger.debug("⚡ Serving model response from cache - key: %.12s", key)
+            yield cached
+            return
+        if key in self._flights:
+            # Streams are not shared chunk by chunk, but a pending full answer is
+            (result, model), _ = await self._flights.do(key, lambda: self._generate(prompt, key, models, tokens, context))
+            if info is not None:
+                info["coalesced"] = True
+                info["model"] = model
+            self._context_info(context, model, info)
+            yield result
+            return
+
+        AI_PROMPT_CHARS.observe(len(prompt))
+        parts = []
+        start_time = time.perf_counter()
         try:
+            for index, model in enumerate(models):
+                last = index == len(models) - 1
+                try:
+                    async for text in self._stream_model(model, prompt, self.max_retries if last else 0, parts, tokens, context):
+                        yield text
+                except FALLBACK_ERRORS as e:
+                    if last or parts:
+                        raise
+                    AI_MODEL_FALLBACKS.inc(model=model, reason=type(e).__name__)
+                    logger.warning(f"↪️ {model} unavailable ({type(e).__name__}), falling back to {models[index + 1]}")
+                    continue
+                if info is not None:
+                    info["model"] = model
+                self._context_info(context, model, info)
+                break
+        except asyncio.TimeoutError as e:
+            record_error("ai", e)
+            logger.error(f"❌ Model stream stalled for more than {self.timeout}s")
+            raise
+        except Exception as e:
+            record_error("ai", e)
+            logger.error(f"❌ Model streaming call failed: {str(e)}")
+            raise e
+
+        AI_STAGE_LATENCY.observe(time.perf_counter() - start_time, stage="model_call")
+        result = "".join(parts)
+        AI_RESPONSE_CHARS.observe(len(result))
+        logger.debug("✅ Model stream finished - response length: %d chars", len(result))
+        if self.cache is not None and result:
+            await self.cache.set(key, result)
+
+    async def _stream_model(self, model: str, prompt: str, max_retries: int, parts: List[str], tokens: int, context: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream from one model with rate limiting, appending yielded text to ``parts``"""
+        logger.debug("🔄 Streaming request to %s - prompt length: %d chars", model, len(prompt))
+        prompt, context, name = await self._open_context(model, prompt, context)
+        for attempt in itertools.count(1):
+            await self._admit(model, tokens)
+            start_time = time.perf_counter()
+            usage = {}
+            try:
+                async with self._semaphore:
+                    stream = self.provider.stream(model, prompt, usage, context=name)
+                    try:
+                        while True:
+                            try:
+                                text = await asyncio.wait_for(stream.__anext__(), timeout=self.timeout)
+                            except StopAsyncIteration:
+                                break
+                            parts.append(text)
+                            yield text
+                    finally:
+                        await stream.aclose()
+            except (asyncio.CancelledError, GeneratorExit):
+                self._breaker(model).release()
+                raise
+            except ContextUnavailable:
+                if parts:
+                    raise
+                prompt, context, name = self._context_lost(model, prompt, context), None, None
+                continue
+            except Exception as e:
+                # Text already sent to the caller cannot be taken back, so no retry
+                delay = self._retry_delay(model, e, max_retries + 1 if parts else attempt, max_retries)
+                await asyncio.sleep(delay)
+                continue
+            self._breaker(model).record_success()
+            self._record_usage(model, start_time, usage, prompt, name)
+            return
+
+    def build_summary_prompt(self, transcript: str, custom_prompt: Optional[str] = None) -> str:
+        """Build the single-pass summarization prompt for a transcript"""
+        with AI_STAGE_LATENCY.time(stage="prompt_build"):
             # Default prompt if none provided
             if custom_prompt:
-                prompt = f"{custom_prompt}\n\nContent to analyze:\n{transcript}"
                 logger.debug("Using custom prompt for summarization")
-            else:
-                prompt = f"""
+                return f"{custom_prompt}\n\nContent to analyze:\n{transcript}"
+
+            logger.debug("Using default prompt for summarization")
+            return f"""
 Create a clear, professional summary with the following structure:
 - Use bullet points for key topics and decisions
 - Highlight action items with specific owners and deadlines
@@ -75,45 +571,460 @@ Create a clear, professional summary with the following structure:
 Content:
 {transcript}
 """
-                logger.debug("Using default prompt for summarization")
+
+    def build_incremental_prompt(self, summary: str, segment: str, custom_prompt: Optional[str] = None) -> str:
+        """Build the prompt that folds a new transcript segment into a running summary"""
+        with AI_STAGE_LATENCY.time(stage="prompt_build"):
+            instructions = f"- Also follow these instructions: {custom_prompt}\n" if custom_prompt else ""
+            return INCREMENTAL_PROMPT.format(instructions=instructions, summary=summary, segment=segment)
+
+    async def update_summary(self, summary: Optional[str], segment: str, custom_prompt: Optional[str] = None, info: Optional[dict] = None, compact: Optional[bool] = None, client: Optional[str] = None) -> str:
+        """
+        Fold a new transcript segment into a running summary
+
+        Only the previous summary and the new segment are sent, so the cost
+        of an update does not grow with the length of the meeting.
+
+        Args:
+            summary (str, optional): Summary so far; None for the first segment
+            segment (str): Transcript text received since the last update
+            custom_prompt (str, optional): Custom instruction for summarization
+            info (dict, optional): Filled with call metadata such as ``model``
+            compact (bool, optional): Force compaction of the segment on or off
+            client (str, optional): Client whose token budget pays for the update
+
+        Returns:
+            str: The updated summary
+
+        Raises:
+            RequestTooLarge, BudgetExceeded: If the client's budget does not cover the update
+        """
+        segment = await self.compact(segment, compact, info)
+        if summary:
+            prompt = self.build_incremental_prompt(summary, segment, custom_prompt)
+        else:
+            prompt = self.build_summary_prompt(segment, custom_prompt)
+        logger.info(f"📝 Updating live summary - segment: {len(segment)} chars, summary: {len(summary or '')} chars")
+        tokens = await self._charge_prompt(prompt, client)
+        return await self.invoke(prompt, info, tokens=tokens)
+
+    def build_revision_prompt(self, summary: str, removed: List[str], added: List[str], custom_prompt: Optional[str] = None) -> str:
+        """Build the prompt that patches a summary with a transcript diff"""
+        with AI_STAGE_LATENCY.time(stage="prompt_build"):
+            instructions = f"- Also follow these instructions: {custom_prompt}\n" if custom_prompt else ""
+            return REVISION_PROMPT.format(
+                instructions=instructions,
+                summary=summary,
+                removed="\n".join(removed) or "(none)",
+                added="\n".join(added) or "(none)"
+            )
+
+    async def revise_summary(self, summary: str, removed: List[str], added: List[str], custom_prompt: Optional[str] = None, info: Optional[dict] = None, client: Optional[str] = None) -> str:
+        """
+        Update the summary of a transcript that was resubmitted with edits
+
+        Only the existing summary and the changed lines are sent, so a small
+        edit to a long transcript costs a fraction of a full summary.
+
+        Args:
+            summary (str): Summary of the earlier version of the transcript
+            removed (list): Lines no longer in the transcript
+            added (list): Lines new in the transcript
+            custom_prompt (str, optional): Custom instruction for summarization
+            info (dict, optional): Filled with call metadata such as ``model``
+            client (str, optional): Client whose token budget pays for the revision
+
+        Returns:
+            str: The revised summary
+
+        Raises:
+            RequestTooLarge, BudgetExceeded: If the client's budget does not cover the revision
+        """
+        prompt = self.build_revision_prompt(summary, removed, added, custom_prompt)
+        logger.info(f"📝 Revising summary - removed: {len(removed)} lines, added: {len(added)} lines")
+        tokens = await self._charge_prompt(prompt, client)
+        return await self.invoke(prompt, info, tokens=tokens)
+
+    async def compact(self, transcript: str, compact: Optional[bool] = None, info: Optional[dict] = None) -> str:
+        """
+        Run the compaction pipeline on a transcript unless disabled
+
+        Large transcripts are compacted in a worker thread so the regex passes
+        do not block the event loop.
+
+        Args:
+            transcript (str): The input transcript text
+            compact (bool, optional): Force compaction on or off; ``COMPACTION_ENABLED`` when None
+            info (dict, optional): Filled with the ``compaction`` savings report
+
+        Returns:
+            str: Compacted (or unchanged) transcript
+        """
+        if not (self.compaction_enabled if compact is None else compact):
+            return transcript
+        with AI_STAGE_LATENCY.time(stage="compaction"):
+            if len(transcript) > COMPACTION_THREAD_CHARS:
+                transcript, report = await asyncio.to_thread(compact_transcript, transcript, self.compaction_steps, self.estimator.estimate)
+            else:
+                transcript, report = compact_transcript(transcript, self.compaction_steps, self.estimator.estimate)
+        if info is not None:
+            info["compaction"] = report
+        if report["saved_chars"]:
+            logger.info(f"🧹 Compaction saved {report['saved_chars']} chars (~{report['saved_tokens']} tokens, {report['saved_ratio']:.1%})")
+        return transcript
+
+    def estimate_summary(self, tokens: int, chunked: bool) -> dict:
+        """
+        Expected tokens, cost and latency of summarizing a transcript
+
+        Output tokens and latency per call are what the routed model has
+        averaged so far; latency is None until it has answered at least once,
+        and cost is None for a model without a known price.
+
+        Args:
+            tokens (int): Estimated tokens in the transcript and custom prompt
+            chunked (bool): Whether the transcript is summarized map-reduce style
+
+        Returns:
+            dict: ``input_tokens``, ``output_tokens``, ``model``, ``calls``,
+            ``cost_usd`` and ``latency_s``
+        """
+        estimate = {"input_tokens": 0, "output_tokens": 0, "calls": 0, "cost_usd": 0.0, "latency_s": 0.0}
+
+        def add_calls(task: str, calls: int, call_tokens: int, waves: int) -> Tuple[str, int]:
+            model = self.router.candidates(task, call_tokens)[0]
+            latency, output = self.router.expected(model)
+            output = round(output or DEFAULT_OUTPUT_TOKENS)
+            cost = estimate_cost(self.prices, model, calls * call_tokens, calls * output)
+            estimate["input_tokens"] += calls * call_tokens
+            estimate["output_tokens"] += calls * output
+            estimate["calls"] += calls
+            estimate["cost_usd"] = None if cost is None or estimate["cost_usd"] is None else estimate["cost_usd"] + cost
+            estimate["latency_s"] = None if latency is None or estimate["latency_s"] is None else estimate["latency_s"] + waves * latency
+            return model, output
+
+        reduce_tokens = tokens + SUMMARY_PROMPT_TOKENS
+        if chunked:
+            segments = max(1, math.ceil(tokens / self.chunk_tokens))
+            _, notes = add_calls("segment", segments, math.ceil(tokens / segments) + SEGMENT_PROMPT_TOKENS, math.ceil(segments / self.chunk_fanout))
+            reduce_tokens = segments * notes + SUMMARY_PROMPT_TOKENS
+        estimate["model"], _ = add_calls("summary", 1, reduce_tokens, 1)
+        if estimate["cost_usd"] is not None:
+            estimate["cost_usd"] = round(estimate["cost_usd"], 6)
+        if estimate["latency_s"] is not None:
+            estimate["latency_s"] = round(estimate["latency_s"], 2)
+        return estimate
+
+    async def admit(self, transcript: str, custom_prompt: Optional[str] = None, chunked: Optional[bool] = None, compact: Optional[bool] = None, client: Optional[str] = None, info: Optional[dict] = None) -> Tuple[str, bool, dict]:
+        """
+        Compact a transcript and decide whether and how it may be summarized
+
+        The transcript is sized with the local estimator before any model is
+        called. Requests over ``max_request_tokens`` are rejected outright.
+        Those over the chunk threshold or ``max_prompt_tokens`` are summarized
+        map-reduce style, unless the caller forced ``chunked=False``, in which
+        case one over ``max_prompt_tokens`` is rejected. With client budgets
+        enabled, the estimated input and output tokens are then charged to
+        ``client``.
+
+        Args:
+            transcript (str): The input transcript text
+            custom_prompt (str, optional): Custom instruction for summarization
+            chunked (bool, optional): Map-reduce mode requested by the caller
+            compact (bool, optional): Force transcript compaction on or off
+            client (str, optional): Client to charge; no budget applies when None
+            info (dict, optional): Filled with ``compaction`` and the ``estimate``
+                from ``estimate_summary``
+
+        Returns:
+            tuple: ``(transcript, chunked, estimate)`` - the compacted
+            transcript, whether to summarize it chunked, and the
+            ``estimate_summary`` report, whose ``input_tokens`` callers pass
+            on to ``invoke`` as ``tokens``
+
+        Raises:
+            RequestTooLarge: If the request exceeds a size limit or the client's whole budget
+            BudgetExceeded: If the client's budget for the current window is spent
+        """
+        transcript = await self.compact(transcript, compact, info)
+        tokens = await self.estimator.estimate_async(transcript)
+        if custom_prompt:
+            tokens += self.estimator.estimate(custom_prompt)
+        if tokens > self.max_request_tokens:
+            ADMISSIONS.inc(outcome="too_large")
+            raise RequestTooLarge(f"Transcript is about {tokens} tokens, over the {self.max_request_tokens} token limit", tokens)
+        if chunked is None:
+            chunked = self.needs_chunking(tokens)
+        elif not chunked and tokens > self.max_prompt_tokens:
+            ADMISSIONS.inc(outcome="too_large")
+            raise RequestTooLarge(f"Transcript is about {tokens} tokens, over the {self.max_prompt_tokens} token limit for a single call; summarize it chunked instead", tokens)
+
+        estimate = self.estimate_summary(tokens, chunked)
+        await self.charge(client, estimate["input_tokens"] + estimate["output_tokens"])
+        ADMISSIONS.inc(outcome="chunked" if chunked else "admitted")
+        if info is not None:
+            info["estimate"] = estimate
+        logger.debug("🎫 Admitted transcript - ~%d tokens, chunked: %s", tokens, chunked)
+        return transcript, chunked, estimate
+
+    def needs_chunking(self, tokens: int) -> bool:
+        """Whether a transcript of ``tokens`` estimated tokens is summarized map-reduce style"""
+        return tokens > min(self.chunk_threshold, self.max_prompt_tokens)
+
+    async def charge(self, client: Optional[str], tokens: int) -> None:
+        """
+        Take ``tokens`` from a client's budget; a no-op without budgets or a client
+
+        Raises:
+            RequestTooLarge: If ``tokens`` exceeds the client's whole budget
+            BudgetExceeded: If the client's budget for the current window is spent
+        """
+        if client is None or self.budgets is None:
+            return
+        try:
+            wait = await self.budgets.charge(client, tokens)
+        except RequestTooLarge:
+            ADMISSIONS.inc(outcome="too_large")
+            raise
+        if wait:
+            ADMISSIONS.inc(outcome="over_budget")
+            raise BudgetExceeded(f"Token budget used up, retry in {math.ceil(wait)}s", wait)
+
+    async def _charge_prompt(self, prompt: str, client: Optional[str], task: str = "summary") -> int:
+        """Charge ``client`` for a single call with ``prompt``; returns its estimated prompt tokens for ``invoke``"""
+        tokens = await self.estimator.estimate_async(prompt)
+        if client is not None and self.budgets is not None:
+            _, output = self.router.expected(self.router.candidates(task, tokens)[0])
+            await self.charge(client, tokens + round(output or DEFAULT_OUTPUT_TOKENS))
+        return tokens
+
+    async def summarize_transcript(self, transcript: str, custom_prompt: Optional[str] = None, info: Optional[dict] = None, chunked: Optional[bool] = None, compact: Optional[bool] = None, client: Optional[str] = None) -> str:
+        """
+        Summarize a transcript using Gemini API
+        
+        Args:
+            transcript (str): The input transcript text
+            custom_prompt (str, optional): Custom instruction for summarization
+            info (dict, optional): Filled with call metadata such as ``cached``,
+                ``chunks``, ``compaction`` and ``estimate``
+            chunked (bool, optional): Force map-reduce mode on or off; chosen by
+                transcript size when None
+            compact (bool, optional): Force transcript compaction on or off
+            client (str, optional): Client whose token budget pays for the call
             
-            result = self.invoke(prompt)
+        Returns:
+            str: Summarized text
+
+        Raises:
+            RequestTooLarge, BudgetExceeded: If ``admit`` turns the request away
+        """
+        logger.info(f"📝 Starting transcript summarization - length: {len(transcript)} chars, custom_prompt: {bool(custom_prompt)}")
+        
+        try:
+            transcript, chunked, estimate = await self.admit(transcript, custom_prompt, chunked, compact, client, info)
+
+            # The single call is routed and rate limited by the same estimate admission reported
+            tokens = estimate["input_tokens"]
+            if chunked:
+                result = await self._summarize_chunked(transcript, custom_prompt, info)
+            elif self.contexts is not None and self.contexts.accepts(transcript):
+                # Later prompts about the same transcript reuse its uploaded context
+                prompt = self.build_summary_prompt(CONTEXT_REFERENCE, custom_prompt)
+                result = await self.invoke(prompt, info, context=CONTEXT_TEMPLATE.format(transcript=transcript), tokens=tokens)
+            else:
+                prompt = self.build_summary_prompt(transcript, custom_prompt)
+                result = await self.invoke(prompt, info, tokens=tokens)
             logger.info(f"✅ Transcript summarization completed - output length: {len(result)} chars")
             return result
             
+        except (asyncio.TimeoutError, UpstreamUnavailable, RequestTooLarge, BudgetExceeded):
+            raise
         except Exception as e:
             logger.error(f"❌ Transcript summarization failed: {str(e)}")
             raise Exception(f"AI summarization failed: {str(e)}")
+
+    async def _summarize_chunked(self, transcript: str, custom_prompt: Optional[str], info: Optional[dict]) -> str:
+        """Map-reduce summarization for long transcripts"""
+        prompt = await self._build_chunked_prompt(transcript, custom_prompt, info)
+        final_info = {}
+        result = await self.invoke(prompt, final_info)
+        if info is not None:
+            info["cached"] = info["cached"] and final_info.get("cached", False)
+            info["model"] = final_info.get("model")
+        return result
+
+    async def _build_chunked_prompt(self, transcript: str, custom_prompt: Optional[str], info: Optional[dict]) -> str:
+        """
+        Map phase of chunked summarization
+
+        Segments are summarized concurrently (at most ``chunk_fanout`` at a
+        time) and the partial notes are wrapped in the regular summary prompt
+        for the reduce call. Partial notes that still exceed the chunk budget
+        are reduced again in groups first, for at most ``MAX_REDUCE_ROUNDS``
+        rounds and only while each round leaves fewer notes; what is left
+        then goes to the reduce call as it is.
+
+        Raises:
+            RequestTooLarge: If the notes left over exceed ``max_prompt_tokens``
+        """
+        segments = chunk_transcript(transcript, self.chunk_tokens, self.estimator.estimate)
+        logger.info(f"🧩 Chunked summarization - {len(segments)} segments of up to {self.chunk_tokens} tokens, fan-out: {self.chunk_fanout}")
+        fanout = asyncio.Semaphore(self.chunk_fanout)
+        call_infos = []
+
+        async def summarize_segment(index: int, total: int, segment: str) -> str:
+            call_info = {}
+            call_infos.append(call_info)
+            async with fanout:
+                return await self.invoke(
+                    SEGMENT_PROMPT.format(index=index, total=total, segment=segment),
+                    call_info,
+                    task="segment"
+                )
+
+        partials = segments
+        for round_number in itertools.count(1):
+            partials = await asyncio.gather(*(
+                summarize_segment(i + 1, len(partials), part)
+                for i, part in enumerate(partials)
+            ))
+            merged = "\n\n".join(
+                f"Notes for part {i + 1}:\n{note}" for i, note in enumerate(partials)
+            )
+            merged_tokens = self.estimator.estimate(merged)
+            if len(partials) == 1 or merged_tokens <= self.chunk_tokens:
+                break
+            # Notes are still too long for one reduce call; regroup and go again
+            regrouped = chunk_transcript(merged, self.chunk_tokens, self.estimator.estimate)
+            if len(regrouped) >= len(partials) or round_number >= MAX_REDUCE_ROUNDS:
+                # Another round would not shrink the notes (much); reduce them as they are
+                if merged_tokens > self.max_prompt_tokens:
+                    raise RequestTooLarge(f"Partial notes are still about {merged_tokens} tokens after {round_number} rounds, over the {self.max_prompt_tokens} token limit for a single call", merged_tokens)
+                logger.warning(f"⚠️ Partial notes still {merged_tokens} tokens after {round_number} rounds, reducing them as they are")
+                break
+            partials = regrouped
+
+        if info is not None:
+            info["chunks"] = len(segments)
+            info["cached"] = all(call.get("cached", False) for call in call_infos)
+        return self.build_summary_prompt(merged, custom_prompt)
+
+    async def stream_summary(self, transcript: str, custom_prompt: Optional[str] = None, info: Optional[dict] = None, chunked: Optional[bool] = None, compact: Optional[bool] = None, tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Summarize a transcript, yielding text as Gemini generates it
+
+        In chunked mode the map phase runs first and only the reduce call is
+        streamed. The transcript is not admitted here: once a stream has
+        started, a rejection can no longer get its own HTTP status, so callers
+        run ``admit`` first and pass on the transcript, chunking and estimated
+        ``input_tokens`` it returns, with ``compact=False``.
+
+        Args:
+            transcript (str): The input transcript text
+            custom_prompt (str, optional): Custom instruction for summarization
+            info (dict, optional): Filled with call metadata such as ``cached``,
+                ``chunks`` and ``compaction``
+            chunked (bool, optional): Force map-reduce mode on or off; chosen by
+                transcript size when None
+            compact (bool, optional): Force transcript compaction on or off
+            tokens (int, optional): Estimated tokens of the single-pass prompt
+                from ``admit``, used for routing and rate limiting
+        """
+        logger.info(f"📝 Starting streamed transcript summarization - length: {len(transcript)} chars, custom_prompt: {bool(custom_prompt)}")
+        transcript = await self.compact(transcript, compact, info)
+        if chunked is None:
+            chunked = self.needs_chunking(await self.estimator.estimate_async(transcript))
+
+        if chunked:
+            prompt = await self._build_chunked_prompt(transcript, custom_prompt, info)
+            map_cached = info.get("cached", False) if info is not None else False
+            final_info = {}
+            async for text in self.invoke_stream(prompt, final_info):
+                yield text
+            if info is not None:
+                info["cached"] = map_cached and final_info.get("cached", False)
+                info["model"] = final_info.get("model")
+        elif self.contexts is not None and self.contexts.accepts(transcript):
+            prompt = self.build_summary_prompt(CONTEXT_REFERENCE, custom_prompt)
+            async for text in self.invoke_stream(prompt, info, context=CONTEXT_TEMPLATE.format(transcript=transcript), tokens=tokens):
+                yield text
+        else:
+            async for text in self.invoke_stream(self.build_summary_prompt(transcript, custom_prompt), info, tokens=tokens):
+                yield text
     
-    async def rephrase_summary(self, summary: str, style: str = "professional") -> str:
+    def build_rephrase_prompt(self, summary: str, style: str = "professional") -> str:
+        """Build the rephrasing prompt for a summary and style"""
+        with AI_STAGE_LATENCY.time(stage="prompt_build"):
+            selected_prompt = REPHRASE_STYLES.get(style, REPHRASE_STYLES['professional'])
+            logger.debug("Using style prompt: %s", style)
+            return f"{selected_prompt}\n\n{summary}"
+
+    async def charge_rephrase(self, summary: str, style: str = "professional", client: Optional[str] = None) -> int:
+        """
+        Charge ``client`` for rephrasing ``summary``
+
+        Routes call this before serving a rephrase, precomputed or not, so a
+        spent budget is rejected before a stream starts.
+
+        Returns:
+            int: Estimated prompt tokens, to pass on as ``tokens``
+
+        Raises:
+            RequestTooLarge, BudgetExceeded: As for ``charge``
+        """
+        return await self._charge_prompt(self.build_rephrase_prompt(summary, style), client, task="rephrase")
+
+    async def rephrase_summary(self, summary: str, style: str = "professional", info: Optional[dict] = None, background: bool = False, client: Optional[str] = None, tokens: Optional[int] = None) -> str:
         """
         Rephrase a summary in different styles
         
         Args:
             summary (str): The summary to rephrase
             style (str): Style preference (professional, casual, technical, executive)
+            info (dict, optional): Filled with call metadata such as ``cached``
+            background (bool): Run at lower priority than user requests, as for ``invoke``
+            client (str, optional): Client whose token budget pays for the call
+            tokens (int, optional): Estimated prompt tokens from ``charge_rephrase``,
+                when the caller has already charged the client
             
         Returns:
             str: Rephrased summary
+
+        Raises:
+            RequestTooLarge, BudgetExceeded: If ``client``'s budget turns the call away
         """
         logger.info(f"✏️ Starting summary rephrasing - style: {style}, length: {len(summary)} chars")
         
         try:
-            style_prompts = {
-                "professional": "Transform the following content into a professional, business-appropriate format:",
-                "casual": "Rewrite the following content in a casual, friendly tone:",
-                "technical": "Restructure the following content with technical detail and precision:",
-                "executive": "Convert the following content into an executive briefing highlighting key decisions:"
-            }
-            
-            selected_prompt = style_prompts.get(style, style_prompts['professional'])
-            prompt = f"{selected_prompt}\n\n{summary}"
-            logger.debug(f"Using style prompt: {style}")
-            
-            result = self.invoke(prompt)
+            if tokens is None:
+                tokens = await self.charge_rephrase(summary, style, client)
+            prompt = self.build_rephrase_prompt(summary, style)
+            result = await self.invoke(prompt, info, task="rephrase", background=background, tokens=tokens)
             logger.info(f"✅ Summary rephrasing completed - output length: {len(result)} chars")
             return result
             
+        except (asyncio.TimeoutError, UpstreamUnavailable, RequestTooLarge, BudgetExceeded):
+            raise
         except Exception as e:
             logger.error(f"❌ Summary rephrasing failed: {str(e)}")
             raise Exception(f"AI rephrasing failed: {str(e)}")
+
+    async def stream_rephrase(self, summary: str, style: str = "professional", info: Optional[dict] = None, client: Optional[str] = None, tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Rephrase a summary, yielding text as Gemini generates it
+
+        Streaming routes call ``charge_rephrase`` before the stream starts and
+        pass its ``tokens``; otherwise ``client`` is charged before the first chunk.
+        
+        Args:
+            summary (str): The summary to rephrase
+            style (str): Style preference (professional, casual, technical, executive)
+            info (dict, optional): Filled with call metadata such as ``cached``
+            client (str, optional): Client whose token budget pays for the call
+            tokens (int, optional): Estimated prompt tokens from ``charge_rephrase``
+        """
+        logger.info(f"✏️ Starting streamed summary rephrasing - style: {style}, length: {len(summary)} chars")
+        if tokens is None:
+            tokens = await self.charge_rephrase(summary, style, client)
+        async for text in self.invoke_stream(self.build_rephrase_prompt(summary, style), info, task="rephrase", tokens=tokens):
+            yield text
@@ -0,0 +1,356 @@
+"""
+Load test: the full API under concurrency, fully offline
+
+Run from backend/:
+    python benchmarks/load_test.py [--requests 200] [--concurrency 20] [--workers 1]
+        [--scenarios summarize,rephrase,send-email,upload]
+        [--ai-latency 0.2] [--response-chars 2000] [--smtp-latency 0.01]
+
+Boots the server (python main.py) in a subprocess with the stub AI provider
+(AI_PROVIDER=stub, no API key or network needed) and points the emailer at
+an in-process SMTP sink that accepts and discards every message. Each
+scenario sends --requests requests at --concurrency and reports throughput
+and p50/p95/p99 latency, plus the server's event loop lag while it ran, read
+from the recapflow_event_loop_lag_seconds histogram on /metrics. Loop lag
+well above a few milliseconds means something is blocking the event loop.
+With --workers above 1, the workers share state through a temporary SQLite
+file, and the lag figures come from whichever worker answered /metrics.
+
+Every request uses a distinct transcript or summary so neither the response
+cache (disabled unless --cache is given) nor request coalescing hides the
+cost of a call.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+TRANSCRIPT_PATH = os.path.join(BACKEND_DIR, "..", "test_transcript.txt")
+SCENARIOS = ("summarize", "rephrase", "send-email", "upload")
+LAG_BUCKET_PATTERN = re.compile(r'^recapflow_event_loop_lag_seconds_bucket\{le="([^"]+)"\} (\S+)$', re.MULTILINE)
+LAG_SUM_PATTERN = re.compile(r"^recapflow_event_loop_lag_seconds_sum (\S+)$", re.MULTILINE)
+
+class SMTPSink:
+    """
+    Minimal SMTP server that accepts every message and keeps only counts
+
+    Speaks just enough of the protocol for smtplib: EHLO with AUTH PLAIN
+    LOGIN, any credentials, MAIL/RCPT/DATA, RSET, NOOP and QUIT. There is no
+    STARTTLS, so the server runs with SMTP_STARTTLS=false. Addresses in
+    ``refuse`` get a 550 reply to RCPT.
+    """
+
+    def __init__(self, latency: float = 0.0, refuse=()):
+        self.latency = latency
+        self.refuse = {address.lower() for address in refuse}
+        self.messages = 0
+        self.recipients = 0
+        self.last_message_at = None
+        self._server = None
+        self._sessions = {}
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+        # Sessions the server left open (e.g. idle pooled ones) end on EOF
+        for writer in list(self._sessions.values()):
+            writer.close()
+        await asyncio.gather(*self._sessions, return_exceptions=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        def reply(text: str) -> None:
+            writer.write(text.encode() + b"\r\n")
+
+        self._sessions[asyncio.current_task()] = writer
+        reply("220 recapflow-sink ESMTP")
+        recipients = 0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip().upper()
+                if command.startswith(("EHLO", "HELO")):
+                    reply("250-recapflow-sink\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME")
+                elif command.startswith("AUTH LOGIN"):
+                    # Username and password prompts, both base64 "Username:"/"Password:"
+                    for prompt in ("VXNlcm5hbWU6", "UGFzc3dvcmQ6"):
+                        reply(f"334 {prompt}")
+                        await writer.drain()
+                        await reader.readline()
+                    reply("235 Authentication successful")
+                elif command.startswith("AUTH"):
+                    reply("235 Authentication successful")
+                elif command.startswith("MAIL"):
+                    recipients = 0
+                    reply("250 OK")
+                elif command.startswith("RCPT"):
+                    if command.partition("<")[2].rstrip(">").lower() in self.refuse:
+                        reply("550 No such user")
+                    else:
+                        recipients += 1
+                        reply("250 OK")
+                elif command == "DATA":
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    await writer.drain()
+                    while (await reader.readline()) not in (b".\r\n", b""):
+                        pass
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    self.messages += 1
+                    self.recipients += recipients
+                    self.last_message_at = time.perf_counter()
+                    reply("250 OK queued")
+                elif command == "QUIT":
+                    reply("221 Bye")
+                    await writer.drain()
+                    break
+                else:
+                    # RSET, NOOP and anything else
+                    reply("250 OK")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._sessions.pop(asyncio.current_task(), None)
+            writer.close()
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(ordered: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+def read_loop_lag(metrics_text: str) -> dict:
+    """Cumulative event loop lag histogram from a /metrics scrape"""
+    buckets = [(float(bound), float(count)) for bound, count in LAG_BUCKET_PATTERN.findall(metrics_text)]
+    total = LAG_SUM_PATTERN.search(metrics_text)
+    return {"buckets": buckets, "sum": float(total.group(1)) if total else 0.0}
+
+def loop_lag_delta(before: dict, after: dict) -> dict:
+    """Lag samples taken between two scrapes, with mean and a bucket-bound p99"""
+    counts = dict(before["buckets"])
+    buckets = [(bound, count - counts.get(bound, 0.0)) for bound, count in after["buckets"]]
+    samples = buckets[-1][1] if buckets else 0.0
+    p99 = None
+    for bound, count in buckets:
+        if samples and count >= 0.99 * samples:
+            p99 = bound
+            break
+    return {
+        "samples": int(samples),
+        "mean_ms": round((after["sum"] - before["sum"]) / samples * 1000, 3) if samples else 0.0,
+        # Upper bound of the histogram bucket holding the 99th percentile
+        "p99_le_ms": None if p99 is None else (p99 * 1000 if math.isfinite(p99) else "inf"),
+    }
+
+def build_request(scenario: str, index: int, transcript: str, summary: str) -> dict:
+    """httpx.request keyword arguments for one request of a scenario"""
+    marker = f"\nBenchmark request {index}."
+    if scenario == "summarize":
+        return {"method": "POST", "url": "/summarize", "json": {"transcript": transcript + marker}}
+    if scenario == "rephrase":
+        return {"method": "POST", "url": "/rephrase", "json": {"summary": summary + marker, "style": "casual"}}
+    if scenario == "send-email":
+        return {"method": "POST", "url": "/send-email", "json": {
+            "recipients": [f"user{index}@example.com"],
+            "summary": summary + marker,
+            "subject": f"Load test {index}",
+        }}
+    if scenario == "upload":
+        content = (transcript + marker).encode("utf-8")
+        return {"method": "POST", "url": "/upload", "params": {"echo": "false"},
+                "files": {"file": (f"transcript-{index}.txt", content, "text/plain")}}
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, args, transcript: str, summary: str) -> dict:
+    """Send ``args.requests`` requests at ``args.concurrency`` and time each one"""
+    latencies = []
+    errors = {}
+    next_index = iter(range(args.requests))
+
+    async def worker():
+        for index in next_index:
+            request = build_request(scenario, index, transcript, summary)
+            start = time.perf_counter()
+            try:
+                response = await client.request(**request)
+                ok = response.status_code < 400
+                error = str(response.status_code)
+            except httpx.HTTPError as e:
+                ok = False
+                error = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors[error] = errors.get(error, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    duration = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 1) if duration else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ordered, 0.50) * 1000, 2),
+            "p95": round(percentile(ordered, 0.95) * 1000, 2),
+            "p99": round(percentile(ordered, 0.99) * 1000, 2),
+            "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        },
+    }
+
+async def wait_for_deliveries(sink: SMTPSink, baseline: int, expected: int, start: float, timeout: float) -> dict:
+    """Wait for the email queue to hand ``expected`` more messages than ``baseline`` to the sink"""
+    deadline = time.perf_counter() + timeout
+    while sink.messages - baseline < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    delivered = sink.messages - baseline
+    elapsed = (sink.last_message_at or start) - start
+    return {
+        "delivered": delivered,
+        "expected": expected,
+        "drain_s": round(elapsed, 3),
+        "delivery_rate_per_s": round(delivered / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+def server_env(args, smtp_port: int, workdir: str) -> dict:
+    """Environment for the server: stub AI, local SMTP sink, no quotas or persistence"""
+    env = dict(os.environ)
+    env.update({
+        "AI_PROVIDER": "stub",
+        "AI_STUB_LATENCY": str(args.ai_latency),
+        "AI_STUB_RESPONSE_CHARS": str(args.response_chars),
+        "SUMMARY_CACHE_ENABLED": "true" if args.cache else "false",
+        "SUMMARY_CACHE_DB": "",
+        "GEMINI_RPM": "0",
+        "GEMINI_TPM": "0",
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_STARTTLS": "false",
+        "EMAIL_ADDRESS": "loadtest@example.com",
+        "EMAIL_PASSWORD": "loadtest",
+        "EMAIL_QUEUE_DB": "",
+        "TRANSCRIPT_STORE_DB": "",
+        "TRANSCRIPT_STORE_DIR": "",
+        "SHARED_STATE_URL": f"sqlite:///{os.path.join(workdir, 'state.db')}" if args.workers > 1 else "",
+    })
+    return env
+
+async def wait_until_ready(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+async def run(args) -> dict:
+    with open(TRANSCRIPT_PATH, encoding="utf-8") as f:
+        transcript = f.read()
+    summary = "## Meeting Summary\n\n" + "\n".join(f"- {line.strip()}" for line in transcript.splitlines()[:20] if line.strip())
+
+    sink = SMTPSink(latency=args.smtp_latency)
+    smtp_port = await sink.start()
+    port = free_port()
+    workdir = tempfile.mkdtemp(prefix="recapflow-load-")
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "main.py"),
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(args.workers)],
+        cwd=workdir,
+        env=server_env(args, smtp_port, workdir),
+        stdout=subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=args.timeout) as client:
+            await wait_until_ready(client, server)
+            for scenario in args.scenarios:
+                before = read_loop_lag((await client.get("/metrics")).text)
+                delivered_before = sink.messages
+                start = time.perf_counter()
+                result = await run_scenario(client, scenario, args, transcript, summary)
+                if scenario == "send-email":
+                    result["smtp"] = await wait_for_deliveries(sink, delivered_before, args.requests, start, args.timeout)
+                after = read_loop_lag((await client.get("/metrics")).text)
+                result["event_loop_lag"] = loop_lag_delta(before, after)
+                results[scenario] = result
+    finally:
+        server.terminate()
+        try:
+            # Off the event loop: the SMTP sink must still answer the server's QUIT while it shuts down
+            await asyncio.to_thread(server.wait, timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        await sink.stop()
+
+    return {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "ai_latency_s": args.ai_latency,
+            "response_chars": args.response_chars,
+            "smtp_latency_s": args.smtp_latency,
+            "transcript_chars": len(transcript),
+            "cache": args.cache,
+        },
+        "scenarios": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight at once")
+    parser.add_argument("--workers", type=int, default=1, help="server worker processes")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--ai-latency", type=float, default=0.2, help="seconds the stub provider takes per call")
+    parser.add_argument("--response-chars", type=int, default=2000, help="minimum length of stub responses")
+    parser.add_argument("--smtp-latency", type=float, default=0.01, help="seconds the SMTP sink takes per message")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request and email drain timeout in seconds")
+    parser.add_argument("--cache", action="store_true", help="leave the summary cache enabled")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show server logs")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    report = json.dumps(asyncio.run(run(args)), indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+
+if __name__ == "__main__":
+    main()
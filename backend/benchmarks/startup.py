@@ -0,0 +1,143 @@
+"""
+Startup benchmark: import time, time to ready and first-request latency
+
+Run from backend/:
+    python benchmarks/startup.py [--runs 5] [--warmup] [--ai-latency 0.2]
+
+Measures what a freshly started dyno pays before and during its first
+requests, fully offline like benchmarks/load_test.py (stub AI provider and a
+local SMTP sink):
+
+- import: seconds to ``import main`` in a new interpreter
+- ready: seconds from spawning the server until /health answers
+- first/second: latency of the first and second /summarize, and of the
+  first and second email from /send-email until the SMTP sink receives it
+
+Each figure is the median over --runs fresh processes. With --warmup the
+server runs with STARTUP_WARMUP=true, so the SMTP session is opened during
+startup instead of by the first email (the stub provider has no connection
+to warm up; against Gemini the first /summarize benefits the same way).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from load_test import BACKEND_DIR, SMTPSink, free_port, server_env
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+
+def measure_import(env: dict) -> float:
+    """Seconds to import the app in a new interpreter, excluding interpreter startup"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+async def wait_for_message(sink: SMTPSink, count: int, start: float, timeout: float) -> float:
+    """Seconds from ``start`` until the sink has received ``count`` messages"""
+    deadline = time.perf_counter() + timeout
+    while sink.messages < count:
+        if time.perf_counter() > deadline:
+            raise RuntimeError("Email was not delivered")
+        await asyncio.sleep(0.002)
+    return sink.last_message_at - start
+
+async def measure_run(args, transcript: str) -> dict:
+    """Start one server process and time its startup and first requests"""
+    sink = SMTPSink()
+    smtp_port = await sink.start()
+    port = free_port()
+    workdir = tempfile.mkdtemp(prefix="recapflow-startup-")
+    env = server_env(args, smtp_port, workdir)
+    env["LOG_FILE"] = ""
+    env["STARTUP_WARMUP"] = "true" if args.warmup else "false"
+    result = {"import": measure_import(env)}
+
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "main.py"), "--host", "127.0.0.1", "--port", str(port)],
+        cwd=workdir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout) as client:
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"Server exited with code {server.returncode}")
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.01)
+            result["ready"] = time.perf_counter() - start
+
+            for attempt in ("first", "second"):
+                started = time.perf_counter()
+                response = await client.post("/summarize", json={"transcript": f"{transcript}\nStartup {attempt}."})
+                response.raise_for_status()
+                result[f"summarize_{attempt}"] = time.perf_counter() - started
+
+            for count, attempt in enumerate(("first", "second"), start=1):
+                started = time.perf_counter()
+                response = await client.post("/send-email", json={
+                    "recipients": ["startup@example.com"],
+                    "summary": f"- Startup benchmark, {attempt} email",
+                    "subject": "Startup benchmark",
+                })
+                response.raise_for_status()
+                result[f"email_{attempt}"] = await wait_for_message(sink, count, started, args.timeout)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        await sink.stop()
+    return result
+
+async def run(args) -> dict:
+    with open(os.path.join(BACKEND_DIR, "..", "test_transcript.txt"), encoding="utf-8") as f:
+        transcript = f.read()
+    runs = [await measure_run(args, transcript) for _ in range(args.runs)]
+    return {
+        "config": {"runs": args.runs, "warmup": args.warmup, "ai_latency_s": args.ai_latency},
+        "median_ms": {key: round(statistics.median(run[key] for run in runs) * 1000, 1) for key in runs[0]},
+        "min_ms": {key: round(min(run[key] for run in runs) * 1000, 1) for key in runs[0]},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="fresh server processes to measure")
+    parser.add_argument("--warmup", action="store_true", help="run the server with STARTUP_WARMUP=true")
+    parser.add_argument("--ai-latency", type=float, default=0.2, help="seconds the stub provider takes per call")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show server logs")
+    args = parser.parse_args()
+    # server_env also reads these load test options
+    args.response_chars, args.cache, args.workers = 0, False, 1
+
+    report = json.dumps(asyncio.run(run(args)), indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Cache Module for RecapFlow
+Content-addressed cache for Gemini responses with an in-memory LRU tier
+and an optional persistent tier (SQLite, or the shared state backend)
+that survives restarts
+"""
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from cachetools import TTLCache
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.Cache")
+
+# Sweep expired rows from the SQLite tier once every this many writes
+PURGE_EVERY = 100
+# Rows of the SQLite tier newest first, with the size of every row up to and including each
+RUNNING_SIZE = "SELECT key, length(value) AS size, SUM(length(value)) OVER (ORDER BY created DESC, key DESC) AS kept FROM responses"
+
+class SummaryCache:
+    """
+    Two-tier cache of model responses keyed by a hash of (model, prompt)
+
+    The SQLite tier drops an expired entry when it is read, sweeps all
+    expired entries every ``PURGE_EVERY`` writes and evicts the oldest
+    entries once it holds more than ``disk_max_bytes``. The memory tier and
+    the SQLite connection have separate locks, so requests served from
+    memory never wait for a disk write or sweep running in a worker thread.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl: float = 3600, db_path: Optional[str] = None, shared=None, disk_max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            max_bytes (int): Size budget of the in-memory tier, in characters of cached text
+            ttl (float): Seconds an entry stays valid in either tier
+            db_path (str, optional): SQLite file for the persistent tier; disabled when None
+            disk_max_bytes (int): Size budget of the SQLite tier, in characters of
+                cached text; the oldest entries are evicted beyond it
+            shared (SharedState, optional): Cross-worker state used as the persistent
+                tier instead of ``db_path``, so every worker sees every response
+        """
+        self.ttl = ttl
+        self.db_path = db_path
+        self.shared = shared
+        self.disk_max_bytes = disk_max_bytes
+        # TTLCache evicts least recently used entries once max_bytes is exceeded
+        self._memory = TTLCache(maxsize=max_bytes, ttl=ttl, getsizeof=len)
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._disk_size = 0
+        self._disk_writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        if shared is not None:
+            logger.info("💾 Response cache shared across workers")
+        elif db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+            self._db.commit()
+            self._disk_size = self._db.execute("SELECT COALESCE(SUM(length(value)), 0) FROM responses").fetchone()[0]
+            logger.info(f"💾 Persistent response cache enabled at {db_path}")
+
+    @staticmethod
+    def make_key(model: str, prompt: str) -> str:
+        """Return the content address for a model/prompt pair"""
+        digest = hashlib.sha256()
+        digest.update(model.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Look up a cached response, promoting disk hits into memory"""
+        with self._lock:
+            value = self._memory.get(key)
+        if value is None and (self._db is not None or self.shared is not None):
+            value = await asyncio.to_thread(self._disk_get, key)
+            if value is not None:
+                self.disk_hits += 1
+                self._memory_set(key, value)
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        """Store a response in every enabled tier"""
+        self._memory_set(key, value)
+        if self._db is not None or self.shared is not None:
+            await asyncio.to_thread(self._disk_set, key, value)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current occupancy"""
+        with self._lock:
+            entries = len(self._memory)
+            size = self._memory.currsize
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size": size,
+            "max_size": self._memory.maxsize,
+            "persistent": self._db is not None or self.shared is not None,
+            "disk_size": self._disk_size if self._db is not None else None,
+        }
+
+    def close(self) -> None:
+        """Close the persistent tier"""
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
+
+    def _memory_set(self, key: str, value: str) -> None:
+        # Entries larger than the whole budget are simply not kept in memory
+        if len(value) > self._memory.maxsize:
+            return
+        with self._lock:
+            self._memory[key] = value
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        if self.shared is not None:
+            return self.shared.get("cache", key, self.ttl)
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if time.time() - created > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                self._disk_size -= len(value)
+                return None
+            return value
+
+    def _disk_set(self, key: str, value: str) -> None:
+        if self.shared is not None:
+            self.shared.set("cache", key, value, self.ttl)
+            return
+        # Like the memory tier, entries larger than the whole budget are not kept
+        if len(value) > self.disk_max_bytes:
+            return
+        with self._db_lock:
+            row = self._db.execute("SELECT length(value) FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+            self._disk_size += len(value) - (row[0] if row else 0)
+            self._disk_writes += 1
+            if self._disk_writes % PURGE_EVERY == 0:
+                self._purge_expired()
+            if self._disk_size > self.disk_max_bytes:
+                self._evict_oldest()
+            self._db.commit()
+
+    def _purge_expired(self) -> None:
+        """Delete rows older than the TTL; called with ``_db_lock`` held"""
+        cutoff = time.time() - self.ttl
+        count, size = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length(value)), 0) FROM responses WHERE created < ?", (cutoff,)
+        ).fetchone()
+        if count:
+            self._db.execute("DELETE FROM responses WHERE created < ?", (cutoff,))
+            self._disk_size -= size
+            logger.debug(f"💾 Purged {count} expired cached responses")
+
+    def _evict_oldest(self) -> None:
+        """
+        Delete the oldest rows until the tier is within budget; called with ``_db_lock`` held
+
+        Keeps the newest rows that fit in ``disk_max_bytes`` together and
+        deletes every older one in a single statement.
+        """
+        count, size = self._db.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ({RUNNING_SIZE}) WHERE kept > ?", (self.disk_max_bytes,)
+        ).fetchone()
+        if count:
+            self._db.execute(
+                f"DELETE FROM responses WHERE key IN (SELECT key FROM ({RUNNING_SIZE}) WHERE kept > ?)", (self.disk_max_bytes,)
+            )
+            self._disk_size -= size
+            logger.debug(f"💾 Evicted {count} cached responses over the disk budget")
@@ -0,0 +1,107 @@
+"""
+Chunking Module for RecapFlow
+Splits long transcripts into token-budgeted segments on speaker/turn boundaries
+"""
+
+import re
+from typing import Callable, List, Tuple
+
+# Rough average for English text with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+# A new turn starts with an optional timestamp followed by a speaker label, e.g.
+# "Sarah Chen: ...", "[00:12:31] Mike:", "Ashwith:" on a line of its own
+SPEAKER_PATTERN = re.compile(
+    r"^\s*(?:[\[(]?\d{1,2}:\d{2}(?::\d{2})?(?:[.,]\d+)?[\])]?\s*)?[A-Z][\w .'()-]{0,40}:(?:\s|$)"
+)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate, for callers without a ``TokenEstimator``"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def split_turns(transcript: str) -> List[str]:
+    """
+    Split a transcript into speaker turns
+
+    A turn starts at a speaker label or after a blank line and runs until the
+    next one. Text without any speaker labels is split into paragraphs.
+    """
+    turns = []
+    current = []
+    for line in transcript.splitlines():
+        starts_turn = bool(SPEAKER_PATTERN.match(line)) or not line.strip()
+        if starts_turn and current:
+            turn = "\n".join(current).strip()
+            if turn:
+                turns.append(turn)
+            current = []
+        if line.strip():
+            current.append(line)
+    if current:
+        turns.append("\n".join(current).strip())
+    return turns
+
+def _split_oversized(turn: str, max_tokens: int, count: Callable[[str], int]) -> List[Tuple[str, int]]:
+    """Break a single turn that exceeds the budget on sentence boundaries"""
+    pieces = []
+    current, current_tokens = "", 0
+    for sentence in SENTENCE_END.split(turn):
+        tokens = count(sentence)
+        # Hard-wrap sentences that alone exceed the budget, at the share of characters that fits
+        while tokens > max_tokens:
+            if current:
+                pieces.append((current, current_tokens))
+                current, current_tokens = "", 0
+            cut = max(1, len(sentence) * max_tokens // tokens)
+            # Back off to a word boundary, then further while the estimate still overshoots
+            cut = sentence.rfind(" ", 0, cut) + 1 or cut
+            piece_tokens = count(sentence[:cut])
+            while piece_tokens > max_tokens and cut > 1:
+                cut = max(1, min(cut - 1, cut * max_tokens // piece_tokens))
+                piece_tokens = count(sentence[:cut])
+            pieces.append((sentence[:cut].rstrip(), piece_tokens))
+            sentence = sentence[cut:]
+            tokens = count(sentence)
+        if current and current_tokens + tokens > max_tokens:
+            pieces.append((current, current_tokens))
+            current, current_tokens = sentence, tokens
+        else:
+            current = f"{current} {sentence}" if current else sentence
+            current_tokens += tokens
+    if current:
+        pieces.append((current, current_tokens))
+    return pieces
+
+def chunk_transcript(transcript: str, max_tokens: int, count: Callable[[str], int] = estimate_tokens) -> List[str]:
+    """
+    Pack speaker turns into segments of at most ``max_tokens`` estimated tokens
+
+    Args:
+        transcript (str): Full transcript text
+        max_tokens (int): Token budget per segment
+        count (Callable, optional): Token estimate of a text, e.g.
+            ``TokenEstimator.estimate``; ``estimate_tokens`` by default
+
+    Returns:
+        List[str]: Segments in transcript order
+    """
+    separator = count("\n\n")
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for turn in split_turns(transcript):
+        tokens = count(turn)
+        parts = [(turn, tokens)] if tokens <= max_tokens else _split_oversized(turn, max_tokens, count)
+        for part, tokens in parts:
+            if current and current_tokens + separator + tokens > max_tokens:
+                chunks.append("\n\n".join(current))
+                current = []
+                current_tokens = 0
+            current.append(part)
+            current_tokens += tokens + separator
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
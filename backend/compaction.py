@@ -0,0 +1,186 @@
+"""
+Compaction Module for RecapFlow
+Strips filler from transcripts before they are put into a prompt
+"""
+
+import logging
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from chunking import estimate_tokens
+from config import get_settings
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.Compaction")
+
+# "SARAH CHEN :" or "[Sarah Chen]:" as the speaker label of a line (but not "https://")
+SPEAKER_NAME = r"[A-Za-z][\w .'()-]{0,40}?"
+SPEAKER_LABEL_PATTERN = re.compile(r"^[ \t]*\[?(" + SPEAKER_NAME + r")\]?[ \t]*[:：](?:[ \t]+|$)", re.MULTILINE)
+# Line prefixes that head a section of notes rather than name a speaker
+SECTION_LABELS = frozenset({
+    "note", "notes", "decision", "decisions", "action item", "action items", "actions",
+    "agenda", "summary", "next steps", "todo", "follow-up", "follow-ups", "question",
+    "questions", "answer", "update", "updates", "topic", "topics", "attendees", "date",
+    "time", "location", "subject", "re", "outcome", "outcomes", "risks", "blockers",
+})
+# "[00:12:31]", "(12:31)" or "00:12:31.500" at the start of a line, when followed by a
+# speaker label, a "-", "|" or ":" separator or the end of the line. Bare clock times
+# such as "2:30 PM works for me" are speech, not timestamps, and are kept.
+TIMESTAMP_PATTERN = re.compile(
+    r"^[ \t]*(?:[\[(]\d{1,2}:\d{2}(?::\d{2})?(?:[.,]\d+)?[\])]|\d{1,2}:\d{2}:\d{2}(?:[.,]\d+)?)"
+    r"(?=[ \t]*(?:[-–|:](?:[ \t]|$)|$|\[?" + SPEAKER_NAME + r"\]?[ \t]*[:：](?:[ \t]|$)))"
+    r"[ \t]*(?:[-–|:][ \t]*)?",
+    re.MULTILINE
+)
+# Lowercase fillers (capitalized at the start of a sentence) standing alone, so
+# "HMM" in "the HMM model" and the "um" of "um-brella" are kept
+FILLER_PATTERN = re.compile(
+    r"(?<![\w-])(?:[Uu]u*h+m*|[Uu]u*m+|[Ee]e*r+m+|[Hh]h*m+|[Mm]m-?hmm|[Uu]h-huh)(?![\w-]),?[ \t]*"
+)
+# Caption and transcription-tool annotations that carry no content
+ANNOTATION_PATTERN = re.compile(
+    r"[\[(](?:music|applause|laughter|laughs|inaudible|crosstalk|silence|background noise|noise|pause|no audio)[\])]",
+    re.IGNORECASE
+)
+HORIZONTAL_SPACE_PATTERN = re.compile(r"[ \t]+")
+BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+
+def strip_timestamps(text: str) -> str:
+    """Remove leading timestamps from every line"""
+    return TIMESTAMP_PATTERN.sub("", text)
+
+def drop_fillers(text: str) -> str:
+    """Remove um/uh/erm-style fillers and content-free annotations like [inaudible]"""
+    text = ANNOTATION_PATTERN.sub("", text)
+    return FILLER_PATTERN.sub(" ", text)
+
+def _speaker(line: str):
+    """The speaker label match of ``line``, or None if its prefix is not a speaker"""
+    match = SPEAKER_LABEL_PATTERN.match(line)
+    if match is None or " ".join(match.group(1).lower().split()) in SECTION_LABELS:
+        return None
+    return match
+
+def normalize_speakers(text: str) -> str:
+    """
+    Normalize speaker labels and merge consecutive turns by the same speaker
+
+    A ``Word:`` prefix counts as a speaker only when it labels several lines
+    and is not a section header such as "Note:" or "Action items:". Brackets
+    and stray spacing are removed from speaker labels, their casing is kept
+    ("CEO" stays "CEO"), and a label repeated on consecutive turns (in any
+    casing) is kept only on the first of them.
+    """
+    counts = {}
+    for line in text.split("\n"):
+        match = _speaker(line)
+        if match is not None:
+            key = match.group(1).strip().casefold()
+            counts[key] = counts.get(key, 0) + 1
+
+    lines = []
+    previous = None
+    for line in text.split("\n"):
+        match = _speaker(line)
+        if match is not None and counts[match.group(1).strip().casefold()] < 2:
+            match = None
+        if match is None:
+            if line.strip():
+                lines.append(line)
+                # A header or other labelled line ends the turn; plain lines continue it
+                if SPEAKER_LABEL_PATTERN.match(line):
+                    previous = None
+            elif lines and lines[-1]:
+                lines.append("")
+            continue
+        speaker = match.group(1).strip()
+        content = line[match.end():]
+        if previous is not None and speaker.casefold() == previous.casefold() and lines:
+            # Same speaker again: continue their turn instead of repeating the label
+            if not lines[-1]:
+                lines.pop()
+            lines[-1] = f"{lines[-1]} {content}" if content else lines[-1]
+        else:
+            lines.append(f"{speaker}: {content}")
+            previous = speaker
+    return "\n".join(lines)
+
+# Shorter lines ("Sarah: Yes.") may legitimately recur and are only dropped when repeated back to back
+DEDUPE_MIN_CHARS = 40
+
+def dedupe_turns(text: str) -> str:
+    """Drop lines that repeat an earlier line verbatim (ignoring case and spacing)"""
+    seen = set()
+    previous = None
+    lines = []
+    for line in text.split("\n"):
+        key = " ".join(line.lower().split())
+        if key:
+            if key == previous or key in seen:
+                continue
+            if len(key) >= DEDUPE_MIN_CHARS:
+                seen.add(key)
+            previous = key
+        lines.append(line)
+    return "\n".join(lines)
+
+def collapse_whitespace(text: str) -> str:
+    """Collapse runs of spaces and blank lines and trim every line"""
+    text = HORIZONTAL_SPACE_PATTERN.sub(" ", text)
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    return BLANK_LINES_PATTERN.sub("\n\n", text).strip()
+
+# Steps in the order they run: timestamps must go before speaker labels can be
+# matched, and repeated turns before consecutive ones are merged
+STEPS: Dict[str, Callable[[str], str]] = {
+    "timestamps": strip_timestamps,
+    "fillers": drop_fillers,
+    "dedupe": dedupe_turns,
+    "speakers": normalize_speakers,
+    "whitespace": collapse_whitespace,
+}
+
+def configured_steps() -> List[str]:
+    """Steps enabled by ``COMPACTION_STEPS`` (all of them by default)"""
+    value = get_settings().compaction_steps
+    if value is None:
+        return list(STEPS)
+    steps = [step.strip() for step in value.split(",") if step.strip()]
+    unknown = [step for step in steps if step not in STEPS]
+    if unknown:
+        raise ValueError(f"Unknown COMPACTION_STEPS: {', '.join(unknown)}")
+    return steps
+
+def compact_transcript(transcript: str, steps: Optional[List[str]] = None, count: Callable[[str], int] = estimate_tokens) -> Tuple[str, dict]:
+    """
+    Run a transcript through the compaction pipeline
+
+    Args:
+        transcript (str): Raw transcript text
+        steps (List[str], optional): Step names to run; defaults to ``configured_steps()``
+        count (Callable, optional): Token estimate of a text, e.g. ``TokenEstimator.estimate``
+
+    Returns:
+        tuple: Compacted text, and a report with the characters and estimated
+        tokens saved overall and per step
+    """
+    steps = configured_steps() if steps is None else steps
+    text = transcript
+    saved_by_step = {}
+    for step in (name for name in STEPS if name in steps):
+        before = len(text)
+        text = STEPS[step](text)
+        saved_by_step[step] = before - len(text)
+
+    original_tokens = count(transcript)
+    compacted_tokens = count(text)
+    report = {
+        "original_chars": len(transcript),
+        "compacted_chars": len(text),
+        "saved_chars": len(transcript) - len(text),
+        "saved_tokens": original_tokens - compacted_tokens,
+        "saved_ratio": (len(transcript) - len(text)) / len(transcript) if transcript else 0.0,
+        "steps": saved_by_step,
+    }
+    logger.debug("🧹 Compacted transcript - %d chars (%.1f%%) saved", report['saved_chars'], report['saved_ratio'] * 100)
+    return text, report
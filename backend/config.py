@@ -0,0 +1,219 @@
+"""
+Config Module for RecapFlow
+Loads backend/.env into the environment once per process and parses every
+setting into one ``Settings`` object, which services read when created
+"""
+
+import dataclasses
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.Config")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Taken when the first RecapFlow module is imported, for the startup timings
+STARTED_AT = time.perf_counter()
+
+MiB = 1024 * 1024
+
+_loaded = False
+
+def load_config() -> None:
+    """
+    Load ``backend/.env`` unless already loaded
+
+    Variables already set in the environment take precedence over the file,
+    so deployment settings (and those ``main.run_server`` sets for worker
+    processes) are never overridden. python-dotenv is only imported here,
+    and only on the first call.
+    """
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    path = os.path.join(BACKEND_DIR, ".env")
+    if not os.path.exists(path):
+        return
+    from dotenv import load_dotenv
+    load_dotenv(path)
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Every RecapFlow setting, parsed once
+
+    Each field is read from the environment variable of the same name in
+    upper case (``gemini_timeout`` from ``GEMINI_TIMEOUT``). Booleans are
+    true only for ``true`` in any case; optional strings are None when unset
+    or empty. The README documents what each setting does.
+    """
+
+    # Server
+    host: str = "0.0.0.0"
+    port: int = 8000
+    workers: int = 1
+    graceful_shutdown_timeout: float = 30
+    shutdown_drain_timeout: float = 30
+    frontend_url: str = "http://localhost:3000"
+    startup_warmup: bool = False
+    startup_warmup_timeout: float = 10
+    shared_state_url: str = ""
+    client_id_header: Optional[str] = None
+
+    # Logging
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_console_format: str = "text"
+    log_file: str = "recapflow.log"
+    log_max_bytes: int = 10 * MiB
+    log_backup_count: int = 5
+    log_rotate_when: str = ""
+    log_queue_size: int = 10000
+    log_debug_sample: int = 1
+
+    # AI provider, quotas and retries
+    ai_provider: str = "gemini"
+    ai_stub_latency: float = 0.05
+    ai_stub_response_chars: int = 0
+    gemini_max_concurrency: int = 8
+    gemini_timeout: float = 60
+    gemini_max_retries: int = 3
+    gemini_retry_base_delay: float = 1
+    gemini_retry_max_delay: float = 30
+    gemini_background_reserve: float = 0.2
+    gemini_rpm: float = 1000
+    gemini_tpm: float = 1000000
+    gemini_breaker_threshold: int = 5
+    gemini_breaker_cooldown: float = 30
+
+    # Model routing
+    ai_model_fast: str = "gemini-2.5-flash-lite"
+    ai_model_strong: str = "gemini-2.5-flash"
+    ai_routing_threshold: int = 4000
+    ai_routing_latency_budget: float = 20
+    ai_routing_latency_window: float = 300
+    ai_fallback_enabled: bool = True
+    ai_model_prices: str = ""
+
+    # Summarization, admission and compaction
+    summary_chunk_tokens: int = 6000
+    summary_chunk_fanout: int = 4
+    summary_chunk_threshold: int = 12000
+    token_estimate_ratio: float = 1.3
+    token_estimate_cache_size: int = 4096
+    admission_max_prompt_tokens: int = 200000
+    admission_max_request_tokens: int = 1000000
+    client_token_budget: float = 0
+    client_budget_window: float = 3600
+    client_budget_max_clients: int = 10000
+    compaction_enabled: bool = True
+    compaction_steps: Optional[str] = None
+
+    # Response cache and transcript contexts
+    summary_cache_enabled: bool = True
+    summary_cache_max_bytes: int = 32 * MiB
+    summary_cache_ttl: float = 3600
+    summary_cache_db: Optional[str] = None
+    summary_cache_db_max_bytes: int = 256 * MiB
+    context_cache_enabled: bool = False
+    context_cache_ttl: float = 900
+    context_cache_idle_ttl: float = 300
+    context_cache_min_tokens: int = 2048
+    context_cache_max_entries: int = 100
+
+    # Batches, uploads and the transcript store
+    summary_batch_rpm: float = 60
+    summary_batch_max_items: int = 500
+    summary_batch_concurrency: int = 4
+    upload_max_bytes: int = 10 * MiB
+    transcript_store_max_bytes: int = 128 * MiB
+    transcript_store_ttl: float = 86400
+    transcript_store_db: Optional[str] = None
+    transcript_store_dir: Optional[str] = None
+
+    # Speculative rephrasing, near-duplicates and live sessions
+    rephrase_precompute_enabled: bool = False
+    rephrase_precompute_styles: Optional[str] = None
+    rephrase_precompute_ttl: float = 3600
+    rephrase_precompute_tpm: float = 100000
+    rephrase_precompute_concurrency: int = 4
+    rephrase_precompute_max_bytes: int = 16 * MiB
+    near_duplicate_enabled: bool = False
+    near_duplicate_capacity: int = 100000
+    near_duplicate_threshold: float = 0.8
+    near_duplicate_max_diff_ratio: float = 0.2
+    live_summary_interval: float = 10
+    live_session_max_chars: int = 10 * MiB
+
+    # Email
+    email_address: Optional[str] = None
+    email_password: Optional[str] = None
+    smtp_server: str = "smtp.gmail.com"
+    smtp_port: int = 587
+    smtp_starttls: bool = True
+    smtp_pool_size: int = 4
+    smtp_pool_idle_timeout: float = 60
+    email_fanout_batch_size: int = 50
+    email_render_cache_bytes: int = 4 * MiB
+    email_queue_workers: int = 2
+    email_queue_batch_size: int = 10
+    email_queue_max_attempts: int = 5
+    email_queue_retry_delay: float = 2
+    email_queue_max_jobs: int = 10000
+    email_queue_poll_interval: float = 0.5
+    email_queue_claim_timeout: float = 300
+    email_queue_db: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """
+        Parse settings from the environment
+
+        Raises:
+            ValueError: If a variable does not parse as its setting's type
+        """
+        values = {}
+        for field in dataclasses.fields(cls):
+            name = field.name.upper()
+            raw = os.environ.get(name)
+            if raw is None:
+                continue
+            try:
+                if field.type is bool:
+                    values[field.name] = raw.strip().lower() == "true"
+                elif field.type is int:
+                    values[field.name] = int(raw)
+                elif field.type is float:
+                    values[field.name] = float(raw)
+                elif field.type == Optional[str]:
+                    values[field.name] = raw or None
+                else:
+                    values[field.name] = raw
+            except ValueError as e:
+                raise ValueError(f"Invalid {name}: {raw!r}") from e
+        return cls(**values)
+
+_settings: Optional[Settings] = None
+
+def get_settings() -> Settings:
+    """
+    The process-wide settings
+
+    Parsed from the environment on first use, after ``load_config``, and
+    shared by every later call.
+    """
+    global _settings
+    if _settings is None:
+        load_config()
+        _settings = Settings.from_env()
+    return _settings
+
+def reset_settings() -> None:
+    """Parse the environment again on the next ``get_settings``, e.g. after changing it"""
+    global _settings
+    _settings = None
@@ -0,0 +1,165 @@
+"""
+Contexts Module for RecapFlow
+Uploads a transcript to the provider once and lets every later prompt about
+it (default summary, custom prompts, follow-ups) reference it instead of
+re-sending the full text
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from config import get_settings
+from metrics import CONTEXT_CACHE, CONTEXT_CACHE_ENTRIES
+from store import make_id
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.Contexts")
+
+# Contexts this close to expiry are not handed out, so a call does not race the TTL
+EXPIRY_MARGIN = 30.0
+
+class ContextManager:
+    """
+    Provider-side contexts keyed by transcript content and model
+
+    ``acquire`` returns the name of a live context for a transcript,
+    creating it on first use; concurrent requests for the same transcript
+    share one upload. Contexts are model-specific, so a fallback to another
+    model gets its own. Transcripts under ``min_tokens`` are not worth a
+    context and get None, as does any transcript whose upload fails; callers
+    then send the full prompt. Upstream storage is billed for as long as a
+    context lives, so a background sweep deletes contexts unused for
+    ``idle_ttl`` seconds, ``max_entries`` caps how many exist at once, and
+    ``stop`` deletes the rest.
+    """
+
+    def __init__(self, provider, estimator):
+        """
+        Read context configuration from environment
+
+        Args:
+            provider (Provider): Provider the contexts are created with
+            estimator (TokenEstimator): Sizes transcripts against ``min_tokens``
+        """
+        self.provider = provider
+        self.estimator = estimator
+        settings = get_settings()
+        self.ttl = settings.context_cache_ttl
+        self.idle_ttl = settings.context_cache_idle_ttl
+        self.min_tokens = settings.context_cache_min_tokens
+        self.max_entries = settings.context_cache_max_entries
+        # (content id, model) -> {"name", "expires_at", "last_used"}
+        self._contexts: Dict[Tuple[str, str], dict] = {}
+        # Uploads in flight, shared by concurrent requests for the same transcript
+        self._uploads: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        CONTEXT_CACHE_ENTRIES.set_function(lambda: len(self._contexts))
+        logger.info(f"📎 Context caching enabled - ttl: {self.ttl:.0f}s, idle: {self.idle_ttl:.0f}s, min: {self.min_tokens} tokens")
+
+    def accepts(self, content: str) -> bool:
+        """Whether ``content`` is large enough to be worth a context"""
+        return self.estimator.estimate(content) >= self.min_tokens
+
+    def start(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def acquire(self, content: str, model: str) -> Optional[str]:
+        """
+        Name of a live context holding ``content`` for ``model``
+
+        Returns:
+            str: Context name, or None if the content is too small or the upload failed
+        """
+        if not self.accepts(content):
+            return None
+        key = (make_id(content), model)
+        now = time.monotonic()
+        entry = self._contexts.get(key)
+        if entry is not None and entry["expires_at"] - EXPIRY_MARGIN > now:
+            entry["last_used"] = now
+            CONTEXT_CACHE.inc(outcome="reused")
+            return entry["name"]
+        task = self._uploads.get(key)
+        if task is None:
+            task = self._uploads[key] = asyncio.create_task(self._create(key, content))
+            task.add_done_callback(lambda done: self._upload_done(key, done))
+        try:
+            # Shielded so one client disconnecting does not cancel the upload for others
+            name = await asyncio.shield(task)
+        except Exception as e:
+            CONTEXT_CACHE.inc(outcome="failed")
+            logger.warning(f"⚠️ Context upload to {model} failed, sending the full prompt: {type(e).__name__}: {e}")
+            return None
+        return name
+
+    def _upload_done(self, key: Tuple[str, str], task: asyncio.Task) -> None:
+        self._uploads.pop(key, None)
+        if not task.cancelled():
+            # Retrieved here too, in case every waiter was cancelled
+            task.exception()
+
+    async def _create(self, key: Tuple[str, str], content: str) -> str:
+        if len(self._contexts) >= self.max_entries:
+            oldest = min(self._contexts, key=lambda k: self._contexts[k]["last_used"])
+            await self._delete(oldest)
+        start = time.perf_counter()
+        name = await self.provider.create_context(key[1], content, self.ttl)
+        now = time.monotonic()
+        self._contexts[key] = {"name": name, "expires_at": now + self.ttl, "last_used": now}
+        CONTEXT_CACHE.inc(outcome="created")
+        logger.info(f"📎 Created context for {key[1]} - {len(content)} chars in {time.perf_counter() - start:.2f}s")
+        return name
+
+    def holds(self, content: str, model: str) -> bool:
+        """Whether a live context for ``content`` and ``model`` exists"""
+        entry = self._contexts.get((make_id(content), model))
+        return entry is not None and entry["expires_at"] > time.monotonic()
+
+    def invalidate(self, content: str, model: str) -> None:
+        """Forget a context the provider reported as gone"""
+        if self._contexts.pop((make_id(content), model), None) is not None:
+            CONTEXT_CACHE.inc(outcome="expired")
+
+    async def _delete(self, key: Tuple[str, str]) -> None:
+        entry = self._contexts.pop(key, None)
+        if entry is None or entry["expires_at"] <= time.monotonic():
+            return
+        try:
+            await self.provider.delete_context(entry["name"])
+            CONTEXT_CACHE.inc(outcome="deleted")
+        except Exception as e:
+            # It still expires upstream on its own
+            logger.warning(f"⚠️ Failed to delete context {entry['name']}: {e}")
+
+    async def sweep(self) -> int:
+        """Delete contexts idle for longer than ``idle_ttl`` or already expired"""
+        now = time.monotonic()
+        stale = [
+            key for key, entry in self._contexts.items()
+            if now - entry["last_used"] > self.idle_ttl or entry["expires_at"] <= now
+        ]
+        for key in stale:
+            await self._delete(key)
+        if stale:
+            logger.debug("🧹 Swept %d idle contexts", len(stale))
+        return len(stale)
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, min(60.0, self.idle_ttl / 2)))
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning(f"⚠️ Context sweep failed: {e}")
+
+    async def stop(self) -> None:
+        """Stop the sweep and delete every context still alive upstream"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        for key in list(self._contexts):
+            await self._delete(key)
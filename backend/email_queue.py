@@ -0,0 +1,366 @@
+"""
+Email Queue Module for RecapFlow
+Background dispatch of summary emails with batching, retries and job status
+"""
+
+import asyncio
+import json
+import logging
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from config import get_settings
+from emailer import delivery_report
+from metrics import EMAIL_QUEUE_DEPTH
+from shared_state import get_shared_state
+from smtp_pool import is_transient
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.EmailQueue")
+
+# Job states
+QUEUED = "queued"
+SENDING = "sending"
+RETRYING = "retrying"
+SENT = "sent"
+PARTIAL = "partial"
+FAILED = "failed"
+
+FINISHED_STATES = (SENT, PARTIAL, FAILED)
+
+class JobStore:
+    """
+    Optional SQLite persistence for email jobs so queued mail survives restarts
+    """
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS email_jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, job TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def save(self, job: dict) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO email_jobs (id, status, job, updated) VALUES (?, ?, ?, ?)",
+                (job["id"], job["status"], json.dumps(job), job["updated_at"])
+            )
+            self._db.commit()
+
+    def load_pending(self) -> list:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT job FROM email_jobs WHERE status NOT IN (?, ?, ?) ORDER BY updated",
+                FINISHED_STATES
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def load(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT job FROM email_jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+class EmailQueue:
+    """
+    In-process asyncio job queue in front of RecapFlowEmailer
+
+    ``enqueue`` returns a job id immediately. Worker tasks take up to
+    ``batch_size`` jobs at a time and send them concurrently over the
+    emailer's SMTP pool, retrying transient failures with jittered
+    exponential backoff.
+
+    With a shared state backend the queue itself is shared: jobs are
+    stored there, any worker process may claim them, and job status can be
+    polled from any worker. Jobs left in flight by a crashed worker are
+    claimed again after ``claim_timeout`` seconds.
+    """
+
+    def __init__(self, emailer):
+        """Read queue configuration from settings"""
+        self.emailer = emailer
+        settings = get_settings()
+        self.workers = settings.email_queue_workers
+        self.batch_size = settings.email_queue_batch_size
+        self.max_attempts = settings.email_queue_max_attempts
+        self.retry_delay = settings.email_queue_retry_delay
+        self.max_jobs = settings.email_queue_max_jobs
+        self.poll_interval = settings.email_queue_poll_interval
+        self.claim_timeout = settings.email_queue_claim_timeout
+        self.shared = get_shared_state()
+        db_path = settings.email_queue_db
+        # The shared queue is durable already
+        self.store = JobStore(db_path) if db_path and self.shared is None else None
+
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._jobs: OrderedDict = OrderedDict()
+        self._tasks = []
+        self._retry_timers = {}
+        # Shared mode: wakes this process's workers when it enqueues, instead of waiting for the next poll
+        self._wakeup = asyncio.Event()
+        self._inflight = 0
+        self._shared_ready = 0
+        EMAIL_QUEUE_DEPTH.set_function(self.depth)
+        logger.info(f"📬 Email queue configured - workers: {self.workers}, batch size: {self.batch_size}, durable: {bool(self.store or self.shared)}, shared: {self.shared is not None}")
+
+    async def start(self) -> None:
+        """Start worker tasks, re-queueing unfinished jobs from the durable store"""
+        if self.shared is not None:
+            stale = await asyncio.to_thread(self.shared.requeue_stale, self.claim_timeout)
+            if stale:
+                logger.info(f"📬 Requeued {stale} email jobs abandoned by another worker")
+            self._tasks = [asyncio.create_task(self._shared_worker(i)) for i in range(self.workers)]
+            return
+        if self.store:
+            pending = await asyncio.to_thread(self.store.load_pending)
+            for job in pending:
+                job["status"] = QUEUED
+                self._jobs[job["id"]] = job
+                self._queue.put_nowait(job["id"])
+            if pending:
+                logger.info(f"📬 Restored {len(pending)} unfinished email jobs")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Wait up to ``timeout`` seconds for queued jobs and pending retries, then stop workers"""
+        try:
+            await asyncio.wait_for(self._drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Email queue not drained after {timeout}s - {self.depth()} jobs left, {len(self._retry_timers)} waiting to retry")
+            if self._retry_timers and not self.store and self.shared is None:
+                logger.error(f"❌ Dropping {len(self._retry_timers)} email jobs waiting to retry - set EMAIL_QUEUE_DB to keep them across restarts")
+        for timer in self._retry_timers.values():
+            timer.cancel()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.store:
+            self.store.close()
+
+    async def enqueue(self, payload: dict) -> str:
+        """
+        Queue an email for delivery
+
+        Args:
+            payload (dict): Keyword arguments for ``RecapFlowEmailer.deliver``,
+                plus ``fanout`` (and optionally ``batch_size``) to send through
+                ``RecapFlowEmailer.deliver_fanout`` instead
+
+        Returns:
+            str: Job id to poll with ``get``
+        """
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": QUEUED,
+            "attempts": 0,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "payload": payload,
+        }
+        if self.shared is not None:
+            job["available_at"] = now
+            await self._persist(job)
+            self._wakeup.set()
+            logger.info(f"📬 Email job queued - id: {job['id']}, recipients: {len(payload['recipients'])}, shared queue")
+            return job["id"]
+        self._jobs[job["id"]] = job
+        self._prune()
+        await self._persist(job)
+        self._queue.put_nowait(job["id"])
+        logger.info(f"📬 Email job queued - id: {job['id']}, recipients: {len(payload['recipients'])}, queue depth: {self._queue.qsize()}")
+        return job["id"]
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """Return a job's public status, or None if unknown"""
+        if self.shared is not None:
+            # Another worker may be sending it; the shared copy is authoritative
+            job = await asyncio.to_thread(self.shared.load_job, job_id)
+        else:
+            job = self._jobs.get(job_id)
+            if job is None and self.store:
+                job = await asyncio.to_thread(self.store.load, job_id)
+        if job is None:
+            return None
+        return {key: value for key, value in job.items() if key != "payload"}
+
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker"""
+        if self.shared is not None:
+            return self._shared_ready
+        return self._queue.qsize()
+
+    async def _drain(self) -> None:
+        """Return once no job is queued, being sent or waiting to retry"""
+        if self.shared is None:
+            # A retry timer puts its job back on the queue when it fires
+            while True:
+                await self._queue.join()
+                if not self._retry_timers:
+                    return
+                await asyncio.sleep(self.poll_interval)
+        while self._inflight or await asyncio.to_thread(self.shared.ready_jobs):
+            await asyncio.sleep(self.poll_interval)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await asyncio.gather(*(self._send(job_id) for job_id in batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _shared_worker(self, index: int) -> None:
+        """Claim batches from the shared queue, polling while it is empty"""
+        while True:
+            try:
+                jobs = await asyncio.to_thread(self.shared.claim_jobs, self.batch_size)
+            except Exception as e:
+                logger.error(f"❌ Email worker {index} could not claim jobs: {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if not jobs:
+                self._shared_ready = 0
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if len(jobs) == self.batch_size:
+                self._shared_ready = await asyncio.to_thread(self.shared.ready_jobs)
+            self._inflight += len(jobs)
+            for job in jobs:
+                self._jobs[job["id"]] = job
+            try:
+                await asyncio.gather(*(self._send(job["id"]) for job in jobs))
+            finally:
+                for job in jobs:
+                    self._jobs.pop(job["id"], None)
+                self._inflight -= len(jobs)
+
+    async def _send(self, job_id: str) -> None:
+        """Send one job; an unexpected error fails the job instead of the worker"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        try:
+            if job["payload"].get("fanout"):
+                await self._send_fanout(job)
+            else:
+                await self._send_single(job)
+        except Exception as e:
+            job["error"] = f"{type(e).__name__}: {e}"
+            logger.exception(f"❌ Email job {job_id} failed unexpectedly: {e}")
+            try:
+                await self._update(job, FAILED)
+            except Exception as persist_error:
+                # Still failed in memory; a shared copy left "sending" is reclaimed after claim_timeout
+                logger.error(f"❌ Could not record failure of email job {job_id}: {persist_error}")
+
+    async def _send_single(self, job: dict) -> None:
+        """Send a job to all recipients in one message, retrying transient failures"""
+        job_id = job["id"]
+        job["attempts"] += 1
+        await self._update(job, SENDING)
+        try:
+            refused = await self.emailer.deliver(**job["payload"])
+        except smtplib.SMTPRecipientsRefused as e:
+            # Every recipient was refused; reported per recipient like a partial refusal
+            refused = e.recipients
+        except Exception as e:
+            job["error"] = f"{type(e).__name__}: {e}"
+            if is_transient(e) and job["attempts"] < self.max_attempts:
+                delay = self.retry_delay * 2 ** (job["attempts"] - 1) * random.uniform(0.5, 1.0)
+                logger.warning(f"⚠️ Email job {job_id} failed (attempt {job['attempts']}), retrying in {delay:.1f}s: {e}")
+                self._schedule_retry(job, delay)
+                await self._update(job, RETRYING)
+            else:
+                logger.error(f"❌ Email job {job_id} failed after {job['attempts']} attempts: {e}")
+                await self._update(job, FAILED)
+            return
+
+        job["error"] = None
+        job["report"] = delivery_report(job["payload"]["recipients"], refused or {})
+        await self._finish(job)
+
+    async def _send_fanout(self, job: dict) -> None:
+        """Send a fan-out job, retrying only recipients with transient failures"""
+        job_id = job["id"]
+        payload = {key: value for key, value in job["payload"].items() if key != "fanout"}
+        payload["recipients"] = job.get("pending") or payload["recipients"]
+        job["attempts"] += 1
+        await self._update(job, SENDING)
+
+        report = await self.emailer.deliver_fanout(**payload)
+        job.setdefault("report", {}).update(report)
+        retry = [recipient for recipient, entry in report.items() if entry["status"] != "sent" and entry.get("retryable")]
+
+        if retry and job["attempts"] < self.max_attempts:
+            job["pending"] = retry
+            delay = self.retry_delay * 2 ** (job["attempts"] - 1) * random.uniform(0.5, 1.0)
+            logger.warning(f"⚠️ Email job {job_id}: {len(retry)} recipients failed transiently, retrying in {delay:.1f}s")
+            self._schedule_retry(job, delay)
+            await self._update(job, RETRYING)
+            return
+
+        job.pop("pending", None)
+        await self._finish(job)
+
+    async def _finish(self, job: dict) -> None:
+        """Record a job as sent, partial or failed from its delivery report"""
+        delivered = sum(1 for entry in job["report"].values() if entry["status"] == "sent")
+        if delivered == len(job["report"]):
+            status = SENT
+        elif delivered:
+            status = PARTIAL
+        else:
+            status = FAILED
+        logger.info(f"📬 Email job {job['id']} finished - {status}, delivered: {delivered}/{len(job['report'])}, attempts: {job['attempts']}")
+        await self._update(job, status)
+
+    def _schedule_retry(self, job: dict, delay: float) -> None:
+        if self.shared is not None:
+            # Claimable again, by any worker, once the delay has passed
+            job["available_at"] = time.time() + delay
+            return
+        self._retry_timers[job["id"]] = asyncio.get_running_loop().call_later(delay, self._requeue, job["id"])
+
+    def _requeue(self, job_id: str) -> None:
+        self._retry_timers.pop(job_id, None)
+        self._queue.put_nowait(job_id)
+
+    async def _update(self, job: dict, status: str) -> None:
+        job["status"] = status
+        job["updated_at"] = time.time()
+        await self._persist(job)
+
+    async def _persist(self, job: dict) -> None:
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.save_job, job)
+        elif self.store:
+            await asyncio.to_thread(self.store.save, job)
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs once more than ``max_jobs`` are tracked"""
+        if len(self._jobs) <= self.max_jobs:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job["status"] in FINISHED_STATES]:
+            if len(self._jobs) <= self.max_jobs:
+                break
+            del self._jobs[job_id]
@@ -7,10 +7,8 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import List
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+from config import get_settings
 
 class EmailService:
     """
@@ -18,10 +16,11 @@ class EmailService:
     """
     
     def __init__(self):
-        self.smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-        self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
-        self.email_address = os.getenv("EMAIL_ADDRESS")
-        self.email_password = os.getenv("EMAIL_PASSWORD")
+        settings = get_settings()
+        self.smtp_server = settings.smtp_server
+        self.smtp_port = settings.smtp_port
+        self.email_address = settings.email_address
+        self.email_password = settings.email_password
     
     async def test_email_connection(self) -> bool:
         """
@@ -3,69 +3,285 @@ Email Module for RecapFlow
 Handles sending summarized transcripts via SMTP (Gmail)
 """
 
-import os
+import asyncio
 import smtplib
 import logging
 import time
 import re
+import html
+import hashlib
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-from typing import List
-from dotenv import load_dotenv
+from typing import List, Optional
+
+from cachetools import LRUCache
+
+from config import get_settings
+from smtp_pool import SMTPConnectionPool, is_transient
 
 # Configure logger for email service
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# Markdown patterns are compiled once at import time. They run on text that
+# has already been HTML-escaped, so ">" appears as "&gt;"
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+LIST_ITEM_PATTERN = re.compile(r'^(\s*)(?:([-*+])|(\d{1,9})[.)])\s+(.*)$')
+RULE_PATTERN = re.compile(r'^\s*(?:(?:\*\s*){3,}|(?:-\s*){3,}|(?:_\s*){3,})$')
+QUOTE_PATTERN = re.compile(r'^\s*&gt;\s?(.*)$')
+TABLE_SEPARATOR_PATTERN = re.compile(r'^\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$')
+TABLE_CELL_SPLIT = re.compile(r'(?<!\\)\|')
+
+# One alternation tokenizes every inline construct in a single scan; the
+# first matching group decides the construct and code spans win over emphasis.
+# No construct spans a newline, so rendering keeps the line structure intact.
+# Link URLs may contain balanced parentheses, so a disallowed URL such as
+# "javascript:alert(1)" is dropped whole rather than leaving a stray ")".
+# Every branch starts with a literal so the regex engine can skip ahead to
+# candidate characters instead of trying each branch at every position.
+INLINE_PATTERN = re.compile(
+    r'\\(?P<escaped>[\\`*_{}\[\]()#+\-.!|~])'
+    r'|`(?P<code>[^`\n]+)`'
+    r'|\*\*(?P<strong>.+?)\*\*'
+    r'|__(?P<strong_alt>.+?)__'
+    r'|~~(?P<strike>.+?)~~'
+    r'|\*(?P<em>[^*\s](?:[^*\n]*[^*\s])?)\*'
+    r'|_(?<!\w_)(?P<em_alt>[^_\s](?:[^_\n]*[^_\s])?)_(?!\w)'
+    r'|\[(?P<link_text>[^\]\n]+)\]\((?P<link_url>(?:[^()\s]|\([^()\s]*\))+)\)'
+)
+INLINE_TRIGGER = re.compile(r'[\\`*_~\[]')
+SAFE_URL_PATTERN = re.compile(r'^(?:https?:|mailto:)', re.IGNORECASE)
+
+# First characters that can start a block construct other than a paragraph
+BLOCK_MARKERS = frozenset('#-*+_|&`~0123456789')
+
+CODE_STYLE = 'background-color: #f1f1f1; padding: 2px 4px; border-radius: 3px;'
+PRE_STYLE = 'background-color: #f1f1f1; padding: 8px; border-radius: 3px; white-space: pre-wrap;'
+TABLE_STYLE = 'border-collapse: collapse; margin: 8px 0;'
+CELL_STYLE = 'border: 1px solid #ddd; padding: 4px 8px; text-align: left;'
+QUOTE_STYLE = 'border-left: 3px solid #ddd; margin: 8px 0; padding-left: 12px; color: #555;'
+
+def _render_inline_match(match) -> str:
+    kind = match.lastgroup
+    if kind == 'escaped':
+        # Emit an entity so the literal cannot be read as block syntax later
+        return f'&#{ord(match.group("escaped"))};'
+    if kind == 'code':
+        return f'<code style="{CODE_STYLE}">{match.group("code")}</code>'
+    if kind in ('strong', 'strong_alt'):
+        return f'<strong>{_render_inline(match.group(kind))}</strong>'
+    if kind == 'strike':
+        return f'<del>{_render_inline(match.group("strike"))}</del>'
+    if kind in ('em', 'em_alt'):
+        return f'<em>{_render_inline(match.group(kind))}</em>'
+    label = _render_inline(match.group('link_text'))
+    url = match.group('link_url')
+    if SAFE_URL_PATTERN.match(url):
+        return f'<a href="{url.replace(chr(34), "&quot;")}">{label}</a>'
+    return label
+
+def _render_inline(text: str) -> str:
+    """Render inline markdown in already HTML-escaped text"""
+    if not INLINE_TRIGGER.search(text):
+        return text
+    return INLINE_PATTERN.sub(_render_inline_match, text)
 
-def markdown_to_html(text):
+def _table_cells(line: str, cell_tag: str) -> str:
+    """Split an escaped (not yet inline-rendered) table row and render each cell"""
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|'):
+        line = line[:-1]
+    # As in GFM, "\|" is a literal pipe in a cell, code spans included
+    cells = (_render_inline(cell.strip().replace('\\|', '|')) for cell in TABLE_CELL_SPLIT.split(line))
+    return ''.join(f'<{cell_tag} style="{CELL_STYLE}">{cell}</{cell_tag}>' for cell in cells)
+
+def render_markdown(text: str) -> str:
     """
-    Convert basic markdown to HTML for email rendering
+    Convert markdown to HTML for email rendering
+    
+    Supports headings, nested ordered/unordered lists, tables, fenced code,
+    blockquotes, horizontal rules and inline emphasis, code and links. The
+    input is HTML-escaped and inline-rendered as a whole (table rows cell by
+    cell), then block structure is emitted in a single pass over the lines.
+    Unindented bullets and plain paragraphs, most of a summary, are
+    recognized with string checks instead of the block patterns.
     """
     if not text:
         return ""
     
-    # Convert markdown to HTML
-    html = text
-    
-    # Headers
-    html = re.sub(r'^### (.*$)', r'<h3>\1</h3>', html, flags=re.MULTILINE)
-    html = re.sub(r'^## (.*$)', r'<h2>\1</h2>', html, flags=re.MULTILINE)
-    html = re.sub(r'^# (.*$)', r'<h1>\1</h1>', html, flags=re.MULTILINE)
-    
-    # Bold and italic
-    html = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', html)
-    html = re.sub(r'\*(.*?)\*', r'<em>\1</em>', html)
-    
-    # Code (inline)
-    html = re.sub(r'`(.*?)`', r'<code style="background-color: #f1f1f1; padding: 2px 4px; border-radius: 3px;">\1</code>', html)
-    
-    # Unordered lists
-    lines = html.split('\n')
-    in_list = False
-    result_lines = []
-    
-    for line in lines:
-        line = line.strip()
-        if line.startswith('- ') or line.startswith('* ') or line.startswith('+ '):
-            if not in_list:
-                result_lines.append('<ul>')
-                in_list = True
-            result_lines.append(f'<li>{line[2:]}</li>')
+    escaped = html.escape(text, quote=False)
+    # Fenced code is taken from the escaped lines, everything else from the rendered ones
+    raw_lines = escaped.split('\n')
+    lines = _render_inline(escaped).split('\n') if INLINE_TRIGGER.search(escaped) else raw_lines
+    line_count = len(lines)
+    out = []
+    append = out.append
+    # Open lists as (tag, indent), innermost last
+    list_stack = []
+
+    def close_lists(indent: int = -1) -> None:
+        while list_stack and list_stack[-1][1] > indent:
+            append(f'</li></{list_stack.pop()[0]}>')
+
+    i = 0
+    while i < line_count:
+        raw = raw_lines[i]
+        body = raw.lstrip()
+        i += 1
+
+        if not body:
+            continue
+
+        line = lines[i - 1].rstrip()
+        marker = body[0]
+        if marker not in BLOCK_MARKERS:
+            if list_stack and line[0].isspace():
+                # Indented text directly under a list item continues that item
+                append(f'<br>{line.lstrip()}')
+                continue
+            if list_stack:
+                close_lists()
+            append(f'<p>{line.lstrip()}</p>')
+            continue
+
+        # A rule consists of nothing but its marker and whitespace
+        is_rule = marker in '-*_' and not body.replace(marker, '').strip() and RULE_PATTERN.match(raw)
+        item = None
+        if is_rule:
+            pass
+        elif marker in '-*+' and line[0] == marker and line[1:2].isspace():
+            # Unindented bullet, as the pattern below would parse it
+            item = ('', marker, None, line[1:].lstrip())
+        elif marker in '-*+0123456789':
+            item = LIST_ITEM_PATTERN.match(line)
+            item = item and item.groups()
+        if item:
+            prefix, bullet, start, content = item
+            indent = len(prefix.expandtabs(4)) if '\t' in prefix else len(prefix)
+            tag = 'ol' if start else 'ul'
+            if list_stack and list_stack[-1][1] > indent:
+                close_lists(indent)
+            if list_stack and list_stack[-1][1] == indent:
+                if list_stack[-1][0] == tag:
+                    append(f'</li><li>{content}')
+                    continue
+                close_lists(indent - 1)
+            start_attr = f' start="{int(start)}"' if start and int(start) != 1 else ''
+            append(f'<{tag}{start_attr}><li>{content}')
+            list_stack.append((tag, indent))
+            continue
+
+        stripped = line.lstrip()
+        if list_stack and line[0].isspace() and not is_rule:
+            append(f'<br>{stripped}')
+            continue
+        if list_stack:
+            close_lists()
+
+        heading = HEADING_PATTERN.match(stripped) if marker == '#' else None
+        if heading:
+            level = len(heading.group(1))
+            append(f'<h{level}>{heading.group(2)}</h{level}>')
+        elif is_rule:
+            append('<hr>')
+        elif body.startswith(('```', '~~~')):
+            fence = body[:3]
+            code = []
+            while i < line_count and not raw_lines[i].lstrip().startswith(fence):
+                code.append(raw_lines[i])
+                i += 1
+            i += 1
+            code_html = '\n'.join(code)
+            append(f'<pre style="{PRE_STYLE}"><code>{code_html}</code></pre>')
+        elif '|' in raw and i < line_count and TABLE_SEPARATOR_PATTERN.match(raw_lines[i]):
+            # Cells come from the escaped lines so an inline span cannot cross a "|"
+            header = _table_cells(raw, 'th')
+            i += 1
+            rows = []
+            while i < line_count and '|' in raw_lines[i]:
+                rows.append(f'<tr>{_table_cells(raw_lines[i], "td")}</tr>')
+                i += 1
+            append(f'<table style="{TABLE_STYLE}"><thead><tr>{header}</tr></thead><tbody>{"".join(rows)}</tbody></table>')
+        elif marker == '&' and QUOTE_PATTERN.match(stripped):
+            quoted = [QUOTE_PATTERN.match(stripped).group(1)]
+            while i < line_count and QUOTE_PATTERN.match(lines[i]):
+                quoted.append(QUOTE_PATTERN.match(lines[i]).group(1))
+                i += 1
+            append(f'<blockquote style="{QUOTE_STYLE}">{"<br>".join(quoted)}</blockquote>')
         else:
-            if in_list:
-                result_lines.append('</ul>')
-                in_list = False
-            if line:  # Only add non-empty lines
-                result_lines.append(f'<p>{line}</p>')
-    
-    if in_list:
-        result_lines.append('</ul>')
+            append(f'<p>{stripped}</p>')
+
+    close_lists()
+    return '\n'.join(out)
+
+# Rendered summaries keyed by a digest of their markdown, bounded by rendered size;
+# created on first use, once settings are loaded
+_render_cache: Optional[LRUCache] = None
+_render_lock = threading.Lock()
+
+def _get_render_cache() -> LRUCache:
+    """The render cache, created on first use; call with ``_render_lock`` held"""
+    global _render_cache
+    if _render_cache is None:
+        _render_cache = LRUCache(maxsize=get_settings().email_render_cache_bytes, getsizeof=len)
+    return _render_cache
+
+def markdown_to_html(text: str) -> str:
+    """
+    ``render_markdown``, cached so repeated sends of a summary skip rendering
     
-    return '\n'.join(result_lines)
+    Entries are keyed by a BLAKE2b digest of the summary rather than the
+    summary itself, and the cache holds at most ``EMAIL_RENDER_CACHE_BYTES``
+    characters of rendered HTML.
+    """
+    if not text:
+        return ""
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    with _render_lock:
+        rendered = _get_render_cache().get(key)
+    if rendered is None:
+        rendered = render_markdown(text)
+        with _render_lock:
+            cache = _get_render_cache()
+            # Renders larger than the whole budget are simply not kept
+            if len(rendered) <= cache.maxsize:
+                cache[key] = rendered
+    return rendered
+
+def clear_render_cache() -> None:
+    """Drop every cached render"""
+    with _render_lock:
+        if _render_cache is not None:
+            _render_cache.clear()
+
+def delivery_report(recipients: List[str], refused: dict) -> dict:
+    """
+    Delivery report entries for recipients of a message the server accepted
+
+    Args:
+        recipients (List[str]): Recipients the message was sent to
+        refused (dict): Recipients the server refused, as returned by smtplib
+
+    Returns:
+        dict: Each recipient mapped to ``status`` ``sent`` or ``refused``,
+        plus ``error`` and ``retryable`` for refused ones
+    """
+    report = {}
+    for recipient in recipients:
+        if recipient in refused:
+            code, message = refused[recipient]
+            report[recipient] = {
+                "status": "refused",
+                "error": f"{code} {message.decode(errors='replace') if isinstance(message, bytes) else message}",
+                "retryable": 400 <= code < 500
+            }
+        else:
+            report[recipient] = {"status": "sent"}
+    return report
 
 class RecapFlowEmailer:
     """
@@ -73,13 +289,14 @@ class RecapFlowEmailer:
     """
     
     def __init__(self):
-        """Initialize email configuration from environment variables"""
+        """Initialize email configuration from settings"""
         logger.info("📧 Initializing RecapFlow emailer service")
         
-        self.smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-        self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
-        self.email_address = os.getenv("EMAIL_ADDRESS")
-        self.email_password = os.getenv("EMAIL_PASSWORD")
+        settings = get_settings()
+        self.smtp_server = settings.smtp_server
+        self.smtp_port = settings.smtp_port
+        self.email_address = settings.email_address
+        self.email_password = settings.email_password
         
         logger.debug(f"SMTP configuration - server: {self.smtp_server}:{self.smtp_port}")
         
@@ -87,7 +304,160 @@ class RecapFlowEmailer:
             logger.error("❌ Email credentials missing from environment variables")
             raise ValueError("EMAIL_ADDRESS and EMAIL_PASSWORD must be set in environment variables")
         
+        # Authenticated sessions are reused across emails instead of reconnecting per send
+        self.pool = SMTPConnectionPool(
+            host=self.smtp_server,
+            port=self.smtp_port,
+            username=self.email_address,
+            password=self.email_password,
+            max_size=settings.smtp_pool_size,
+            idle_timeout=settings.smtp_pool_idle_timeout,
+            # Only disable for local relays and test sinks that do not offer TLS
+            starttls=settings.smtp_starttls
+        )
+        # Recipients per message in fan-out mode (1 sends one email per recipient)
+        self.fanout_batch_size = settings.email_fanout_batch_size
+        
         logger.info(f"✅ Email service initialized - sender: {self.email_address}")
+
+    async def close(self) -> None:
+        """Close pooled SMTP sessions"""
+        await self.pool.close()
+
+    async def warm_up(self) -> None:
+        """Open an SMTP session ahead of the first email"""
+        start = time.time()
+        await self.pool.warm_up()
+        logger.info(f"🔥 SMTP session warmed up in {time.time() - start:.2f}s")
+    
+    def create_message(
+        self,
+        recipients: List[str],
+        summary: str,
+        subject: str = "Meeting Summary - RecapFlow",
+        original_transcript: str = None,
+        sender_details: dict = None
+    ) -> MIMEMultipart:
+        """
+        Build the summary email
+        
+        Args:
+            recipients (List[str]): List of recipient email addresses
+            summary (str): The AI-generated summary
+            subject (str): Email subject line
+            original_transcript (str, optional): Original transcript for reference
+            sender_details (dict, optional): Sender contact information
+            
+        Returns:
+            MIMEMultipart: Message ready to send
+        """
+        body = self._create_email_body(summary, sender_details)
+        return self._build_message(recipients, subject, body, original_transcript)
+
+    def _build_message(self, recipients: List[str], subject: str, body: str, original_transcript: str = None) -> MIMEMultipart:
+        """Assemble a message around an already rendered HTML body"""
+        # Create message
+        msg = MIMEMultipart()
+        msg['From'] = self.email_address
+        msg['To'] = ', '.join(recipients)
+        msg['Subject'] = subject
+        
+        logger.debug("Email headers configured successfully")
+        
+        # Email body
+        msg.attach(MIMEText(body, 'html'))
+        
+        # Add transcript as attachment if provided
+        if original_transcript:
+            self._add_transcript_attachment(msg, original_transcript)
+        
+        logger.debug("Email body created - size: %d chars, format: HTML", len(body))
+        return msg
+
+    async def deliver(
+        self,
+        recipients: List[str],
+        summary: str,
+        subject: str = "Meeting Summary - RecapFlow",
+        original_transcript: str = None,
+        sender_details: dict = None
+    ) -> dict:
+        """
+        Build and send the summary email, raising on SMTP errors
+        
+        Args:
+            recipients (List[str]): List of recipient email addresses
+            summary (str): The AI-generated summary
+            subject (str): Email subject line
+            original_transcript (str, optional): Original transcript for reference
+            sender_details (dict, optional): Sender contact information
+            
+        Returns:
+            dict: Recipients refused by the server (empty when all were accepted)
+            
+        Raises:
+            smtplib.SMTPException: If the server rejects the message or session
+        """
+        msg = self.create_message(recipients, summary, subject, original_transcript, sender_details)
+        
+        # Send email over a pooled, already authenticated session
+        logger.debug("Sending via SMTP pool: %s:%s", self.smtp_server, self.smtp_port)
+        return await self.pool.send_message(msg)
+
+    async def deliver_fanout(
+        self,
+        recipients: List[str],
+        summary: str,
+        subject: str = "Meeting Summary - RecapFlow",
+        original_transcript: str = None,
+        sender_details: dict = None,
+        batch_size: int = None
+    ) -> dict:
+        """
+        Send the summary as separate messages to batches of recipients
+        
+        The body is rendered once; batches are sent concurrently across the
+        SMTP pool and a failing batch does not affect the others.
+        
+        Args:
+            recipients (List[str]): List of recipient email addresses
+            summary (str): The AI-generated summary
+            subject (str): Email subject line
+            original_transcript (str, optional): Original transcript for reference
+            sender_details (dict, optional): Sender contact information
+            batch_size (int, optional): Recipients per message; defaults to EMAIL_FANOUT_BATCH_SIZE
+            
+        Returns:
+            dict: Delivery report mapping each recipient to ``status``
+            (``sent``, ``refused`` or ``failed``), plus ``error`` and
+            ``retryable`` for undelivered ones
+        """
+        batch_size = max(1, batch_size or self.fanout_batch_size)
+        batches = [recipients[i:i + batch_size] for i in range(0, len(recipients), batch_size)]
+        logger.info(f"📤 Starting fan-out send - recipients: {len(recipients)}, batches: {len(batches)}")
+        body = self._create_email_body(summary, sender_details)
+
+        async def send_batch(batch: List[str]) -> dict:
+            try:
+                msg = self._build_message(batch, subject, body, original_transcript)
+                refused = await self.pool.send_message(msg, batch)
+            except smtplib.SMTPRecipientsRefused as e:
+                refused = e.recipients
+            except Exception as e:
+                logger.error(f"❌ Fan-out batch of {len(batch)} failed: {str(e)}")
+                error = f"{type(e).__name__}: {e}"
+                return {
+                    recipient: {"status": "failed", "error": error, "retryable": is_transient(e)}
+                    for recipient in batch
+                }
+            return delivery_report(batch, refused)
+
+        report = {}
+        for batch_report in await asyncio.gather(*(send_batch(batch) for batch in batches)):
+            report.update(batch_report)
+        sent = sum(1 for entry in report.values() if entry["status"] == "sent")
+        logger.info(f"✅ Fan-out send finished - delivered: {sent}/{len(recipients)}")
+        return report
     
     async def send_summary_email(
         self, 
@@ -115,41 +485,14 @@ class RecapFlowEmailer:
         summary_length = len(summary)
         
         logger.info(f"📤 Starting email send - recipients: {recipient_count}, subject: '{subject}', summary length: {summary_length} chars")
-        logger.debug(f"Recipients: {', '.join(recipients)}")
-        logger.info(f'sender_details :{sender_details}')
+        # Addresses and sender details are personal data: debug only, and only formatted if enabled
+        logger.debug("Recipients: %s", recipients)
+        logger.debug("Sender details: %s", sender_details)
         try:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = self.email_address
-            msg['To'] = ', '.join(recipients)
-            msg['Subject'] = subject
-            
-            logger.debug("Email headers configured successfully")
-            
-            # Email body
-            body = self._create_email_body(summary, sender_details)
-            msg.attach(MIMEText(body, 'html'))
-            
-            # Add transcript as attachment if provided
-            if original_transcript:
-                self._add_transcript_attachment(msg, original_transcript)
-            
-            body_size = len(body)
-            logger.debug(f"Email body created - size: {body_size} chars, format: HTML")
-            
-            # Send email
-            logger.debug(f"Connecting to SMTP server: {self.smtp_server}:{self.smtp_port}")
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()  # Enable security
-                logger.debug("SMTP TLS connection established")
-                
-                server.login(self.email_address, self.email_password)
-                logger.debug("SMTP authentication successful")
-                
-                server.send_message(msg)
+            await self.deliver(recipients, summary, subject, original_transcript, sender_details)
                 
             duration = time.time() - start_time
-            logger.info(f"✅ Email sent successfully - duration: {duration:.2f}s, recipients: {recipient_count}, body size: {body_size} chars")
+            logger.info(f"✅ Email sent successfully - duration: {duration:.2f}s, recipients: {recipient_count}")
             return True
             
         except smtplib.SMTPAuthenticationError as e:
@@ -177,7 +520,7 @@ class RecapFlowEmailer:
         Returns:
             str: HTML email body
         """
-        logger.debug(f"Creating email body - summary: {len(summary)} chars, sender details: {'included' if sender_details else 'not included'}")
+        logger.debug("Creating email body - summary: %d chars, sender details: %s", len(summary), "included" if sender_details else "not included")
         
         # Convert markdown summary to HTML
         summary_html = markdown_to_html(summary)
@@ -199,7 +542,7 @@ class RecapFlowEmailer:
         """
         
         body_length = len(html)
-        logger.debug(f"Email body created successfully - total size: {body_length} chars")
+        logger.debug("Email body created successfully - total size: %d chars", body_length)
         return html
     
     def _add_sender_details_section(self, sender_details: dict) -> str:
@@ -207,7 +550,7 @@ class RecapFlowEmailer:
         if not sender_details:
             return ""
         
-        logger.debug(f"Adding sender details section - details: {sender_details}")
+        logger.debug("Adding sender details section - fields: %d", len(sender_details))
         
         details_html = ""
         if sender_details.get('name'):
@@ -236,7 +579,7 @@ class RecapFlowEmailer:
 
     def _add_transcript_attachment(self, msg: MIMEMultipart, transcript: str) -> None:
         """Add transcript as a text file attachment"""
-        logger.debug(f"Adding transcript attachment - length: {len(transcript)} chars")
+        logger.debug("Adding transcript attachment - length: %d chars", len(transcript))
         
         # Create the attachment
         attachment = MIMEBase('text', 'plain')
@@ -265,11 +608,8 @@ class RecapFlowEmailer:
         
         try:
             logger.debug(f"Attempting connection to {self.smtp_server}:{self.smtp_port}")
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                logger.debug("TLS connection established")
-                
-                server.login(self.email_address, self.email_password)
+            # Checking out a session connects and logs in (or NOOPs an idle one)
+            async with self.pool.connection():
                 logger.debug("Authentication successful")
                 
             duration = time.time() - start_time
@@ -0,0 +1,177 @@
+"""
+Live Module for RecapFlow
+Rolling summaries of meetings still in progress, updated as transcript
+segments arrive so the final summary is ready when the meeting ends
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from config import get_settings
+from metrics import LIVE_UPDATES
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.Live")
+
+class LiveSessionFull(Exception):
+    """Raised when a live session's transcript exceeds its size limit"""
+
+class LiveSession:
+    """
+    Running summary of one meeting
+
+    Segments added with ``add`` are folded into the summary by a background
+    task, at most once per ``interval`` seconds; segments arriving while an
+    update runs or waits are batched into the next one. Each update sends
+    only the previous summary and the new text, never the whole transcript.
+    ``publish`` receives a message after every update. ``finish`` folds in
+    whatever is still pending and returns the final summary; only if
+    incremental updates kept failing does it fall back to one pass over the
+    full transcript.
+    """
+
+    def __init__(
+        self,
+        ai_service,
+        publish: Callable[[dict], Awaitable[None]],
+        custom_prompt: Optional[str] = None,
+        compact: Optional[bool] = None,
+        client: Optional[str] = None
+    ):
+        """
+        Args:
+            ai_service (RecapFlowAI): Service making the model calls
+            publish: Coroutine function sending a message to the client
+            custom_prompt (str, optional): Custom instruction for summarization
+            compact (bool, optional): Force compaction of segments on or off
+            client (str, optional): Client whose token budget pays for every update
+        """
+        self.ai = ai_service
+        self.publish = publish
+        self.custom_prompt = custom_prompt
+        self.compact = compact
+        self.client = client
+        settings = get_settings()
+        self.interval = settings.live_summary_interval
+        self.max_chars = settings.live_session_max_chars
+        self.summary: Optional[str] = None
+        self.version = 0
+        self.segments = 0
+        self.summarized_segments = 0
+        self._transcript: List[str] = []
+        self._chars = 0
+        self._pending: List[str] = []
+        self._last_update = 0.0
+        self._changed = asyncio.Event()
+        self._ended = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def transcript(self) -> str:
+        """Everything received so far"""
+        return "\n".join(self._transcript)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def add(self, text: str) -> None:
+        """
+        Queue a transcript segment for the next update
+
+        Raises:
+            LiveSessionFull: If the transcript would exceed ``LIVE_SESSION_MAX_CHARS``
+        """
+        if self._chars + len(text) > self.max_chars:
+            raise LiveSessionFull(f"Live transcript exceeds {self.max_chars} characters")
+        self._chars += len(text)
+        self._transcript.append(text)
+        self._pending.append(text)
+        self.segments += 1
+        self._changed.set()
+
+    async def finish(self) -> str:
+        """
+        Fold in pending segments and return the final summary
+
+        Raises:
+            ValueError: If no transcript was received
+        """
+        if not self._transcript:
+            raise ValueError("No transcript segments received")
+        self._ended.set()
+        self._changed.set()
+        if self._task is not None:
+            await self._task
+        if self._pending or self.summary is None:
+            logger.warning("⚠️ Live summary incomplete - summarizing the full transcript instead")
+            self.summary = await self.ai.summarize_transcript(self.transcript, self.custom_prompt, compact=self.compact, client=self.client)
+            self._pending = []
+            self.summarized_segments = self.segments
+        return self.summary
+
+    async def close(self) -> None:
+        """Stop the background task, e.g. after the client disconnected"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            if not self._pending:
+                if self._ended.is_set():
+                    return
+                continue
+            delay = self._last_update + self.interval - loop.time()
+            if delay > 0 and not self._ended.is_set():
+                # Let more segments arrive until the interval is up, unless the meeting ends first
+                try:
+                    await asyncio.wait_for(self._ended.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+            folded = await self._fold()
+            if self._ended.is_set() and (not folded or not self._pending):
+                # A failed final update is left to finish()
+                return
+            if self._pending:
+                self._changed.set()
+
+    async def _fold(self) -> bool:
+        """Fold all pending segments into the summary; return whether it worked"""
+        batch, self._pending = self._pending, []
+        info = {}
+        start = time.perf_counter()
+        try:
+            summary = await self.ai.update_summary(self.summary, "\n".join(batch), self.custom_prompt, info, self.compact, self.client)
+        except Exception as e:
+            # Keep the segments for the next attempt, which waits a full interval
+            self._pending = batch + self._pending
+            self._last_update = asyncio.get_running_loop().time()
+            LIVE_UPDATES.inc(outcome="failed")
+            logger.warning(f"⚠️ Live summary update failed: {type(e).__name__}: {e}")
+            await self.publish({
+                "type": "error",
+                "detail": f"Summary update failed: {e}",
+                "retry_after": getattr(e, "retry_after", None)
+            })
+            return False
+
+        self.summary = summary
+        self.version += 1
+        self.summarized_segments += len(batch)
+        self._last_update = asyncio.get_running_loop().time()
+        LIVE_UPDATES.inc(outcome="ok")
+        await self.publish({
+            "type": "summary",
+            "version": self.version,
+            "summary": summary,
+            "segments": self.summarized_segments,
+            "pending_segments": len(self._pending),
+            "model": info.get("model"),
+            "update_time": time.perf_counter() - start
+        })
+        return True
@@ -0,0 +1,171 @@
+"""
+Logging Module for RecapFlow
+Queue-based logging: request handlers only enqueue records, and a background
+thread formats them as JSON and writes them to stdout and a rotating file
+"""
+
+import atexit
+import copy
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from config import Settings, get_settings
+from metrics import LOG_QUEUE_DEPTH, LOG_RECORDS_DROPPED
+
+# Attributes every LogRecord has; anything else was passed through ``extra=``
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with ``extra=`` fields as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DebugSampler(logging.Filter):
+    """
+    Keep one in ``every`` DEBUG records per call site
+
+    Counting per call site (file and line) means a debug line in a hot loop
+    is thinned out without hiding rare debug lines elsewhere. Records at INFO
+    and above always pass.
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counters: Dict[tuple, itertools.count] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        site = (record.pathname, record.lineno)
+        counter = self._counters.get(site)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(site, itertools.count())
+        if next(counter) % self.every == 0:
+            return True
+        LOG_RECORDS_DROPPED.inc(reason="sampled")
+        return False
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now, since they may change before the listener
+        # runs, but leave the exception separate so formatters can place it
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def _formatter(kind: str) -> logging.Formatter:
+    return JsonFormatter() if kind == "json" else logging.Formatter(TEXT_FORMAT)
+
+def _file_handler(path: str, settings: Settings) -> logging.Handler:
+    """Rotating file handler: by time if ``LOG_ROTATE_WHEN`` is set, otherwise by size"""
+    backup_count = settings.log_backup_count
+    when = settings.log_rotate_when
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(path, when=when, backupCount=backup_count, encoding="utf-8")
+    return logging.handlers.RotatingFileHandler(
+        path,
+        maxBytes=settings.log_max_bytes,
+        backupCount=backup_count,
+        encoding="utf-8"
+    )
+
+def setup_logging() -> None:
+    """
+    Route all logging through a queue drained by a background thread
+
+    The root logger gets a single non-blocking ``QueueHandler``; stdout and
+    the rotating log file are written by a ``QueueListener`` thread, so the
+    event loop never waits on console or disk I/O. Safe to call more than
+    once; only the first call configures anything.
+
+    Environment:
+        LOG_LEVEL: Root log level (default: INFO)
+        LOG_FORMAT: ``json`` or ``text`` for the log file (default: json)
+        LOG_CONSOLE_FORMAT: ``json`` or ``text`` for stdout (default: text)
+        LOG_FILE: Log file path, ``{pid}`` is replaced by the process id; empty
+            disables file logging (default: recapflow.log)
+        LOG_MAX_BYTES / LOG_BACKUP_COUNT: Size-based rotation (default: 10 MiB / 5)
+        LOG_ROTATE_WHEN: Rotate by time instead, e.g. ``midnight`` or ``H``
+        LOG_QUEUE_SIZE: Records buffered before new ones are dropped (default: 10000)
+        LOG_DEBUG_SAMPLE: Keep one in N DEBUG records per call site (default: 1)
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    settings = get_settings()
+    handlers = []
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(_formatter(settings.log_console_format.lower()))
+    handlers.append(console)
+    path = settings.log_file.replace("{pid}", str(os.getpid()))
+    if path:
+        file_handler = _file_handler(path, settings)
+        file_handler.setFormatter(_formatter(settings.log_format.lower()))
+        handlers.append(file_handler)
+
+    log_queue = queue.Queue(maxsize=settings.log_queue_size)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSampler(settings.log_debug_sample))
+    LOG_QUEUE_DEPTH.set_function(log_queue.qsize)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(settings.log_level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """Stop the listener thread after writing every queued record"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,26 +1,22 @@
-from fastapi import FastAPI
+from config import STARTED_AT, get_settings
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
+from fastapi.responses import Response
 import logging
-import sys
+import time
 from datetime import datetime
 import os
 
 # Import routes and lifespan
 from routes import router, lifespan
+from logging_config import setup_logging
+from metrics import CONTENT_TYPE, HTTP_IN_PROGRESS, HTTP_LATENCY, HTTP_REQUESTS, STARTUP_TIME, record_error, render_metrics
 
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('recapflow.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Load backend/.env and parse settings, once for every module
+settings = get_settings()
+
+# Configure logging: records are queued and written by a background thread
+setup_logging()
 
 logger = logging.getLogger("RecapFlow")
 
@@ -31,7 +27,7 @@ logger.info("🚀 Starting RecapFlow API server...")
 # Configure CORS for frontend integration
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[os.getenv("FRONTEND_URL", "http://localhost:3000")],  # Vite dev server default port
+    allow_origins=[settings.frontend_url],  # Vite dev server default port
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -40,6 +36,29 @@ app.add_middleware(
 # Include API routes
 app.include_router(router)
 
+STARTUP_TIME.set(time.perf_counter() - STARTED_AT, phase="import")
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and observe latency per route template"""
+    start = time.perf_counter()
+    HTTP_IN_PROGRESS.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    except Exception as e:
+        record_error("http", e)
+        raise
+    finally:
+        HTTP_IN_PROGRESS.dec()
+        # Route templates keep label cardinality bounded (e.g. /send-email/{job_id})
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUESTS.inc(route=path, method=request.method, status=status)
+        HTTP_LATENCY.observe(time.perf_counter() - start, route=path, method=request.method)
+
 @app.get("/")
 async def root():
     logger.info("📍 Root endpoint accessed")
@@ -56,7 +75,54 @@ async def health_check():
         "timestamp": datetime.now().isoformat()
     }
 
-if __name__ == "__main__":
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+def run_server(argv=None):
+    """
+    Start uvicorn, optionally with several worker processes
+
+    Every worker runs the full app with its own services (see
+    ``routes.lifespan``). With more than one worker, state that must be seen
+    by all of them (response cache, stored documents, Gemini quota buckets
+    and the email queue) moves to ``SHARED_STATE_URL``, which defaults to a
+    SQLite file next to the app. On SIGTERM/SIGINT each worker stops
+    accepting connections, finishes in-flight requests for up to
+    ``--graceful-timeout`` seconds, then drains queued emails.
+    """
+    import argparse
     import uvicorn
-    logger.info("🔥 Starting uvicorn server")
-    uvicorn.run(app, host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", 8000)))
+
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="RecapFlow API server")
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument("--workers", type=int, default=settings.workers, help="worker processes (default: WORKERS or 1)")
+    parser.add_argument("--graceful-timeout", type=float, default=settings.graceful_shutdown_timeout, help="seconds to finish in-flight requests on shutdown")
+    args = parser.parse_args(argv)
+
+    if args.workers > 1:
+        # Set in the environment, which each worker process parses its settings from
+        if not settings.shared_state_url:
+            os.environ["SHARED_STATE_URL"] = f"sqlite:///{os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recapflow-state.db')}"
+            logger.warning(f"⚠️ SHARED_STATE_URL not set - workers share {os.environ['SHARED_STATE_URL']}")
+        log_file = settings.log_file
+        if log_file and "{pid}" not in log_file:
+            # Rotating one file from several processes loses records
+            root, extension = os.path.splitext(log_file)
+            os.environ["LOG_FILE"] = f"{root}.{{pid}}{extension}"
+
+    logger.info(f"🔥 Starting uvicorn server - workers: {args.workers}")
+    uvicorn.run(
+        "main:app",
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout
+    )
+
+if __name__ == "__main__":
+    run_server()
@@ -0,0 +1,257 @@
+"""
+Metrics Module for RecapFlow
+Minimal Prometheus-compatible counters, gauges and histograms
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Tuple
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.Metrics")
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow Gemini calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Size buckets in characters, covering short rephrases up to multi-hour transcripts
+SIZE_BUCKETS = (100, 500, 1000, 5000, 10000, 50000, 100000, 500000, 1000000)
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """Base for labelled metrics; values are keyed by label value tuples"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(f"{line}\n" for line in self._samples())
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Gauge(_Metric):
+    """Value that can go up and down, or is read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callbacks: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, callback: Callable[[], float], **labels) -> None:
+        """Read the gauge from ``callback`` whenever metrics are rendered"""
+        with self._lock:
+            self._callbacks[self._key(labels)] = callback
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = dict(self._values)
+            callbacks = list(self._callbacks.items())
+        for key, callback in callbacks:
+            try:
+                items[key] = callback()
+            except Exception as e:
+                logger.debug(f"Gauge callback for {self.name} failed: {e}")
+        for key, value in items.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Histogram(_Metric):
+    """Cumulative bucketed distribution with sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label set: [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the ``with`` block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}"
+
+class MetricsRegistry:
+    """Holds every metric and renders the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self._metrics.values())
+
+REGISTRY = MetricsRegistry()
+
+def counter(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+def gauge(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+def histogram(name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+# HTTP layer
+HTTP_REQUESTS = counter("recapflow_http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status"))
+HTTP_LATENCY = histogram("recapflow_http_request_duration_seconds", "HTTP request latency by route", ("route", "method"))
+HTTP_IN_PROGRESS = gauge("recapflow_http_requests_in_progress", "HTTP requests currently being handled")
+
+# Gemini calls
+AI_STAGE_LATENCY = histogram("recapflow_ai_stage_duration_seconds", "Time spent per AI stage (prompt_build, cache_lookup, model_call)", ("stage",))
+AI_PROMPT_CHARS = histogram("recapflow_ai_prompt_chars", "Size of prompts sent to the model", buckets=SIZE_BUCKETS)
+AI_RESPONSE_CHARS = histogram("recapflow_ai_response_chars", "Size of model responses", buckets=SIZE_BUCKETS)
+AI_CACHE = gauge("recapflow_ai_cache", "Response cache counters", ("stat",))
+AI_LIMITER_WAITING = gauge("recapflow_ai_limiter_waiting", "Gemini calls waiting for the rate limiter")
+AI_LIMITER_WAIT = histogram("recapflow_ai_limiter_wait_seconds", "Time Gemini calls spent waiting for the rate limiter")
+AI_RETRIES = counter("recapflow_ai_retries_total", "Gemini calls retried, by upstream status or exception", ("reason",))
+AI_MODEL_LATENCY = histogram("recapflow_ai_model_duration_seconds", "Successful model call latency by model", ("model",))
+AI_MODEL_TOKENS = counter("recapflow_ai_model_tokens_total", "Tokens used by model and kind (input, output, cached)", ("model", "kind"))
+AI_MODEL_FALLBACKS = counter("recapflow_ai_model_fallbacks_total", "Calls moved to another model, by the model that failed and why", ("model", "reason"))
+AI_COALESCED = counter("recapflow_ai_coalesced_total", "Gemini calls that joined an identical call already in flight")
+AI_INFLIGHT_WAITERS = gauge("recapflow_ai_inflight_waiters", "Callers awaiting a shared in-flight Gemini call")
+REPHRASE_PRECOMPUTE = counter("recapflow_rephrase_precompute_total", "Speculative rephrase variants by outcome (started, skipped, failed, served, joined)", ("outcome",))
+ADMISSIONS = counter("recapflow_admissions_total", "Summarization requests by admission outcome (admitted, chunked, too_large, over_budget)", ("outcome",))
+TOKEN_ESTIMATE_RATIO = gauge("recapflow_token_estimate_ratio", "Calibrated tokens per word or punctuation mark used by the local token estimator")
+CONTEXT_CACHE = counter("recapflow_context_cache_total", "Provider-side transcript contexts by outcome (created, reused, failed, expired, deleted)", ("outcome",))
+CONTEXT_CACHE_ENTRIES = gauge("recapflow_context_cache_entries", "Transcript contexts alive at the provider")
+NEAR_DUPLICATES = counter("recapflow_near_duplicates_total", "Summarize requests checked against the near-duplicate index, by outcome (reused, revised, miss, diverged, expired)", ("outcome",))
+NEAR_DUPLICATE_ENTRIES = gauge("recapflow_near_duplicate_entries", "Transcripts in the near-duplicate index")
+AI_BREAKER_STATE = gauge("recapflow_ai_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ("upstream",))
+
+# Live summarization
+LIVE_SESSIONS = gauge("recapflow_live_sessions", "Live summarization WebSocket sessions open")
+LIVE_UPDATES = counter("recapflow_live_updates_total", "Incremental live summary updates by outcome (ok, failed)", ("outcome",))
+
+# SMTP
+SMTP_PHASE_LATENCY = histogram("recapflow_smtp_phase_duration_seconds", "Time spent per SMTP phase (connect, starttls, login, noop, send)", ("phase",))
+EMAIL_QUEUE_DEPTH = gauge("recapflow_email_queue_depth", "Email jobs waiting for a worker")
+
+# Startup
+STARTUP_TIME = gauge("recapflow_startup_seconds", "Time spent per startup phase (import, services, warmup)", ("phase",))
+
+# Errors and event loop health
+ERRORS = counter("recapflow_errors_total", "Errors by component and exception type", ("component", "exception"))
+EVENT_LOOP_LAG = histogram("recapflow_event_loop_lag_seconds", "How late the event loop wakes up a sleeping task")
+
+# Logging pipeline
+LOG_RECORDS_DROPPED = counter("recapflow_log_records_dropped_total", "Log records not written, by reason (queue_full, sampled)", ("reason",))
+LOG_QUEUE_DEPTH = gauge("recapflow_log_queue_depth", "Log records waiting to be written")
+
+def record_error(component: str, error: BaseException) -> None:
+    """Count an exception by component and type"""
+    ERRORS.inc(component=component, exception=type(error).__name__)
+
+async def monitor_event_loop(interval: float = 0.5) -> None:
+    """
+    Measure event loop lag until cancelled
+
+    Sleeps for ``interval`` and records how much later than requested the
+    loop resumed; sustained lag means something is blocking the loop.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+def render_metrics() -> str:
+    """Render all registered metrics in Prometheus text format"""
+    return REGISTRY.render()
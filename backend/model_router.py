@@ -0,0 +1,157 @@
+"""
+Model Router Module for RecapFlow
+Picks a model per request and tracks per-model latency and token usage
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from config import get_settings
+from metrics import AI_MODEL_LATENCY, AI_MODEL_TOKENS
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.ModelRouter")
+
+# Tasks that never need the stronger model
+LIGHT_TASKS = ("rephrase", "segment")
+
+class ModelStats:
+    """
+    Rolling latency window and lifetime counters for one model
+
+    The window holds at most ``window`` samples, none older than ``max_age``
+    seconds, so a model that stops being called (e.g. after being demoted)
+    forgets its old latencies instead of being judged by them forever.
+    """
+
+    def __init__(self, window: int = 200, max_age: float = 300.0):
+        # (monotonic time, latency) pairs, oldest first
+        self.latencies = deque(maxlen=window)
+        self.max_age = max_age
+        self.calls = 0
+        self.failures = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def add(self, latency: float) -> None:
+        self.latencies.append((time.monotonic(), latency))
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        cutoff = time.monotonic() - self.max_age
+        while self.latencies and self.latencies[0][0] < cutoff:
+            self.latencies.popleft()
+        if not self.latencies:
+            return None
+        ordered = sorted(latency for _, latency in self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def p95(self) -> Optional[float]:
+        return self.percentile(0.95)
+
+class ModelRouter:
+    """
+    Chooses which model serves a prompt, and which to fall back to
+
+    Short summaries, rephrasing and map-step segment notes go to the fast
+    model; summaries whose prompt exceeds ``threshold`` estimated tokens go
+    to the strong model. The other model is the fallback. When the preferred
+    model's observed p95 latency exceeds ``latency_budget`` seconds and the
+    fallback has been faster, the order is swapped. Latency samples expire
+    after ``latency_window`` seconds, so once the demoted model's slow samples
+    age out it is preferred again, and is demoted again only if it is still
+    slow.
+    """
+
+    def __init__(self):
+        """Read routing configuration from settings"""
+        settings = get_settings()
+        self.fast_model = settings.ai_model_fast
+        self.strong_model = settings.ai_model_strong
+        self.threshold = settings.ai_routing_threshold
+        self.latency_budget = settings.ai_routing_latency_budget
+        self.fallback_enabled = settings.ai_fallback_enabled
+        self.latency_window = settings.ai_routing_latency_window
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+        logger.info(f"🧭 Model router configured - fast: {self.fast_model}, strong: {self.strong_model}, threshold: {self.threshold} tokens")
+
+    def candidates(self, task: str, prompt_tokens: int) -> List[str]:
+        """
+        Return models to try in order
+
+        Args:
+            task (str): ``summary``, ``segment`` or ``rephrase``
+            prompt_tokens (int): Estimated prompt size
+
+        Returns:
+            List[str]: Preferred model first, then fallbacks
+        """
+        if task in LIGHT_TASKS or prompt_tokens <= self.threshold:
+            order = [self.fast_model, self.strong_model]
+        else:
+            order = [self.strong_model, self.fast_model]
+        if order[0] == order[1]:
+            return order[:1]
+        if self._too_slow(order[0], order[1]):
+            order.reverse()
+        return order if self.fallback_enabled else order[:1]
+
+    def _too_slow(self, preferred: str, alternative: str) -> bool:
+        preferred_p95 = self._get(preferred).p95()
+        if preferred_p95 is None or preferred_p95 <= self.latency_budget:
+            return False
+        alternative_p95 = self._get(alternative).p95()
+        return alternative_p95 is not None and alternative_p95 < preferred_p95
+
+    def record(self, model: str, latency: float, input_tokens: Optional[int], output_tokens: Optional[int]) -> None:
+        """Record a successful call"""
+        stats = self._get(model)
+        with self._lock:
+            stats.add(latency)
+            stats.calls += 1
+            stats.input_tokens += input_tokens or 0
+            stats.output_tokens += output_tokens or 0
+        AI_MODEL_LATENCY.observe(latency, model=model)
+        if input_tokens:
+            AI_MODEL_TOKENS.inc(input_tokens, model=model, kind="input")
+        if output_tokens:
+            AI_MODEL_TOKENS.inc(output_tokens, model=model, kind="output")
+
+    def record_failure(self, model: str) -> None:
+        """Record a failed call"""
+        stats = self._get(model)
+        with self._lock:
+            stats.failures += 1
+
+    def expected(self, model: str) -> Tuple[Optional[float], Optional[float]]:
+        """Median latency and mean output tokens observed for ``model``, None before its first call"""
+        stats = self._get(model)
+        with self._lock:
+            latency = stats.percentile(0.5)
+            output = stats.output_tokens / stats.calls if stats.calls and stats.output_tokens else None
+        return latency, output
+
+    def stats(self) -> dict:
+        """Per-model call counts, token usage and p95 latency"""
+        with self._lock:
+            models = list(self._stats.items())
+        return {
+            model: {
+                "calls": stats.calls,
+                "failures": stats.failures,
+                "input_tokens": stats.input_tokens,
+                "output_tokens": stats.output_tokens,
+                "p95_latency": stats.p95(),
+            }
+            for model, stats in models
+        }
+
+    def _get(self, model: str) -> ModelStats:
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None:
+                stats = self._stats[model] = ModelStats(max_age=self.latency_window)
+            return stats
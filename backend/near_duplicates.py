@@ -0,0 +1,311 @@
+"""
+Near-Duplicate Module for RecapFlow
+MinHash signatures and an LSH index over summarized transcripts, so a
+transcript that is almost identical to one already summarized (another
+export, a few edited lines) can reuse or cheaply revise that summary
+"""
+
+import asyncio
+import difflib
+import hashlib
+import logging
+import re
+import zlib
+from array import array
+from typing import List, Optional, Tuple
+
+from compaction import TIMESTAMP_PATTERN
+from config import get_settings
+from metrics import AI_STAGE_LATENCY
+
+# Transcripts longer than this are hashed and diffed in a worker thread
+THREAD_CHARS = 256 * 1024
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.NearDuplicates")
+
+# Signature length; a power of two so a hash's low bits pick its bin
+SIGNATURE_SIZE = 64
+BIN_BITS = 6
+# LSH bands of ROWS values each: two transcripts become candidates when any
+# band matches exactly, which is likely above roughly (1/BANDS)**(1/ROWS),
+# about 0.77 Jaccard similarity, and unlikely well below it
+BANDS = 8
+ROWS = SIGNATURE_SIZE // BANDS
+SHINGLE_WORDS = 5
+EMPTY = 0xFFFFFFFF
+TOKEN_PATTERN = re.compile(r"\w+")
+# Content ids are SHA-256 hex digests, kept as 32 raw bytes each
+ID_BYTES = 32
+# Entries one LSH band hash may point to
+BUCKET_SIZE = 8
+
+def shingles(text: str) -> set:
+    """CRC-32 hashes of the overlapping 5-word windows of a normalized transcript"""
+    words = TOKEN_PATTERN.findall(TIMESTAMP_PATTERN.sub("", text).lower())
+    if len(words) < SHINGLE_WORDS:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {
+        zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"))
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+def signature(text: str) -> Optional[array]:
+    """
+    MinHash signature of a transcript
+
+    Uses one-permutation hashing: each shingle hash is assigned to a bin by
+    its low bits and every bin keeps its minimum, which costs one hash per
+    shingle instead of one per shingle and permutation. Empty bins borrow
+    from the next non-empty bin (densification), so short texts still get
+    comparable signatures.
+
+    Returns:
+        array: ``SIGNATURE_SIZE`` unsigned 32-bit values, or None for an empty text
+    """
+    bins = [EMPTY] * SIGNATURE_SIZE
+    mask = SIGNATURE_SIZE - 1
+    for value in shingles(text):
+        index = value & mask
+        value >>= BIN_BITS
+        if value < bins[index]:
+            bins[index] = value
+    if all(value == EMPTY for value in bins):
+        return None
+    for index in range(SIGNATURE_SIZE):
+        if bins[index] != EMPTY:
+            continue
+        offset = 1
+        while bins[(index + offset) % SIGNATURE_SIZE] == EMPTY:
+            offset += 1
+        # Borrowed values are offset by the distance so they do not collide with the source bin
+        bins[index] = (bins[(index + offset) % SIGNATURE_SIZE] + (offset << 26)) & 0xFFFFFFFE
+    return array("I", bins)
+
+def similarity(a: array, b) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(a, b) if x == y) / SIGNATURE_SIZE
+
+def context_key(*parts) -> int:
+    """64-bit key of the request options a reused summary must have been made with"""
+    digest = hashlib.sha256("\0".join(repr(part) for part in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+def _normalized(line: str) -> str:
+    return " ".join(TOKEN_PATTERN.findall(TIMESTAMP_PATTERN.sub("", line).lower()))
+
+def transcript_diff(old: str, new: str) -> Tuple[List[str], List[str]]:
+    """
+    Lines removed from ``old`` and lines added in ``new``
+
+    Lines are compared after the same normalization as the shingles, so two
+    exports differing only in timestamps, case or punctuation have no diff.
+    """
+    old_lines = [line for line in old.splitlines() if _normalized(line)]
+    new_lines = [line for line in new.splitlines() if _normalized(line)]
+    matcher = difflib.SequenceMatcher(
+        None,
+        [_normalized(line) for line in old_lines],
+        [_normalized(line) for line in new_lines],
+        autojunk=False
+    )
+    removed, added = [], []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ("replace", "delete"):
+            removed.extend(old_lines[i1:i2])
+        if tag in ("replace", "insert"):
+            added.extend(new_lines[j1:j2])
+    return removed, added
+
+class _BandTable:
+    """
+    Open-addressing multimap from a 64-bit band hash to entry slots
+
+    Keys and slots are kept in two flat arrays with linear probing. Entries
+    sharing a band hash each get their own position, up to ``BUCKET_SIZE``
+    of them; beyond that a band hash is too common to tell transcripts
+    apart and further entries are only reachable through their other bands.
+    The arrays start small and double whenever they are 3/4 full; removal
+    shifts the following entries back instead of leaving tombstones, so
+    probe chains stay short as old entries are evicted.
+    """
+
+    def __init__(self, capacity: int = 16):
+        size = 1 << max(4, (capacity * 4 // 3).bit_length())
+        self.mask = size - 1
+        self.count = 0
+        self.keys = array("Q", bytes(8 * size))
+        # Slot + 1, so zero marks a free position
+        self.slots = array("i", bytes(4 * size))
+
+    def get(self, key: int) -> List[int]:
+        """Slots of every entry stored under ``key``"""
+        mask, keys, slots = self.mask, self.keys, self.slots
+        found = []
+        i = key & mask
+        while slots[i]:
+            if keys[i] == key:
+                found.append(slots[i] - 1)
+            i = (i + 1) & mask
+        return found
+
+    def add(self, key: int, slot: int) -> bool:
+        """Store ``slot`` under ``key`` unless ``BUCKET_SIZE`` entries share it already"""
+        if (self.count + 1) * 4 > (self.mask + 1) * 3:
+            self._grow()
+        mask, keys, slots = self.mask, self.keys, self.slots
+        shared = 0
+        i = key & mask
+        while slots[i]:
+            if keys[i] == key:
+                shared += 1
+                if shared >= BUCKET_SIZE:
+                    return False
+            i = (i + 1) & mask
+        keys[i] = key
+        slots[i] = slot + 1
+        self.count += 1
+        return True
+
+    def remove(self, key: int, slot: int) -> None:
+        """Remove ``slot`` from under ``key``, if it is stored there"""
+        mask, keys, slots = self.mask, self.keys, self.slots
+        i = key & mask
+        while slots[i] and (keys[i] != key or slots[i] != slot + 1):
+            i = (i + 1) & mask
+        if not slots[i]:
+            return
+        j = i
+        while True:
+            j = (j + 1) & mask
+            if not slots[j]:
+                break
+            home = keys[j] & mask
+            # Entries whose home position lies cyclically in (i, j] stay put
+            if (i < home <= j) if i <= j else (home > i or home <= j):
+                continue
+            keys[i], slots[i] = keys[j], slots[j]
+            i = j
+        slots[i] = 0
+        self.count -= 1
+
+    def _grow(self) -> None:
+        old_keys, old_slots = self.keys, self.slots
+        size = 2 * (self.mask + 1)
+        self.mask = mask = size - 1
+        self.keys = keys = array("Q", bytes(8 * size))
+        self.slots = slots = array("i", bytes(4 * size))
+        for key, slot in zip(old_keys, old_slots):
+            if not slot:
+                continue
+            i = key & mask
+            while slots[i]:
+                i = (i + 1) & mask
+            keys[i] = key
+            slots[i] = slot
+
+class NearDuplicateIndex:
+    """
+    Fixed-capacity LSH index of transcript signatures
+
+    Signatures, option keys and the transcript/summary ids of each entry
+    live in flat arrays, and each LSH band has an array-backed hash table
+    from band hash to entries, about 500 bytes per entry in all, grown as
+    entries are added. Once ``capacity`` entries are stored, the oldest is
+    overwritten. A lookup is ``BANDS`` table probes plus one signature
+    comparison per candidate, independent of how many transcripts are
+    indexed.
+    """
+
+    def __init__(self):
+        """Read index configuration from settings"""
+        settings = get_settings()
+        self.capacity = settings.near_duplicate_capacity
+        self.threshold = settings.near_duplicate_threshold
+        # Diffs larger than this share of the transcript get a full summary instead
+        self.max_diff_ratio = settings.near_duplicate_max_diff_ratio
+        self._signatures = array("I")
+        self._contexts = array("Q")
+        self._ids = bytearray()
+        self._bands = [_BandTable() for _ in range(BANDS)]
+        self._size = 0
+        self._next = 0
+        logger.info(f"🧬 Near-duplicate index enabled - capacity: {self.capacity}, threshold: {self.threshold}")
+
+    def __len__(self) -> int:
+        return self._size
+
+    async def signature(self, text: str) -> Optional[array]:
+        """``signature(text)``, in a worker thread for large transcripts"""
+        with AI_STAGE_LATENCY.time(stage="near_duplicate"):
+            if len(text) > THREAD_CHARS:
+                return await asyncio.to_thread(signature, text)
+            return signature(text)
+
+    async def diff(self, old: str, new: str) -> Optional[Tuple[List[str], List[str]]]:
+        """
+        ``transcript_diff(old, new)``, or None if the changed lines exceed
+        ``max_diff_ratio`` of the new transcript
+        """
+        if len(new) > THREAD_CHARS:
+            removed, added = await asyncio.to_thread(transcript_diff, old, new)
+        else:
+            removed, added = transcript_diff(old, new)
+        changed = sum(len(line) for line in removed) + sum(len(line) for line in added)
+        if changed > self.max_diff_ratio * len(new):
+            return None
+        return removed, added
+
+    @staticmethod
+    def _band_keys(sig) -> List[int]:
+        return [hash(tuple(sig[band * ROWS:(band + 1) * ROWS])) & 0xFFFFFFFFFFFFFFFF for band in range(BANDS)]
+
+    def _slot_signature(self, slot: int) -> array:
+        return self._signatures[slot * SIGNATURE_SIZE:(slot + 1) * SIGNATURE_SIZE]
+
+    def add(self, sig: array, context: int, transcript_id: str, summary_id: str) -> None:
+        """Index a summarized transcript, evicting the oldest entry when full"""
+        slot = self._next
+        ids = bytes.fromhex(transcript_id) + bytes.fromhex(summary_id)
+        if slot < self._size:
+            for table, key in zip(self._bands, self._band_keys(self._slot_signature(slot))):
+                table.remove(key, slot)
+            self._signatures[slot * SIGNATURE_SIZE:(slot + 1) * SIGNATURE_SIZE] = sig
+            self._contexts[slot] = context
+            offset = slot * 2 * ID_BYTES
+            self._ids[offset:offset + 2 * ID_BYTES] = ids
+        else:
+            self._signatures.extend(sig)
+            self._contexts.append(context)
+            self._ids += ids
+            self._size += 1
+        for table, key in zip(self._bands, self._band_keys(sig)):
+            table.add(key, slot)
+        self._next = (slot + 1) % self.capacity
+
+    def query(self, sig: array, context: int) -> Optional[dict]:
+        """
+        Most similar indexed transcript made with the same options
+
+        Returns:
+            dict: ``similarity``, ``transcript_id`` and ``summary_id`` of the
+            best candidate at or above ``threshold``, or None
+        """
+        candidates = set()
+        for table, key in zip(self._bands, self._band_keys(sig)):
+            candidates.update(table.get(key))
+        best, best_slot = 0.0, None
+        for slot in candidates:
+            if self._contexts[slot] != context:
+                continue
+            score = similarity(sig, self._slot_signature(slot))
+            if score > best:
+                best, best_slot = score, slot
+        if best_slot is None or best < self.threshold:
+            return None
+        offset = best_slot * 2 * ID_BYTES
+        return {
+            "similarity": best,
+            "transcript_id": self._ids[offset:offset + ID_BYTES].hex(),
+            "summary_id": self._ids[offset + ID_BYTES:offset + 2 * ID_BYTES].hex(),
+        }
@@ -0,0 +1,217 @@
+"""
+Providers Module for RecapFlow
+Text generation backends behind a common interface: Gemini for production
+and a local stub for tests and benchmarks
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from admission import TokenEstimator
+from config import get_settings
+from ratelimit import status_code
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.Providers")
+
+class ContextUnavailable(Exception):
+    """Raised when a call names a context that expired or was deleted upstream"""
+
+class Provider(ABC):
+    """
+    Interface every generation backend implements
+
+    ``generate`` returns a dict with ``text``, ``input_tokens``,
+    ``output_tokens`` and ``cached_tokens``. ``stream`` yields text as it is
+    generated and fills ``usage`` with the token counts once they are known.
+    Both accept a ``context`` created with ``create_context``, whose content
+    the model reads before the prompt without it being sent again. Timeouts,
+    retries and rate limiting are handled by the caller.
+    """
+
+    name = "provider"
+
+    @abstractmethod
+    async def generate(self, model: str, prompt: str, context: Optional[str] = None) -> dict:
+        ...
+
+    @abstractmethod
+    async def stream(self, model: str, prompt: str, usage: Optional[dict] = None, context: Optional[str] = None) -> AsyncIterator[str]:
+        ...
+
+    @abstractmethod
+    async def create_context(self, model: str, content: str, ttl: float) -> str:
+        """
+        Upload ``content`` once for later calls to ``model``
+
+        Returns:
+            str: Context name to pass as ``context``; it expires after ``ttl`` seconds
+        """
+
+    @abstractmethod
+    async def delete_context(self, name: str) -> None:
+        ...
+
+    async def warm_up(self, model: str) -> None:
+        """Open connections ahead of the first call; nothing to do by default"""
+
+def _gemini_usage(metadata, usage: dict) -> None:
+    """Copy token counts from a Gemini ``usage_metadata`` into ``usage``"""
+    if metadata is None:
+        return
+    if metadata.prompt_token_count is not None:
+        usage["input_tokens"] = metadata.prompt_token_count
+    if metadata.candidates_token_count is not None:
+        usage["output_tokens"] = metadata.candidates_token_count
+    if getattr(metadata, "cached_content_token_count", None) is not None:
+        usage["cached_tokens"] = metadata.cached_content_token_count
+
+def _context_error(error: Exception, context: Optional[str]) -> Exception:
+    """``ContextUnavailable`` for a Gemini error about a missing cached content"""
+    if context is not None and status_code(error) in (403, 404):
+        return ContextUnavailable(f"Context {context} unavailable: {error}")
+    return error
+
+class GeminiProvider(Provider):
+    """Google Gemini through the google-genai async client"""
+
+    name = "gemini"
+
+    def __init__(self):
+        from google import genai
+        from google.genai import types
+        self.client = genai.Client()
+        self.types = types
+
+    def _config(self, context: Optional[str]):
+        return self.types.GenerateContentConfig(cached_content=context) if context else None
+
+    async def generate(self, model: str, prompt: str, context: Optional[str] = None) -> dict:
+        try:
+            response = await self.client.aio.models.generate_content(model=model, contents=prompt, config=self._config(context))
+        except Exception as e:
+            raise _context_error(e, context)
+        result = {"text": response.text or "", "input_tokens": None, "output_tokens": None, "cached_tokens": None}
+        _gemini_usage(getattr(response, "usage_metadata", None), result)
+        return result
+
+    async def stream(self, model: str, prompt: str, usage: Optional[dict] = None, context: Optional[str] = None) -> AsyncIterator[str]:
+        try:
+            stream = await self.client.aio.models.generate_content_stream(model=model, contents=prompt, config=self._config(context))
+        except Exception as e:
+            raise _context_error(e, context)
+        async for chunk in stream:
+            if usage is not None:
+                _gemini_usage(getattr(chunk, "usage_metadata", None), usage)
+            if chunk.text:
+                yield chunk.text
+
+    async def create_context(self, model: str, content: str, ttl: float) -> str:
+        # Gemini explicit context caching: cached tokens are billed at a
+        # reduced rate per call, plus storage for as long as the cache lives
+        cache = await self.client.aio.caches.create(model=model, config=self.types.CreateCachedContentConfig(
+            contents=[content],
+            ttl=f"{int(ttl)}s",
+            display_name="recapflow-transcript"
+        ))
+        return cache.name
+
+    async def delete_context(self, name: str) -> None:
+        await self.client.aio.caches.delete(name=name)
+
+    async def warm_up(self, model: str) -> None:
+        # A metadata lookup resolves DNS, completes the TLS handshake and
+        # leaves the connection in the client's pool, without using quota
+        await self.client.aio.models.get(model=model)
+
+class StubProvider(Provider):
+    """
+    Deterministic offline provider
+
+    Answers after ``latency`` seconds with the last lines of the prompt's
+    content as bullet points, so the whole pipeline can run in tests and
+    benchmarks without network access or API keys. With ``response_chars``
+    set, the bullets are repeated until the answer is at least that long.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.05, lines: int = 5, response_chars: int = 0):
+        self.latency = latency
+        self.lines = lines
+        self.response_chars = response_chars
+        # Emulated contexts: name -> (model, content, expiry on the monotonic clock)
+        self.contexts: Dict[str, Tuple[str, str, float]] = {}
+        self._context_ids = itertools.count(1)
+        # Reported usage counts tokens like the local estimator before any calibration
+        self._tokens = TokenEstimator()
+
+    def _context(self, model: str, context: Optional[str]) -> str:
+        """Content of a live context, enforcing expiry and model like Gemini does"""
+        if context is None:
+            return ""
+        entry = self.contexts.get(context)
+        if entry is None or entry[2] <= time.monotonic():
+            self.contexts.pop(context, None)
+            raise ContextUnavailable(f"Context {context} not found")
+        if entry[0] != model:
+            raise ValueError(f"Context {context} belongs to {entry[0]}, not {model}")
+        return entry[1]
+
+    def _answer(self, model: str, prompt: str) -> str:
+        content = [line.strip() for line in prompt.splitlines() if line.strip()]
+        bullets = "\n".join(f"- {line.lstrip('-*• ')[:120]}" for line in content[-self.lines:]) or "- (empty)"
+        if self.response_chars > len(bullets):
+            bullets = "\n".join([bullets] * (self.response_chars // (len(bullets) + 1) + 1))
+        return f"## Summary ({model})\n\n{bullets}\n"
+
+    async def generate(self, model: str, prompt: str, context: Optional[str] = None) -> dict:
+        content = self._context(model, context)
+        await asyncio.sleep(self.latency)
+        text = self._answer(model, f"{content}\n{prompt}")
+        return {
+            "text": text,
+            "input_tokens": self._tokens.estimate(prompt),
+            "output_tokens": self._tokens.estimate(text),
+            "cached_tokens": self._tokens.estimate(content) if content else None
+        }
+
+    async def stream(self, model: str, prompt: str, usage: Optional[dict] = None, context: Optional[str] = None) -> AsyncIterator[str]:
+        content = self._context(model, context)
+        text = self._answer(model, f"{content}\n{prompt}")
+        lines = text.splitlines(keepends=True)
+        for line in lines:
+            await asyncio.sleep(self.latency / len(lines))
+            yield line
+        if usage is not None:
+            usage["input_tokens"] = self._tokens.estimate(prompt)
+            usage["output_tokens"] = self._tokens.estimate(text)
+            if content:
+                usage["cached_tokens"] = self._tokens.estimate(content)
+
+    async def create_context(self, model: str, content: str, ttl: float) -> str:
+        await asyncio.sleep(self.latency)
+        name = f"cachedContents/stub-{next(self._context_ids)}"
+        self.contexts[name] = (model, content, time.monotonic() + ttl)
+        return name
+
+    async def delete_context(self, name: str) -> None:
+        self.contexts.pop(name, None)
+
+def create_provider() -> Provider:
+    """Build the provider selected by ``AI_PROVIDER`` (gemini or stub)"""
+    settings = get_settings()
+    name = settings.ai_provider.lower()
+    if name == "stub":
+        logger.info("🧪 Using offline stub AI provider")
+        return StubProvider(
+            latency=settings.ai_stub_latency,
+            response_chars=settings.ai_stub_response_chars
+        )
+    if name != "gemini":
+        raise ValueError(f"Unknown AI_PROVIDER: {name}")
+    return GeminiProvider()
@@ -0,0 +1,362 @@
+"""
+Rate Limit Module for RecapFlow
+Async token buckets, retry/backoff helpers and a circuit breaker for
+staying under upstream quotas and failing fast when Gemini is degraded
+"""
+
+import asyncio
+import logging
+import random
+import re
+import sys
+import time
+from typing import Optional
+
+from metrics import AI_BREAKER_STATE, AI_LIMITER_WAIT, AI_LIMITER_WAITING
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.RateLimit")
+
+class TokenBucket:
+    """
+    Async token bucket
+
+    Holds up to ``capacity`` tokens, refilled continuously at ``rate`` tokens
+    per second. Callers are served in arrival order; a request for more than
+    ``capacity`` tokens waits for a full bucket and leaves it in debt, which
+    delays the callers behind it accordingly.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate (float): Tokens added per second
+            capacity (float): Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def per_minute(cls, limit: float) -> "TokenBucket":
+        """Bucket allowing ``limit`` tokens per minute with a one-minute burst"""
+        return cls(rate=limit / 60.0, capacity=limit)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """
+        Wait until ``amount`` tokens are available and take them
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        start = time.monotonic()
+        async with self._lock:
+            blocked_for = self._blocked_until - time.monotonic()
+            if blocked_for > 0:
+                await asyncio.sleep(blocked_for)
+            self._refill()
+            needed = min(amount, self.capacity)
+            if self._tokens < needed:
+                await asyncio.sleep((needed - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+        return time.monotonic() - start
+
+    def try_acquire(self, amount: float = 1, reserve: float = 0.0) -> bool:
+        """
+        Take ``amount`` tokens only if they are available right now
+
+        Never succeeds while other callers are waiting for the bucket, and
+        with ``reserve`` only if at least that many tokens remain afterwards.
+        """
+        if self._lock.locked() or self._blocked_until > time.monotonic():
+            return False
+        self._refill()
+        if self._tokens - amount < reserve:
+            return False
+        self._tokens -= amount
+        return True
+
+    async def acquire_spare(self, amount: float = 1, reserve: float = 0.0) -> bool:
+        """``try_acquire``, with the same signature as ``SharedTokenBucket.acquire_spare``"""
+        return self.try_acquire(amount, reserve)
+
+    def take(self, amount: float = 1) -> float:
+        """
+        Take ``amount`` tokens if available right now, without waiting
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise seconds until they will be available
+        """
+        blocked_for = self._blocked_until - time.monotonic()
+        if blocked_for > 0:
+            return blocked_for
+        self._refill()
+        needed = min(amount, self.capacity)
+        if self._tokens < needed:
+            return (needed - self._tokens) / self.rate
+        self._tokens -= amount
+        return 0.0
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next ``seconds``, e.g. after a 429"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def available(self) -> float:
+        """Tokens currently in the bucket (negative while in debt)"""
+        self._refill()
+        return self._tokens
+
+class SharedTokenBucket:
+    """
+    Token bucket kept in shared state, so every worker process draws from it
+
+    Same interface as ``TokenBucket``. Waiters poll the shared bucket
+    instead of queueing locally, so arrival order is not guaranteed across
+    workers.
+    """
+
+    def __init__(self, state, name: str, rate: float, capacity: float):
+        """
+        Args:
+            state (SharedState): Backend holding the bucket
+            name (str): Bucket name, identical in every worker
+            rate (float): Tokens added per second
+            capacity (float): Maximum burst size
+        """
+        self.state = state
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+
+    @classmethod
+    def per_minute(cls, state, name: str, limit: float) -> "SharedTokenBucket":
+        """Shared bucket allowing ``limit`` tokens per minute with a one-minute burst"""
+        return cls(state, name, rate=limit / 60.0, capacity=limit)
+
+    async def acquire(self, amount: float = 1) -> float:
+        """
+        Wait until ``amount`` tokens are available and take them
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        start = time.monotonic()
+        while True:
+            wait = await asyncio.to_thread(self.state.take, self.name, self.rate, self.capacity, amount)
+            if wait <= 0:
+                return time.monotonic() - start
+            await asyncio.sleep(wait)
+
+    async def acquire_spare(self, amount: float = 1, reserve: float = 0.0) -> bool:
+        """Take ``amount`` tokens only if they are available right now and ``reserve`` remain afterwards"""
+        wait = await asyncio.to_thread(self.state.take, self.name, self.rate, self.capacity, amount, reserve)
+        return wait <= 0
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens, in any worker, for the next ``seconds``"""
+        # Written in the background: callers are on the event loop
+        future = asyncio.get_running_loop().run_in_executor(None, self.state.block, self.name, seconds)
+        future.add_done_callback(self._log_pause_failure)
+
+    def _log_pause_failure(self, future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"❌ Could not pause shared bucket {self.name}: {future.exception()}")
+
+def make_bucket(limit: float, state=None, name: str = "") -> "TokenBucket | SharedTokenBucket":
+    """Per-minute bucket, kept in ``state`` when given so all workers share it"""
+    if state is not None:
+        return SharedTokenBucket.per_minute(state, name, limit)
+    return TokenBucket.per_minute(limit)
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits shared by every caller
+
+    A limit of 0 disables that bucket. With a shared state backend the
+    buckets are shared by every worker process as well. Waiting callers and
+    their wait times are exported as metrics.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, state=None, name: str = ""):
+        self.requests = make_bucket(requests_per_minute, state, f"{name}:requests") if requests_per_minute > 0 else None
+        self.tokens = make_bucket(tokens_per_minute, state, f"{name}:tokens") if tokens_per_minute > 0 else None
+
+    async def acquire(self, tokens: int) -> float:
+        """
+        Wait for one request slot and ``tokens`` tokens
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        start = time.monotonic()
+        AI_LIMITER_WAITING.inc()
+        try:
+            if self.requests is not None:
+                await self.requests.acquire()
+            if self.tokens is not None:
+                await self.tokens.acquire(tokens)
+        finally:
+            AI_LIMITER_WAITING.dec()
+        waited = time.monotonic() - start
+        AI_LIMITER_WAIT.observe(waited)
+        return waited
+
+    async def acquire_spare(self, tokens: int, reserve: float) -> bool:
+        """
+        Take one request slot and ``tokens`` tokens only if that leaves headroom
+
+        Never waits: fails unless each bucket keeps ``reserve`` (a fraction of
+        its capacity) after the call, so low-priority work cannot use the
+        quota that requests from users depend on. A request slot taken just
+        before the token bucket turns out to be short is not given back.
+
+        Returns:
+            bool: Whether the call may go ahead
+        """
+        if self.requests is not None and not await self.requests.acquire_spare(1, reserve * self.requests.capacity):
+            return False
+        if self.tokens is not None and not await self.tokens.acquire_spare(tokens, reserve * self.tokens.capacity):
+            return False
+        return True
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for ``seconds``"""
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.pause(seconds)
+
+class UpstreamUnavailable(Exception):
+    """Raised when the upstream keeps failing with retryable errors"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class QuotaReserved(UpstreamUnavailable):
+    """Raised instead of letting background work use quota kept for user requests"""
+
+class CircuitOpenError(UpstreamUnavailable):
+    """Raised instead of calling an upstream that is known to be failing"""
+
+# Circuit breaker states, exported as the value of the breaker gauge
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    After ``threshold`` failures in a row the circuit opens and calls fail
+    immediately for ``cooldown`` seconds. Then a single trial call is let
+    through (half-open): success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, name: str, threshold: int = 5, cooldown: float = 30.0):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        AI_BREAKER_STATE.set(CLOSED, upstream=name)
+
+    def before_call(self) -> None:
+        """
+        Raise ``CircuitOpenError`` if the call must not go upstream
+
+        Raises:
+            CircuitOpenError: While open, or while another half-open trial runs
+        """
+        if self.state == OPEN:
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(f"{self.name} circuit open", retry_after=remaining)
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._trial_running:
+                raise CircuitOpenError(f"{self.name} circuit half-open", retry_after=1.0)
+            self._trial_running = True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._trial_running = False
+        if self.state != CLOSED:
+            logger.info(f"✅ {self.name} circuit closed")
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_running = False
+        if self.state == HALF_OPEN or self._failures >= self.threshold:
+            if self.state != OPEN:
+                logger.warning(f"⚠️ {self.name} circuit opened after {self._failures} consecutive failures")
+            self._opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    def release(self) -> None:
+        """End a half-open trial that was neither a success nor an upstream failure"""
+        self._trial_running = False
+
+    def _set_state(self, state: int) -> None:
+        self.state = state
+        AI_BREAKER_STATE.set(state, upstream=self.name)
+
+# HTTP statuses worth retrying: request timeout, rate limited, and server-side failures
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+RETRY_DELAY_PATTERN = re.compile(r"^([\d.]+)s$")
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status carried by an upstream SDK error, if any"""
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an upstream call failure is transient"""
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    if isinstance(error, ConnectionError):
+        return True
+    # httpx is loaded by the Gemini SDK; if it was never imported, no error can come from it
+    httpx = sys.modules.get("httpx")
+    return httpx is not None and isinstance(error, httpx.TransportError)
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Server-requested delay before retrying, in seconds
+
+    Reads the ``Retry-After`` header, or the ``RetryInfo`` detail Gemini
+    includes in 429 bodies (e.g. ``"retryDelay": "37s"``).
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                pass
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in details.get("error", {}).get("details", []) or []:
+            match = RETRY_DELAY_PATTERN.match(str(detail.get("retryDelay", "")))
+            if match:
+                return float(match.group(1))
+    return None
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """Full-jitter exponential backoff for the given 1-based retry attempt"""
+    return random.uniform(0, min(maximum, base * 2 ** (attempt - 1)))
@@ -2,16 +2,33 @@
 API routes for RecapFlow backend
 """
 
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, UploadFile, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.requests import HTTPConnection
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
+import asyncio
+import json
 import logging
+import math
+import time
 from datetime import datetime
 
 # Import our custom modules
+from admission import BudgetExceeded, RequestTooLarge
 from ai import RecapFlowAI
+from config import get_settings
 from emailer import RecapFlowEmailer
+from email_queue import EmailQueue
+from live import LiveSession, LiveSessionFull
+from metrics import AI_CACHE, LIVE_SESSIONS, NEAR_DUPLICATE_ENTRIES, NEAR_DUPLICATES, STARTUP_TIME, monitor_event_loop
+from near_duplicates import NearDuplicateIndex, context_key
+from ratelimit import UpstreamUnavailable, make_bucket
+from shared_state import close_shared_state, get_shared_state
+from speculation import RephrasePrecomputer
+from store import TranscriptStore
+from transcript_formats import SUPPORTED_EXTENSIONS, TranscriptDecodeError, UploadTooLarge, read_upload
 
 # Configure logger
 logger = logging.getLogger("RecapFlow.Routes")
@@ -19,62 +36,282 @@ logger = logging.getLogger("RecapFlow.Routes")
 # Global services
 ai_service = None
 email_service = None
+email_queue = None
+transcript_store = None
+batch_limiter = None
+rephrase_precomputer = None
+near_duplicates = None
+
+async def warm_up() -> None:
+    """
+    Open the Gemini and SMTP connections before the first request needs them
+
+    Both run concurrently and are bounded by ``STARTUP_WARMUP_TIMEOUT``; a
+    failure is only logged, since the first request would simply connect
+    on its own.
+    """
+    start = time.perf_counter()
+    timeout = get_settings().startup_warmup_timeout
+    results = await asyncio.gather(
+        asyncio.wait_for(ai_service.warm_up(), timeout),
+        asyncio.wait_for(email_service.warm_up(), timeout),
+        return_exceptions=True
+    )
+    for name, result in zip(("AI provider", "SMTP"), results):
+        if isinstance(result, Exception):
+            logger.warning(f"⚠️ {name} warm-up failed: {type(result).__name__}: {result}")
+    STARTUP_TIME.set(time.perf_counter() - start, phase="warmup")
 
 @asynccontextmanager
 async def lifespan(app):
     """Lifespan context manager for startup and shutdown events"""
     # Startup
-    global ai_service, email_service
+    global ai_service, email_service, email_queue, transcript_store, batch_limiter, rephrase_precomputer, near_duplicates
     logger.info("🚀 Initializing RecapFlow services...")
+    start = time.perf_counter()
+    settings = get_settings()
     try:
         ai_service = RecapFlowAI()
         email_service = RecapFlowEmailer()
+        email_queue = EmailQueue(email_service)
+        await email_queue.start()
+        transcript_store = TranscriptStore()
+        # Shared by every batch (and worker) so concurrent nightly jobs stay under the Gemini quota together
+        batch_limiter = make_bucket(settings.summary_batch_rpm, get_shared_state(), "summary-batch")
+        if settings.rephrase_precompute_enabled:
+            rephrase_precomputer = RephrasePrecomputer(ai_service)
+        if settings.near_duplicate_enabled:
+            near_duplicates = NearDuplicateIndex()
+            NEAR_DUPLICATE_ENTRIES.set_function(lambda: len(near_duplicates))
+        if ai_service.contexts:
+            ai_service.contexts.start()
+        if ai_service.cache:
+            for stat in ("hits", "misses", "disk_hits", "entries", "size"):
+                AI_CACHE.set_function(lambda stat=stat: ai_service.cache.stats()[stat], stat=stat)
+        STARTUP_TIME.set(time.perf_counter() - start, phase="services")
         logger.info("✅ AI and Email services initialized successfully")
     except Exception as e:
         logger.error(f"❌ Failed to initialize services: {e}")
         raise e
     
+    if settings.startup_warmup:
+        await warm_up()
+    
+    loop_monitor = asyncio.create_task(monitor_event_loop())
+    
     yield
     
-    # Shutdown (cleanup if needed)
+    # Shutdown: the server has stopped accepting connections and finished
+    # in-flight requests (and their Gemini calls); now drain queued emails
     logger.info("🔄 Shutting down RecapFlow services...")
+    loop_monitor.cancel()
+    if rephrase_precomputer:
+        await rephrase_precomputer.stop()
+    if ai_service and ai_service.contexts:
+        await ai_service.contexts.stop()
+    if ai_service and ai_service.cache:
+        ai_service.cache.close()
+    if email_queue:
+        await email_queue.stop(timeout=settings.shutdown_drain_timeout)
+    if email_service:
+        await email_service.close()
+    if transcript_store:
+        transcript_store.close()
+    close_shared_state()
 
 router = APIRouter()
 
+# How often (seconds) long-running AI calls check whether the client is still connected
+DISCONNECT_POLL_INTERVAL = 0.5
+
+async def run_until_disconnect(http_request: Request, coro):
+    """
+    Await an AI coroutine, cancelling it if the HTTP client goes away
+
+    Args:
+        http_request (Request): The incoming request to watch
+        coro: Coroutine performing the upstream call
+
+    Returns:
+        The coroutine's result
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.warning("⚠️ Client disconnected - cancelling AI request")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
+async def resolve_document(text: Optional[str], doc_id: Optional[str], field: str) -> str:
+    """
+    Return inline text, or look it up in the transcript store by id
+
+    Args:
+        text (str, optional): Inline text sent by the client
+        doc_id (str, optional): Id returned by ``/upload``, ``/summarize`` or ``/rephrase``
+        field (str): Request field name, used in error messages
+
+    Returns:
+        str: The document text
+    """
+    if text is not None:
+        return text
+    if not doc_id:
+        raise HTTPException(status_code=422, detail=f"Either {field} or {field}_id is required")
+    text = await transcript_store.get(doc_id)
+    if text is None:
+        logger.warning(f"❌ Unknown {field}_id: {doc_id}")
+        raise HTTPException(status_code=404, detail=f"{field}_id not found or expired")
+    return text
+
+async def summarize_near_duplicate(transcript: str, signature, context: int, request: "SummarizeRequest", info: dict, client: str) -> Optional[str]:
+    """
+    Answer from the summary of an almost identical earlier transcript
+
+    If the earlier transcript differs only in formatting, its summary is
+    returned as is; if a few lines changed, the summary is revised with just
+    those lines, charged to ``client``'s token budget. ``info["near_duplicate"]``
+    describes the match.
+
+    Returns:
+        str: The reused or revised summary, or None to summarize from scratch
+    """
+    match = near_duplicates.query(signature, context)
+    if match is None:
+        NEAR_DUPLICATES.inc(outcome="miss")
+        return None
+    previous = await transcript_store.get(match["transcript_id"])
+    summary = await transcript_store.get(match["summary_id"])
+    if previous is None or summary is None:
+        NEAR_DUPLICATES.inc(outcome="expired")
+        return None
+    diff = await near_duplicates.diff(previous, transcript)
+    if diff is None:
+        NEAR_DUPLICATES.inc(outcome="diverged")
+        return None
+
+    removed, added = diff
+    if removed or added:
+        summary = await ai_service.revise_summary(summary, removed, added, request.custom_prompt, info, client)
+        outcome = "revised"
+    else:
+        outcome = "reused"
+    NEAR_DUPLICATES.inc(outcome=outcome)
+    info["near_duplicate"] = {
+        "outcome": outcome,
+        "similarity": match["similarity"],
+        "transcript_id": match["transcript_id"],
+        "removed_lines": len(removed),
+        "added_lines": len(added)
+    }
+    logger.info(f"🧬 Near-duplicate transcript {outcome} - similarity: {match['similarity']:.2f}, changed lines: {len(removed) + len(added)}")
+    return summary
+
+def upstream_unavailable(error: UpstreamUnavailable) -> HTTPException:
+    """503 telling the client when Gemini is expected to accept calls again"""
+    headers = {"Retry-After": str(math.ceil(error.retry_after))} if error.retry_after else None
+    return HTTPException(status_code=503, detail=f"AI service temporarily unavailable: {str(error)}", headers=headers)
+
+def admission_rejected(error: Exception) -> HTTPException:
+    """413 for a request too large to summarize, 429 for a client out of token budget"""
+    if isinstance(error, BudgetExceeded):
+        return HTTPException(status_code=429, detail=str(error), headers={"Retry-After": str(math.ceil(error.retry_after))})
+    return HTTPException(status_code=413, detail=str(error))
+
+def client_id(connection: HTTPConnection) -> str:
+    """Client whose token budget pays for a request or WebSocket: the ``CLIENT_ID_HEADER`` header if set, else the peer address"""
+    header = get_settings().client_id_header
+    if header and connection.headers.get(header):
+        return connection.headers[header]
+    return connection.client.host if connection.client else "unknown"
+
 # Pydantic models for request/response
 class SummarizeRequest(BaseModel):
-    transcript: str
+    transcript: Optional[str] = None
+    transcript_id: Optional[str] = None
+    custom_prompt: Optional[str] = None
+    chunked: Optional[bool] = None
+    compact: Optional[bool] = None
+
+class BatchItem(BaseModel):
+    id: Optional[str] = None
+    transcript: Optional[str] = None
+    transcript_id: Optional[str] = None
+    custom_prompt: Optional[str] = None
+    chunked: Optional[bool] = None
+    compact: Optional[bool] = None
+
+class BatchSummarizeRequest(BaseModel):
+    items: List[BatchItem]
     custom_prompt: Optional[str] = None
+    concurrency: Optional[int] = None
 
 class EmailRequest(BaseModel):
     recipients: List[str]
-    summary: str
+    summary: Optional[str] = None
+    summary_id: Optional[str] = None
     subject: Optional[str] = "Meeting Summary - RecapFlow"
     include_transcript: Optional[bool] = False
     original_transcript: Optional[str] = None
+    transcript_id: Optional[str] = None
     sender_details: Optional[dict] = None
+    fanout: Optional[bool] = False
+    batch_size: Optional[int] = None
 
 class RephraseRequest(BaseModel):
-    summary: str
+    summary: Optional[str] = None
+    summary_id: Optional[str] = None
     style: str = "professional"
 
 @router.post("/summarize")
-async def summarize_transcript(request: SummarizeRequest):
+async def summarize_transcript(request: SummarizeRequest, http_request: Request):
     """
     Generate AI summary of transcript
+
+    Accepts the transcript inline or as a ``transcript_id`` from ``/upload``.
+    The response carries ids for both the transcript and the summary.
     """
-    logger.info(f"🤖 Summarization request received - transcript length: {len(request.transcript)} chars")
-    
     if not ai_service:
         logger.error("❌ AI service not initialized")
         raise HTTPException(status_code=500, detail="AI service not initialized")
     
+    transcript = await resolve_document(request.transcript, request.transcript_id, "transcript")
+    logger.info(f"🤖 Summarization request received - transcript length: {len(transcript)} chars")
+    
     try:
         start_time = datetime.now()
-        summary = await ai_service.summarize_transcript(
-            transcript=request.transcript,
-            custom_prompt=request.custom_prompt
-        )
+        info = {}
+        transcript_id = await transcript_store.put(transcript) if request.transcript is not None else request.transcript_id
+        summary = signature = None
+        if near_duplicates is not None:
+            signature = await near_duplicates.signature(transcript)
+            context = context_key(request.custom_prompt, request.chunked, request.compact)
+            if signature is not None:
+                summary = await run_until_disconnect(
+                    http_request,
+                    summarize_near_duplicate(transcript, signature, context, request, info, client_id(http_request))
+                )
+        if summary is None:
+            summary = await run_until_disconnect(http_request, ai_service.summarize_transcript(
+                transcript=transcript,
+                custom_prompt=request.custom_prompt,
+                info=info,
+                chunked=request.chunked,
+                compact=request.compact,
+                client=client_id(http_request)
+            ))
+        summary_id = await transcript_store.put(summary)
+        if signature is not None and info.get("near_duplicate", {}).get("outcome") != "reused":
+            near_duplicates.add(signature, context, transcript_id, summary_id)
+        if rephrase_precomputer:
+            rephrase_precomputer.schedule(summary, summary_id)
         end_time = datetime.now()
         processing_time = (end_time - start_time).total_seconds()
         
@@ -83,29 +320,302 @@ async def summarize_transcript(request: SummarizeRequest):
         return {
             "success": True,
             "summary": summary,
-            "original_length": len(request.transcript),
+            "summary_id": summary_id,
+            "transcript_id": transcript_id,
+            "original_length": len(transcript),
             "summary_length": len(summary),
-            "processing_time": processing_time
+            "processing_time": processing_time,
+            "cached": info.get("cached", False),
+            "coalesced": info.get("coalesced", False),
+            "chunks": info.get("chunks", 1),
+            "model": info.get("model"),
+            "compaction": info.get("compaction"),
+            "context_cached": info.get("context_cached", False),
+            "near_duplicate": info.get("near_duplicate"),
+            "estimate": info.get("estimate")
         }
+    except HTTPException:
+        raise
+    except (RequestTooLarge, BudgetExceeded) as e:
+        logger.warning(f"⚠️ Summarization not admitted: {str(e)}")
+        raise admission_rejected(e)
+    except asyncio.TimeoutError:
+        logger.error("❌ Summarization timed out")
+        raise HTTPException(status_code=504, detail="Summarization timed out")
+    except UpstreamUnavailable as e:
+        logger.error(f"❌ Summarization rejected upstream: {str(e)}")
+        raise upstream_unavailable(e)
     except Exception as e:
         logger.error(f"❌ Summarization failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Summarization failed: {str(e)}")
 
+@router.post("/summarize/batch")
+async def summarize_batch(request: BatchSummarizeRequest, http_request: Request):
+    """
+    Summarize many transcripts in one request, streamed as NDJSON
+
+    Items run concurrently (at most ``SUMMARY_BATCH_CONCURRENCY``, or the
+    lower ``concurrency`` given in the request) and start no faster than
+    ``SUMMARY_BATCH_RPM`` per minute across all batches. One JSON line is
+    written per item as soon as it finishes, so lines arrive out of order;
+    ``index`` (and ``id``, if given) identify the item. A failed item yields
+    a line with ``success: false`` and does not stop the batch. Each item
+    is admitted and charged to the client's token budget on its own.
+    """
+    if not ai_service:
+        logger.error("❌ AI service not initialized")
+        raise HTTPException(status_code=500, detail="AI service not initialized")
+
+    max_items = get_settings().summary_batch_max_items
+    if not request.items:
+        raise HTTPException(status_code=422, detail="items must not be empty")
+    if len(request.items) > max_items:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds the {max_items} item limit")
+
+    concurrency = get_settings().summary_batch_concurrency
+    if request.concurrency:
+        concurrency = max(1, min(concurrency, request.concurrency))
+    logger.info(f"📚 Batch summarization request received - items: {len(request.items)}, concurrency: {concurrency}")
+    client = client_id(http_request)
+
+    async def summarize_item(index: int, item: BatchItem, slots: asyncio.Semaphore) -> dict:
+        result = {"index": index, "id": item.id}
+        async with slots:
+            start_time = datetime.now()
+            try:
+                transcript = await resolve_document(item.transcript, item.transcript_id, "transcript")
+                await batch_limiter.acquire()
+                info = {}
+                summary = await ai_service.summarize_transcript(
+                    transcript=transcript,
+                    custom_prompt=item.custom_prompt or request.custom_prompt,
+                    info=info,
+                    chunked=item.chunked,
+                    compact=item.compact,
+                    client=client
+                )
+                result.update({
+                    "success": True,
+                    "summary": summary,
+                    "summary_id": await transcript_store.put(summary),
+                    "transcript_id": item.transcript_id if item.transcript is None else await transcript_store.put(transcript),
+                    "original_length": len(transcript),
+                    "summary_length": len(summary),
+                    "cached": info.get("cached", False),
+                    "chunks": info.get("chunks", 1),
+                    "compaction": info.get("compaction"),
+                    "estimate": info.get("estimate")
+                })
+            except HTTPException as e:
+                result.update({"success": False, "error": e.detail})
+            except (RequestTooLarge, BudgetExceeded) as e:
+                result.update({"success": False, "error": str(e)})
+            except asyncio.TimeoutError:
+                result.update({"success": False, "error": "Summarization timed out"})
+            except Exception as e:
+                result.update({"success": False, "error": f"Summarization failed: {str(e)}"})
+            result["processing_time"] = (datetime.now() - start_time).total_seconds()
+        return result
+
+    async def lines():
+        start_time = datetime.now()
+        slots = asyncio.Semaphore(concurrency)
+        tasks = [asyncio.create_task(summarize_item(i, item, slots)) for i, item in enumerate(request.items)]
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if not result["success"]:
+                    failed += 1
+                    logger.warning(f"⚠️ Batch item {result['index']} failed: {result['error']}")
+                yield json.dumps(result) + "\n"
+        finally:
+            # Client went away: stop the items that have not finished yet
+            for task in tasks:
+                task.cancel()
+        processing_time = (datetime.now() - start_time).total_seconds()
+        logger.info(f"✅ Batch summarization completed in {processing_time:.2f}s - items: {len(tasks)}, failed: {failed}")
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
+
+def sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/summarize/stream")
+async def stream_summarize_transcript(request: SummarizeRequest, http_request: Request):
+    """
+    Generate AI summary of transcript, streamed as Server-Sent Events
+
+    Emits ``chunk`` events with generated text as it arrives, then a ``done``
+    event carrying the same metadata as ``/summarize`` (or an ``error`` event).
+    The transcript is admitted before the stream starts, so an oversized
+    request or a spent token budget still gets a 413 or 429.
+    """
+    if not ai_service:
+        logger.error("❌ AI service not initialized")
+        raise HTTPException(status_code=500, detail="AI service not initialized")
+
+    transcript = await resolve_document(request.transcript, request.transcript_id, "transcript")
+    logger.info(f"🤖 Streaming summarization request received - transcript length: {len(transcript)} chars")
+    start_time = datetime.now()
+    info = {}
+    try:
+        admitted, chunked, estimate = await ai_service.admit(
+            transcript, request.custom_prompt, request.chunked, request.compact, client_id(http_request), info
+        )
+    except (RequestTooLarge, BudgetExceeded) as e:
+        logger.warning(f"⚠️ Streaming summarization not admitted: {str(e)}")
+        raise admission_rejected(e)
+    transcript_id = await transcript_store.put(transcript) if request.transcript is not None else request.transcript_id
+
+    async def events():
+        pieces = []
+        try:
+            async for text in ai_service.stream_summary(
+                transcript=admitted,
+                custom_prompt=request.custom_prompt,
+                info=info,
+                chunked=chunked,
+                compact=False,
+                tokens=estimate["input_tokens"]
+            ):
+                pieces.append(text)
+                yield sse_event("chunk", {"text": text})
+            summary = "".join(pieces)
+            summary_id = await transcript_store.put(summary)
+            if rephrase_precomputer:
+                rephrase_precomputer.schedule(summary, summary_id)
+        except Exception as e:
+            logger.error(f"❌ Streaming summarization failed: {str(e)}")
+            yield sse_event("error", {"detail": f"Summarization failed: {str(e)}"})
+            return
+
+        processing_time = (datetime.now() - start_time).total_seconds()
+        logger.info(f"✅ Streaming summarization completed in {processing_time:.2f}s - summary length: {len(summary)} chars")
+        yield sse_event("done", {
+            "success": True,
+            "summary_id": summary_id,
+            "transcript_id": transcript_id,
+            "original_length": len(transcript),
+            "summary_length": len(summary),
+            "processing_time": processing_time,
+            "cached": info.get("cached", False),
+            "chunks": info.get("chunks", 1),
+            "model": info.get("model"),
+            "compaction": info.get("compaction"),
+            "context_cached": info.get("context_cached", False),
+            "estimate": info.get("estimate")
+        })
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.websocket("/summarize/live")
+async def live_summarize(websocket: WebSocket, custom_prompt: Optional[str] = None, compact: Optional[bool] = None):
+    """
+    Summarize a meeting while it is still running
+
+    The client sends ``{"type": "segment", "text": ...}`` messages as the
+    transcript grows and ``{"type": "end"}`` when the meeting is over. The
+    server pushes ``{"type": "summary", ...}`` whenever the rolling summary
+    has been updated, and a ``{"type": "final", ...}`` message with the
+    final summary and its store ids before closing. Every update is charged
+    to the client's token budget, like ``/summarize``.
+    """
+    await websocket.accept()
+    if not ai_service:
+        logger.error("❌ AI service not initialized")
+        await websocket.send_json({"type": "error", "detail": "AI service not initialized"})
+        await websocket.close(code=1011)
+        return
+
+    # Updates are sent from the session's background task, replies from this one
+    send_lock = asyncio.Lock()
+
+    async def publish(message: dict) -> None:
+        async with send_lock:
+            await websocket.send_json(message)
+
+    session = LiveSession(ai_service, publish, custom_prompt=custom_prompt, compact=compact, client=client_id(websocket))
+    session.start()
+    LIVE_SESSIONS.inc()
+    logger.info("🎙️ Live summarization session started")
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except ValueError:
+                await publish({"type": "error", "detail": "Messages must be JSON"})
+                continue
+            kind = message.get("type") if isinstance(message, dict) else None
+            if kind == "end":
+                break
+            if kind != "segment" or not isinstance(message.get("text"), str):
+                await publish({"type": "error", "detail": 'Expected {"type": "segment", "text": ...} or {"type": "end"}'})
+                continue
+            if message["text"].strip():
+                session.add(message["text"])
+
+        start_time = datetime.now()
+        summary = await session.finish()
+        transcript_id = await transcript_store.put(session.transcript)
+        summary_id = await transcript_store.put(summary)
+        if rephrase_precomputer:
+            rephrase_precomputer.schedule(summary, summary_id)
+        processing_time = (datetime.now() - start_time).total_seconds()
+        logger.info(f"✅ Live summarization finished - {session.segments} segments, {session.version} updates, final in {processing_time:.2f}s")
+        await publish({
+            "type": "final",
+            "success": True,
+            "summary": summary,
+            "summary_id": summary_id,
+            "transcript_id": transcript_id,
+            "segments": session.segments,
+            "updates": session.version,
+            "original_length": len(session.transcript),
+            "summary_length": len(summary),
+            "processing_time": processing_time
+        })
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("🎙️ Live summarization client disconnected")
+    except LiveSessionFull as e:
+        await publish({"type": "error", "detail": str(e)})
+        await websocket.close(code=1009)
+    except Exception as e:
+        logger.error(f"❌ Live summarization failed: {str(e)}")
+        await publish({"type": "error", "detail": f"Summarization failed: {str(e)}"})
+        await websocket.close(code=1011)
+    finally:
+        LIVE_SESSIONS.dec()
+        await session.close()
+
 @router.post("/rephrase")
-async def rephrase_summary(request: RephraseRequest):
+async def rephrase_summary(request: RephraseRequest, http_request: Request):
     """Rephrase summary in different style"""
-    logger.info(f"✏️ Rephrase request received - style: {request.style}, text length: {len(request.summary)} chars")
-    
     if not ai_service:
         logger.error("❌ AI service not initialized")
         raise HTTPException(status_code=500, detail="AI service not initialized")
     
+    summary = await resolve_document(request.summary, request.summary_id, "summary")
+    logger.info(f"✏️ Rephrase request received - style: {request.style}, text length: {len(summary)} chars")
+    
     try:
         start_time = datetime.now()
-        rephrased = await ai_service.rephrase_summary(
-            summary=request.summary,
-            style=request.style
-        )
+        info = {}
+        # Charged up front, so a precomputed rephrase is paid for like any other
+        tokens = await ai_service.charge_rephrase(summary, request.style, client_id(http_request))
+        rephrased = None
+        if rephrase_precomputer:
+            rephrased = await run_until_disconnect(http_request, rephrase_precomputer.get(summary, request.style, info))
+        if rephrased is None:
+            rephrased = await run_until_disconnect(http_request, ai_service.rephrase_summary(
+                summary=summary,
+                style=request.style,
+                info=info,
+                tokens=tokens
+            ))
+        rephrased_id = await transcript_store.put(rephrased)
         end_time = datetime.now()
         processing_time = (end_time - start_time).total_seconds()
         
@@ -114,78 +624,221 @@ async def rephrase_summary(request: RephraseRequest):
         return {
             "success": True,
             "rephrased_summary": rephrased,
+            "summary_id": rephrased_id,
             "style": request.style,
-            "processing_time": processing_time
+            "processing_time": processing_time,
+            "cached": info.get("cached", False),
+            "coalesced": info.get("coalesced", False),
+            "precomputed": info.get("precomputed", False),
+            "model": info.get("model")
         }
+    except HTTPException:
+        raise
+    except (RequestTooLarge, BudgetExceeded) as e:
+        logger.warning(f"⚠️ Rephrasing not admitted: {str(e)}")
+        raise admission_rejected(e)
+    except asyncio.TimeoutError:
+        logger.error("❌ Rephrasing timed out")
+        raise HTTPException(status_code=504, detail="Rephrasing timed out")
+    except UpstreamUnavailable as e:
+        logger.error(f"❌ Rephrasing rejected upstream: {str(e)}")
+        raise upstream_unavailable(e)
     except Exception as e:
         logger.error(f"❌ Rephrasing failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Rephrasing failed: {str(e)}")
 
+@router.get("/cache/stats")
+async def cache_stats():
+    """Return hit/miss counters of the AI response cache"""
+    if not ai_service:
+        raise HTTPException(status_code=500, detail="AI service not initialized")
+    if not ai_service.cache:
+        return {"enabled": False}
+    return {"enabled": True, **ai_service.cache.stats()}
+
+@router.get("/ai/models")
+async def model_stats():
+    """Return routing configuration and per-model latency and token usage"""
+    if not ai_service:
+        raise HTTPException(status_code=500, detail="AI service not initialized")
+    model_router = ai_service.router
+    return {
+        "provider": ai_service.provider.name,
+        "fast_model": model_router.fast_model,
+        "strong_model": model_router.strong_model,
+        "threshold": model_router.threshold,
+        "models": model_router.stats()
+    }
+
+@router.post("/rephrase/stream")
+async def stream_rephrase_summary(request: RephraseRequest, http_request: Request):
+    """
+    Rephrase summary in different style, streamed as Server-Sent Events
+
+    The client is charged before the stream starts, so a spent token budget
+    still gets a 429.
+    """
+    if not ai_service:
+        logger.error("❌ AI service not initialized")
+        raise HTTPException(status_code=500, detail="AI service not initialized")
+
+    summary = await resolve_document(request.summary, request.summary_id, "summary")
+    logger.info(f"✏️ Streaming rephrase request received - style: {request.style}, text length: {len(summary)} chars")
+    try:
+        tokens = await ai_service.charge_rephrase(summary, request.style, client_id(http_request))
+    except (RequestTooLarge, BudgetExceeded) as e:
+        logger.warning(f"⚠️ Streaming rephrasing not admitted: {str(e)}")
+        raise admission_rejected(e)
+
+    async def events():
+        start_time = datetime.now()
+        info = {}
+        pieces = []
+        try:
+            precomputed = await rephrase_precomputer.get(summary, request.style, info) if rephrase_precomputer else None
+            if precomputed is not None:
+                pieces.append(precomputed)
+                yield sse_event("chunk", {"text": precomputed})
+            else:
+                async for text in ai_service.stream_rephrase(
+                    summary=summary,
+                    style=request.style,
+                    info=info,
+                    tokens=tokens
+                ):
+                    pieces.append(text)
+                    yield sse_event("chunk", {"text": text})
+            rephrased = "".join(pieces)
+            rephrased_id = await transcript_store.put(rephrased)
+        except Exception as e:
+            logger.error(f"❌ Streaming rephrasing failed: {str(e)}")
+            yield sse_event("error", {"detail": f"Rephrasing failed: {str(e)}"})
+            return
+
+        processing_time = (datetime.now() - start_time).total_seconds()
+        logger.info(f"✅ Streaming rephrasing completed in {processing_time:.2f}s - new length: {len(rephrased)} chars")
+        yield sse_event("done", {
+            "success": True,
+            "style": request.style,
+            "summary_id": rephrased_id,
+            "original_length": len(summary),
+            "summary_length": len(rephrased),
+            "processing_time": processing_time,
+            "cached": info.get("cached", False),
+            "precomputed": info.get("precomputed", False)
+        })
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @router.post("/send-email")
 async def send_summary_email(request: EmailRequest):
     """
-    Send summary via email to recipients
+    Queue summary email to recipients
+
+    Returns immediately with a job id; delivery happens in the background
+    and can be followed with ``GET /send-email/{job_id}``. The summary and
+    transcript may be sent inline or as ids from the transcript store.
     """
     logger.info(f"📧 Email request received - recipients: {len(request.recipients)}, subject: {request.subject}")
     
-    if not email_service:
+    if not email_queue:
         logger.error("❌ Email service not initialized")
         raise HTTPException(status_code=500, detail="Email service not initialized")
     
+    summary = await resolve_document(request.summary, request.summary_id, "summary")
+    original_transcript = None
+    if request.include_transcript and (request.original_transcript is not None or request.transcript_id):
+        original_transcript = await resolve_document(request.original_transcript, request.transcript_id, "transcript")
+    
     try:
         start_time = datetime.now()
-        success = await email_service.send_summary_email(
-            recipients=request.recipients,
-            summary=request.summary,
-            subject=request.subject,
-            original_transcript=request.original_transcript if request.include_transcript else None,
-            sender_details=request.sender_details
-        )
+        payload = {
+            "recipients": request.recipients,
+            "summary": summary,
+            "subject": request.subject,
+            "original_transcript": original_transcript,
+            "sender_details": request.sender_details
+        }
+        # Large lists are always fanned out to stay under provider per-message recipient limits
+        if request.fanout or len(request.recipients) > email_service.fanout_batch_size:
+            payload["fanout"] = True
+            payload["batch_size"] = request.batch_size
+        job_id = await email_queue.enqueue(payload)
         end_time = datetime.now()
         processing_time = (end_time - start_time).total_seconds()
         
-        if success:
-            logger.info(f"✅ Email sent successfully in {processing_time:.2f}s to {len(request.recipients)} recipients: {request.recipients}")
-            return {
-                "success": True,
-                "message": f"Email sent successfully to {len(request.recipients)} recipients",
-                "recipients": request.recipients,
-                "processing_time": processing_time
-            }
-        else:
-            logger.error("❌ Email sending failed - service returned False")
-            raise HTTPException(status_code=500, detail="Failed to send email")
+        return {
+            "success": True,
+            "message": f"Email queued for {len(request.recipients)} recipients",
+            "job_id": job_id,
+            "status": "queued",
+            "fanout": payload.get("fanout", False),
+            "recipients": request.recipients,
+            "processing_time": processing_time
+        }
             
     except Exception as e:
-        logger.error(f"❌ Email sending failed: {str(e)}")
+        logger.error(f"❌ Email queueing failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Email sending failed: {str(e)}")
 
+@router.get("/send-email/{job_id}")
+async def email_job_status(job_id: str):
+    """Return delivery status of a queued email"""
+    if not email_queue:
+        logger.error("❌ Email service not initialized")
+        raise HTTPException(status_code=500, detail="Email service not initialized")
+
+    job = await email_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Email job not found")
+    return {"success": True, **job}
+
 @router.post("/upload")
-async def upload_transcript(file: UploadFile = File(...)):
+async def upload_transcript(file: UploadFile = File(...), echo: bool = True):
     """
     Upload transcript file and return text content
+
+    The file is streamed through an incremental decoder and a format parser
+    (.txt, .md, .vtt, .srt, .docx, .json); subtitle timestamps and cue
+    numbers are dropped. The text is kept in the transcript store under
+    ``transcript_id`` (the SHA-256 of the parsed text), which
+    ``/summarize`` and ``/send-email`` accept in place of the text. Pass
+    ``echo=false`` to omit the text from the response.
     """
     logger.info(f"📁 File upload request - filename: {file.filename}, content_type: {file.content_type}")
     
     try:
         # Check file type
-        if not file.filename.endswith(('.txt', '.md')):
+        if not file.filename or not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
             logger.warning(f"❌ Invalid file type: {file.filename}")
-            raise HTTPException(status_code=400, detail="Only .txt and .md files are supported")
+            raise HTTPException(status_code=400, detail=f"Only {', '.join(SUPPORTED_EXTENSIONS)} files are supported")
         
-        # Read file content
-        content = await file.read()
-        transcript_text = content.decode('utf-8')
+        # Stream, decode and parse file content
+        parsed = await read_upload(file, max_bytes=get_settings().upload_max_bytes)
+        await transcript_store.put(parsed["text"], parsed["sha256"])
         
-        logger.info(f"✅ File uploaded successfully - {file.filename} ({len(transcript_text)} chars)")
+        logger.info(f"✅ File uploaded successfully - {file.filename} ({parsed['bytes']} bytes, {parsed['length']} chars, {parsed['format']})")
         
-        return {
+        response = {
             "success": True,
             "filename": file.filename,
-            "transcript": transcript_text,
-            "length": len(transcript_text)
+            "transcript_id": parsed["sha256"],
+            "length": parsed["length"],
+            "format": parsed["format"],
+            "encoding": parsed["encoding"]
         }
+        if echo:
+            response["transcript"] = parsed["text"]
+        return response
         
+    except HTTPException:
+        raise
+    except UploadTooLarge as e:
+        logger.warning(f"❌ Upload rejected: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except TranscriptDecodeError as e:
+        logger.warning(f"❌ Upload could not be parsed: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"❌ File upload failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
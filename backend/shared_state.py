@@ -0,0 +1,441 @@
+"""
+Shared State Module for RecapFlow
+State that every worker process sees: cached responses and stored documents,
+rate-limit buckets and the email job queue, kept in SQLite or Redis
+"""
+
+import json
+import logging
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from config import get_settings
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.SharedState")
+
+# Email job states a worker may claim
+CLAIMABLE_STATES = ("queued", "retrying")
+
+# Sweep expired entries of a namespace once every this many writes to it
+PURGE_EVERY = 100
+
+class SharedState(ABC):
+    """
+    Interface of a cross-process state backend
+
+    All methods are blocking and are called through ``asyncio.to_thread``,
+    like the other persistent tiers. Key/value entries live in namespaces
+    (``cache``, ``documents``); token buckets are refilled continuously
+    and updated atomically; email jobs are claimed atomically so each is
+    sent by exactly one worker.
+    """
+
+    @abstractmethod
+    def get(self, namespace: str, key: str, ttl: float) -> Optional[str]:
+        """Value stored under ``key``, or None if missing or older than ``ttl``"""
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: str, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def purge(self, namespace: str, ttl: float) -> int:
+        """Delete entries older than ``ttl``, returning how many went"""
+
+    @abstractmethod
+    def take(self, bucket: str, rate: float, capacity: float, amount: float, reserve: float = 0.0) -> float:
+        """
+        Take ``amount`` tokens from a shared bucket if it has enough
+
+        With ``reserve``, the tokens are only taken if at least that many
+        remain in the bucket afterwards.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise seconds to wait before trying again
+        """
+
+    @abstractmethod
+    def block(self, bucket: str, seconds: float) -> None:
+        """Hand out no tokens from ``bucket`` for the next ``seconds``"""
+
+    @abstractmethod
+    def save_job(self, job: dict) -> None:
+        """Insert or update an email job; queued and retrying jobs become claimable at ``available_at``"""
+
+    @abstractmethod
+    def load_job(self, job_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def claim_jobs(self, limit: int) -> List[dict]:
+        """Atomically mark up to ``limit`` claimable jobs as sending and return them"""
+
+    @abstractmethod
+    def ready_jobs(self) -> int:
+        """Number of jobs claimable right now"""
+
+    @abstractmethod
+    def requeue_stale(self, older_than: float) -> int:
+        """Make jobs stuck in sending for ``older_than`` seconds claimable again, e.g. after a worker crash"""
+
+    def close(self) -> None:
+        """Release connections; nothing to do by default"""
+
+class SQLiteState(SharedState):
+    """
+    Shared state in one SQLite file
+
+    Works across the worker processes of one host. WAL mode lets readers
+    proceed while a writer commits, and bucket updates and job claims run
+    in ``BEGIN IMMEDIATE`` transactions so concurrent workers serialize.
+    Expired entries are deleted when read and swept from each namespace
+    every ``PURGE_EVERY`` writes to it.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._writes = {}
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, created REAL NOT NULL, PRIMARY KEY (namespace, key));
+            CREATE INDEX IF NOT EXISTS entries_created ON entries (namespace, created);
+            CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, blocked_until REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, job TEXT NOT NULL, updated REAL NOT NULL, available_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS jobs_claimable ON jobs (status, available_at);
+        """)
+
+    def get(self, namespace: str, key: str, ttl: float) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if time.time() - created > ttl:
+                # Only if no other worker refreshed it since it was read
+                self._db.execute(
+                    "DELETE FROM entries WHERE namespace = ? AND key = ? AND created = ?", (namespace, key, created)
+                )
+                return None
+        return value
+
+    def set(self, namespace: str, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, created) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, time.time())
+            )
+            self._writes[namespace] = self._writes.get(namespace, 0) + 1
+            sweep = self._writes[namespace] % PURGE_EVERY == 0
+        if sweep:
+            removed = self.purge(namespace, ttl)
+            if removed:
+                logger.debug(f"🔗 Purged {removed} expired {namespace} entries")
+
+    def purge(self, namespace: str, ttl: float) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM entries WHERE namespace = ? AND created < ?", (namespace, time.time() - ttl)
+            )
+        return cursor.rowcount
+
+    def take(self, bucket: str, rate: float, capacity: float, amount: float, reserve: float = 0.0) -> float:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._db.execute(
+                    "SELECT tokens, updated, blocked_until FROM buckets WHERE name = ?", (bucket,)
+                ).fetchone()
+                tokens, updated, blocked_until = row if row else (capacity, now, 0.0)
+                if blocked_until > now:
+                    wait = blocked_until - now
+                else:
+                    tokens = min(capacity, tokens + (now - updated) * rate)
+                    needed = min(amount, capacity) + reserve
+                    wait = 0.0 if tokens >= needed else (needed - tokens) / rate
+                    if not wait:
+                        # Like TokenBucket, a request larger than the bucket leaves it in debt
+                        tokens -= amount
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO buckets (name, tokens, updated, blocked_until) VALUES (?, ?, ?, ?)",
+                        (bucket, tokens, now, blocked_until)
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return wait
+
+    def block(self, bucket: str, seconds: float) -> None:
+        until = time.time() + seconds
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO buckets (name, tokens, updated, blocked_until) VALUES (?, 0, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET blocked_until = MAX(blocked_until, excluded.blocked_until)",
+                (bucket, time.time(), until)
+            )
+
+    def save_job(self, job: dict) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, job, updated, available_at) VALUES (?, ?, ?, ?, ?)",
+                (job["id"], job["status"], json.dumps(job), job["updated_at"], job.get("available_at", 0.0))
+            )
+
+    def load_job(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT job FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def claim_jobs(self, limit: int) -> List[dict]:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                rows = self._db.execute(
+                    "SELECT job FROM jobs WHERE status IN (?, ?) AND available_at <= ? ORDER BY available_at LIMIT ?",
+                    (*CLAIMABLE_STATES, now, limit)
+                ).fetchall()
+                jobs = [json.loads(row[0]) for row in rows]
+                for job in jobs:
+                    job["status"] = "sending"
+                    job["updated_at"] = now
+                    self._db.execute(
+                        "UPDATE jobs SET status = ?, job = ?, updated = ? WHERE id = ?",
+                        (job["status"], json.dumps(job), now, job["id"])
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return jobs
+
+    def ready_jobs(self) -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?) AND available_at <= ?",
+                (*CLAIMABLE_STATES, time.time())
+            ).fetchone()[0]
+
+    def requeue_stale(self, older_than: float) -> int:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                rows = self._db.execute(
+                    "SELECT job FROM jobs WHERE status = 'sending' AND updated < ?", (now - older_than,)
+                ).fetchall()
+                for row in rows:
+                    # The blob is what status polls read, so it must agree with the column
+                    job = json.loads(row[0])
+                    job["status"] = "queued"
+                    job["updated_at"] = now
+                    job["available_at"] = 0.0
+                    self._db.execute(
+                        "UPDATE jobs SET status = ?, job = ?, updated = ?, available_at = 0 WHERE id = ?",
+                        (job["status"], json.dumps(job), now, job["id"])
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+# Token bucket update, atomic in Redis: returns "0" when the tokens were
+# taken, otherwise the seconds to wait
+TAKE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local capacity = tonumber(ARGV[3])
+local amount = tonumber(ARGV[4])
+local reserve = tonumber(ARGV[5]) or 0
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated', 'blocked_until')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+local blocked_until = tonumber(state[3]) or 0
+if blocked_until > now then
+    return tostring(blocked_until - now)
+end
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local needed = math.min(amount, capacity) + reserve
+local wait = 0
+if tokens < needed then
+    wait = (needed - tokens) / rate
+else
+    tokens = tokens - amount
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+# Moves up to ARGV[2] jobs due by ARGV[1] from the queue to the claimed set
+CLAIM_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, id in ipairs(ids) do
+    redis.call('ZREM', KEYS[1], id)
+    redis.call('ZADD', KEYS[2], ARGV[1], id)
+end
+return ids
+"""
+
+# Blocks a bucket until ARGV[1] unless it is blocked longer already, and keeps the
+# key for at least ARGV[2] seconds, in one step so concurrent workers cannot
+# overwrite a longer block with a shorter one
+BLOCK_SCRIPT = """
+local blocked_until = tonumber(redis.call('HGET', KEYS[1], 'blocked_until')) or 0
+if blocked_until < tonumber(ARGV[1]) then
+    redis.call('HSET', KEYS[1], 'blocked_until', ARGV[1])
+end
+if redis.call('TTL', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Finished jobs stay readable for status polling this long
+FINISHED_JOB_TTL = 7 * 24 * 3600
+
+class RedisState(SharedState):
+    """
+    Shared state in Redis (or a Redis-compatible server)
+
+    Unlike SQLite this also works across hosts. Entries expire through
+    Redis TTLs; queued jobs live in a sorted set scored by when they become
+    claimable, and claimed jobs in a second set scored by claim time so
+    jobs of a crashed worker can be requeued.
+    """
+
+    def __init__(self, url: str, prefix: str = "recapflow"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SHARED_STATE_URL points at Redis but the 'redis' package is not installed") from e
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._take = self._redis.register_script(TAKE_SCRIPT)
+        self._claim = self._redis.register_script(CLAIM_SCRIPT)
+        self._block = self._redis.register_script(BLOCK_SCRIPT)
+        self._redis.ping()
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix, *parts))
+
+    def get(self, namespace: str, key: str, ttl: float) -> Optional[str]:
+        return self._redis.get(self._key(namespace, key))
+
+    def set(self, namespace: str, key: str, value: str, ttl: float) -> None:
+        self._redis.set(self._key(namespace, key), value, ex=max(1, int(ttl)))
+
+    def purge(self, namespace: str, ttl: float) -> int:
+        # Entries carry their own expiry
+        return 0
+
+    def take(self, bucket: str, rate: float, capacity: float, amount: float, reserve: float = 0.0) -> float:
+        return float(self._take(keys=[self._key("bucket", bucket)], args=[time.time(), rate, capacity, amount, reserve]))
+
+    def block(self, bucket: str, seconds: float) -> None:
+        self._block(keys=[self._key("bucket", bucket)], args=[time.time() + seconds, int(seconds) + 60])
+
+    def save_job(self, job: dict) -> None:
+        pipe = self._redis.pipeline()
+        job_key = self._key("job", job["id"])
+        pipe.set(job_key, json.dumps(job))
+        if job["status"] in CLAIMABLE_STATES:
+            pipe.zrem(self._key("jobs", "claimed"), job["id"])
+            pipe.zadd(self._key("jobs", "queued"), {job["id"]: job.get("available_at", 0.0)})
+        elif job["status"] == "sending":
+            pipe.zadd(self._key("jobs", "claimed"), {job["id"]: job["updated_at"]})
+        else:
+            pipe.zrem(self._key("jobs", "queued"), job["id"])
+            pipe.zrem(self._key("jobs", "claimed"), job["id"])
+            pipe.expire(job_key, FINISHED_JOB_TTL)
+        pipe.execute()
+
+    def load_job(self, job_id: str) -> Optional[dict]:
+        value = self._redis.get(self._key("job", job_id))
+        return json.loads(value) if value else None
+
+    def claim_jobs(self, limit: int) -> List[dict]:
+        now = time.time()
+        ids = self._claim(keys=[self._key("jobs", "queued"), self._key("jobs", "claimed")], args=[now, limit])
+        jobs = []
+        for job_id in ids:
+            job = self.load_job(job_id)
+            if job is None:
+                continue
+            job["status"] = "sending"
+            job["updated_at"] = now
+            self._redis.set(self._key("job", job_id), json.dumps(job))
+            jobs.append(job)
+        return jobs
+
+    def ready_jobs(self) -> int:
+        return self._redis.zcount(self._key("jobs", "queued"), "-inf", time.time())
+
+    def requeue_stale(self, older_than: float) -> int:
+        claimed = self._key("jobs", "claimed")
+        now = time.time()
+        requeued = 0
+        for job_id in self._redis.zrangebyscore(claimed, "-inf", now - older_than):
+            # Only the worker that removes the claim requeues the job
+            if not self._redis.zrem(claimed, job_id):
+                continue
+            job = self.load_job(job_id)
+            if job is not None:
+                job["status"] = "queued"
+                job["updated_at"] = now
+                job["available_at"] = 0.0
+                self._redis.set(self._key("job", job_id), json.dumps(job))
+            self._redis.zadd(self._key("jobs", "queued"), {job_id: 0})
+            requeued += 1
+        return requeued
+
+    def close(self) -> None:
+        self._redis.close()
+
+_state: Optional[SharedState] = None
+_state_lock = threading.Lock()
+
+def get_shared_state() -> Optional[SharedState]:
+    """
+    The process-wide shared state selected by ``SHARED_STATE_URL``
+
+    ``sqlite:///path/to/state.db`` or ``redis://host:6379/0``; None when
+    unset, in which case every worker keeps its own state.
+    """
+    global _state
+    url = get_settings().shared_state_url
+    if not url:
+        return None
+    with _state_lock:
+        if _state is None:
+            if url.startswith("sqlite:///"):
+                _state = SQLiteState(url[len("sqlite:///"):])
+            elif url.startswith(("redis://", "rediss://", "unix://")):
+                _state = RedisState(url)
+            else:
+                raise ValueError(f"Unsupported SHARED_STATE_URL: {url}")
+            logger.info(f"🔗 Shared state enabled - backend: {type(_state).__name__}")
+        return _state
+
+def close_shared_state() -> None:
+    """Close the process-wide shared state, if it was opened"""
+    global _state
+    with _state_lock:
+        if _state is not None:
+            _state.close()
+            _state = None
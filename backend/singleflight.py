@@ -0,0 +1,82 @@
+"""
+Single-Flight Module for RecapFlow
+Coalesces identical in-flight calls so concurrent callers share one result
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from metrics import AI_COALESCED, AI_INFLIGHT_WAITERS
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.SingleFlight")
+
+class _Call:
+    """A shared in-flight call and the number of callers awaiting it"""
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same task and receive the same result or
+    exception. Unlike a cache, nothing is kept once the call finishes. The
+    shared task is only cancelled when every caller awaiting it has been
+    cancelled, so one client disconnecting does not fail the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        AI_INFLIGHT_WAITERS.set_function(self.waiters)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._calls
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def waiters(self) -> int:
+        """Callers currently awaiting a shared call"""
+        return sum(call.waiters for call in self._calls.values())
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run ``factory()`` unless a call for ``key`` is already in flight
+
+        Args:
+            key (str): Identity of the call, e.g. a prompt hash
+            factory: Zero-argument function returning the coroutine to run
+
+        Returns:
+            tuple: The result, and whether it came from another caller's call
+        """
+        call = self._calls.get(key)
+        shared = call is not None
+        if shared:
+            AI_COALESCED.inc()
+            logger.debug("🔗 Joining in-flight call - key: %.12s, waiters: %d", key, call.waiters + 1)
+        else:
+            call = self._calls[key] = _Call(asyncio.ensure_future(factory()))
+            call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Retrieve the exception so asyncio does not log it as never retrieved
+        if not call.task.cancelled():
+            call.task.exception()
@@ -0,0 +1,193 @@
+"""
+SMTP Pool Module for RecapFlow
+Keeps authenticated SMTP sessions open and reuses them across emails
+"""
+
+import asyncio
+import logging
+import smtplib
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from email.message import Message
+from typing import Dict, List, Optional, Tuple
+
+from metrics import SMTP_PHASE_LATENCY, record_error
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.SMTPPool")
+
+# Errors that mean the session itself is unusable and worth one reconnect
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+# Rejections after which smtplib has already RSET the session, leaving it reusable
+REUSABLE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+def is_transient(error: Exception) -> bool:
+    """
+    Whether an SMTP failure is worth retrying
+
+    Dropped connections, network errors and 4xx replies are transient;
+    authentication failures, refused recipients and 5xx replies are not.
+    """
+    if isinstance(error, (smtplib.SMTPAuthenticationError, smtplib.SMTPRecipientsRefused)):
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPException, OSError, asyncio.TimeoutError))
+
+class SMTPConnectionPool:
+    """
+    Pool of logged-in ``smtplib.SMTP`` sessions
+
+    smtplib is blocking, so every network operation runs in a worker thread
+    and the event loop is never blocked. At most ``max_size`` sessions exist
+    at once; idle sessions are closed after ``idle_timeout`` seconds and
+    checked with NOOP before reuse once they have been idle for
+    ``health_check_after`` seconds.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        max_size: int = 4,
+        idle_timeout: float = 60.0,
+        health_check_after: float = 5.0,
+        connect_timeout: float = 30.0,
+        starttls: bool = True
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.connect_timeout = connect_timeout
+        self.starttls = starttls
+        self._slots = asyncio.Semaphore(max_size)
+        # (session, last used timestamp), most recently used on the right
+        self._idle: deque = deque()
+        self._closed = False
+
+    def _connect(self) -> smtplib.SMTP:
+        """Open, secure and authenticate a new session (blocking)"""
+        start_time = time.time()
+        with SMTP_PHASE_LATENCY.time(phase="connect"):
+            server = smtplib.SMTP(self.host, self.port, timeout=self.connect_timeout)
+        try:
+            if self.starttls:
+                with SMTP_PHASE_LATENCY.time(phase="starttls"):
+                    server.starttls()
+                logger.debug("SMTP TLS connection established")
+            with SMTP_PHASE_LATENCY.time(phase="login"):
+                server.login(self.username, self.password)
+            logger.debug("SMTP authentication successful")
+        except Exception:
+            self._discard(server)
+            raise
+        logger.debug("🔌 Opened SMTP session to %s:%s in %.2fs", self.host, self.port, time.time() - start_time)
+        return server
+
+    @staticmethod
+    def _is_alive(server: smtplib.SMTP) -> bool:
+        """NOOP health check (blocking)"""
+        try:
+            with SMTP_PHASE_LATENCY.time(phase="noop"):
+                return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP) -> None:
+        """Close a session, ignoring errors from an already dead socket (blocking)"""
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    async def _checkout(self) -> smtplib.SMTP:
+        """Take a healthy idle session or open a new one"""
+        now = time.monotonic()
+        while self._idle:
+            server, last_used = self._idle.pop()
+            idle_for = now - last_used
+            if idle_for > self.idle_timeout:
+                await asyncio.to_thread(self._discard, server)
+                continue
+            if idle_for > self.health_check_after and not await asyncio.to_thread(self._is_alive, server):
+                logger.debug("♻️ Dropping stale SMTP session that failed NOOP")
+                await asyncio.to_thread(self._discard, server)
+                continue
+            return server
+        return await asyncio.to_thread(self._connect)
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Borrow a session for the duration of the block
+
+        The session goes back to the pool on success or after a recipient/data
+        rejection, and is closed if the block raises anything else.
+        """
+        if self._closed:
+            raise RuntimeError("SMTP connection pool is closed")
+        async with self._slots:
+            server = await self._checkout()
+            try:
+                yield server
+            except REUSABLE_ERRORS:
+                self._release(server)
+                raise
+            except BaseException:
+                await asyncio.to_thread(self._discard, server)
+                raise
+            if self._closed:
+                await asyncio.to_thread(self._discard, server)
+            else:
+                self._release(server)
+
+    async def warm_up(self) -> None:
+        """Open and log in one session and leave it idle for the first send"""
+        async with self.connection():
+            pass
+
+    def _release(self, server: smtplib.SMTP) -> None:
+        self._idle.append((server, time.monotonic()))
+
+    async def send_message(self, msg: Message, to_addrs: Optional[List[str]] = None) -> Dict[str, Tuple[int, bytes]]:
+        """
+        Send a message over a pooled session, reconnecting once if it dropped
+
+        Returns:
+            dict: Recipients refused by the server, as returned by smtplib
+        """
+        for attempt in range(2):
+            try:
+                async with self.connection() as server:
+                    return await asyncio.to_thread(self._send, server, msg, to_addrs)
+            except CONNECTION_ERRORS as e:
+                record_error("smtp", e)
+                if attempt:
+                    raise
+                logger.warning(f"⚠️ SMTP session lost ({e}), reconnecting")
+            except Exception as e:
+                record_error("smtp", e)
+                raise
+
+    @staticmethod
+    def _send(server: smtplib.SMTP, msg: Message, to_addrs: Optional[List[str]]) -> Dict[str, Tuple[int, bytes]]:
+        """Transmit a message on a session (blocking)"""
+        with SMTP_PHASE_LATENCY.time(phase="send"):
+            return server.send_message(msg, None, to_addrs)
+
+    async def close(self) -> None:
+        """Close every idle session and refuse further checkouts"""
+        self._closed = True
+        while self._idle:
+            server, _ = self._idle.pop()
+            await asyncio.to_thread(self._discard, server)
+        logger.info("🔌 SMTP connection pool closed")
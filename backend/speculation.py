@@ -0,0 +1,145 @@
+"""
+Speculation Module for RecapFlow
+Precomputes every rephrase style of a fresh summary in the background, so a
+later /rephrase is answered from memory instead of a new Gemini round trip
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from cachetools import TTLCache
+
+from ai import REPHRASE_STYLES
+from config import get_settings
+from metrics import REPHRASE_PRECOMPUTE
+from ratelimit import QuotaReserved, TokenBucket
+from shared_state import get_shared_state
+from store import make_id
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.Speculation")
+
+class RephrasePrecomputer:
+    """
+    Speculative rephrasing of summaries in every configured style
+
+    ``schedule`` starts one background rephrase per style; ``get`` returns
+    a finished variant, or waits for one still being generated. Variants
+    are keyed by the summary's content id and the style.
+
+    Speculative calls run at lower priority than user requests: they never
+    wait on the Gemini rate limiters, and only go ahead while a concurrency
+    slot is free and the model's quota keeps ``GEMINI_BACKGROUND_RESERVE``
+    of its capacity (see ``RecapFlowAI.invoke``). On top of that they are
+    capped by their own token budget per minute and a concurrency limit.
+    Styles skipped for either reason are simply not precomputed; a later
+    request for them goes to Gemini as usual.
+    """
+
+    def __init__(self, ai_service):
+        """Read precompute configuration from settings"""
+        self.ai = ai_service
+        settings = get_settings()
+        styles = settings.rephrase_precompute_styles or ",".join(REPHRASE_STYLES)
+        self.styles = [style.strip() for style in styles.split(",") if style.strip() in REPHRASE_STYLES]
+        self.ttl = settings.rephrase_precompute_ttl
+        # Estimated prompt tokens per minute spent on speculation, whatever the quota headroom
+        self.budget = TokenBucket.per_minute(settings.rephrase_precompute_tpm)
+        self._slots = asyncio.Semaphore(settings.rephrase_precompute_concurrency)
+        self._results = TTLCache(
+            maxsize=settings.rephrase_precompute_max_bytes,
+            ttl=self.ttl,
+            getsizeof=len
+        )
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Variants made by one worker can be served by any other
+        self.shared = get_shared_state()
+        logger.info(f"🔮 Rephrase precompute enabled - styles: {', '.join(self.styles)}, budget: {self.budget.capacity:.0f} tokens/min")
+
+    @staticmethod
+    def _key(summary_id: str, style: str) -> str:
+        return f"{summary_id}:{style}"
+
+    def schedule(self, summary: str, summary_id: Optional[str] = None) -> int:
+        """
+        Start precomputing every style of ``summary`` not already known
+
+        Args:
+            summary (str): Freshly generated summary
+            summary_id (str, optional): Precomputed ``make_id(summary)``
+
+        Returns:
+            int: Number of variants started
+        """
+        summary_id = summary_id or make_id(summary)
+        started = 0
+        for style in self.styles:
+            key = self._key(summary_id, style)
+            if key in self._tasks or key in self._results:
+                continue
+            cost = self.ai.estimator.estimate(self.ai.build_rephrase_prompt(summary, style))
+            if not self.budget.try_acquire(cost):
+                REPHRASE_PRECOMPUTE.inc(outcome="skipped")
+                continue
+            task = asyncio.create_task(self._run(key, summary, style))
+            self._tasks[key] = task
+            task.add_done_callback(lambda _, key=key: self._tasks.pop(key, None))
+            REPHRASE_PRECOMPUTE.inc(outcome="started")
+            started += 1
+        if started:
+            logger.debug("🔮 Precomputing %d rephrase styles for summary %.12s", started, summary_id)
+        return started
+
+    async def _run(self, key: str, summary: str, style: str) -> Optional[str]:
+        async with self._slots:
+            try:
+                text = await self.ai.rephrase_summary(summary, style, background=True)
+            except QuotaReserved:
+                REPHRASE_PRECOMPUTE.inc(outcome="skipped")
+                logger.debug("🔮 Skipped speculative rephrase - style: %s, Gemini quota is reserved for users", style)
+                return None
+            except Exception as e:
+                REPHRASE_PRECOMPUTE.inc(outcome="failed")
+                logger.warning(f"⚠️ Speculative rephrase failed - style: {style}: {e}")
+                return None
+        if len(text) <= self._results.maxsize:
+            self._results[key] = text
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.set, "rephrase", key, text, self.ttl)
+        return text
+
+    async def get(self, summary: str, style: str, info: Optional[dict] = None) -> Optional[str]:
+        """
+        Return a precomputed variant, waiting for it if still in flight
+
+        Args:
+            summary (str): The summary being rephrased
+            style (str): Requested style
+            info (dict, optional): ``precomputed`` is set to True on a hit
+
+        Returns:
+            str: The variant, or None if it was never started or failed
+        """
+        key = self._key(make_id(summary), style)
+        text = self._results.get(key)
+        outcome = "served"
+        if text is None and key in self._tasks:
+            # Shielded so a client disconnecting does not cancel the shared work
+            text = await asyncio.shield(self._tasks[key])
+            outcome = "joined"
+        if text is None and self.shared is not None:
+            text = await asyncio.to_thread(self.shared.get, "rephrase", key, self.ttl)
+        if text is None:
+            return None
+        REPHRASE_PRECOMPUTE.inc(outcome=outcome)
+        if info is not None:
+            info["precomputed"] = True
+        return text
+
+    async def stop(self) -> None:
+        """Cancel speculative work still running"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,220 @@
+"""
+Store Module for RecapFlow
+Content-addressed store for transcripts and summaries so clients can pass
+ids instead of re-sending multi-megabyte text on every request
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from cachetools import TTLCache
+
+from config import get_settings
+from shared_state import get_shared_state
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.Store")
+
+# Expired rows/files are swept after this many writes
+PURGE_EVERY = 100
+
+def make_id(text: str) -> str:
+    """Return the content address of a text (SHA-256 of its UTF-8 bytes)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def is_valid_id(doc_id: str) -> bool:
+    """Whether ``doc_id`` looks like a content address"""
+    return len(doc_id) == 64 and all(c in "0123456789abcdef" for c in doc_id)
+
+class SQLiteBackend:
+    """Persistent tier backed by a single SQLite table (blocking)"""
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents (id TEXT PRIMARY KEY, text TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, doc_id: str, ttl: float) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT text, created FROM documents WHERE id = ?", (doc_id,)).fetchone()
+        if row is None or time.time() - row[1] > ttl:
+            return None
+        return row[0]
+
+    def set(self, doc_id: str, text: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (id, text, created) VALUES (?, ?, ?)",
+                (doc_id, text, time.time())
+            )
+            self._db.commit()
+
+    def purge(self, ttl: float) -> int:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM documents WHERE created < ?", (time.time() - ttl,))
+            self._db.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+class FileBackend:
+    """Persistent tier storing one file per document (blocking)"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, doc_id: str) -> str:
+        return os.path.join(self.directory, f"{doc_id}.txt")
+
+    def get(self, doc_id: str, ttl: float) -> Optional[str]:
+        path = self._path(doc_id)
+        try:
+            if time.time() - os.path.getmtime(path) > ttl:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, doc_id: str, text: str) -> None:
+        path = self._path(doc_id)
+        if os.path.exists(path):
+            # Same id means same content; just refresh its age
+            os.utime(path)
+            return
+        # Write then rename so readers never see a partial file
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+
+    def purge(self, ttl: float) -> int:
+        cutoff = time.time() - ttl
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".txt") and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def close(self) -> None:
+        pass
+
+class SharedBackend:
+    """Persistent tier in the cross-worker shared state (blocking)"""
+
+    def __init__(self, state, ttl: float):
+        self.state = state
+        self.ttl = ttl
+
+    def get(self, doc_id: str, ttl: float) -> Optional[str]:
+        return self.state.get("documents", doc_id, ttl)
+
+    def set(self, doc_id: str, text: str) -> None:
+        self.state.set("documents", doc_id, text, self.ttl)
+
+    def purge(self, ttl: float) -> int:
+        return self.state.purge("documents", ttl)
+
+    def close(self) -> None:
+        # Owned by shared_state, which closes it
+        pass
+
+class TranscriptStore:
+    """
+    Content-addressed store of transcripts and summaries
+
+    Documents are keyed by the SHA-256 of their text, so storing the same
+    text twice is free and an id always refers to exactly one text. The
+    in-memory tier evicts least recently used documents once ``max_bytes``
+    is exceeded; both tiers drop documents older than ``ttl`` seconds.
+    """
+
+    def __init__(self):
+        """Read store configuration from settings"""
+        settings = get_settings()
+        self.max_bytes = settings.transcript_store_max_bytes
+        self.ttl = settings.transcript_store_ttl
+        self._memory = TTLCache(maxsize=self.max_bytes, ttl=self.ttl, getsizeof=len)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        db_path = settings.transcript_store_db
+        directory = settings.transcript_store_dir
+        if db_path:
+            self.backend = SQLiteBackend(db_path)
+        elif directory:
+            self.backend = FileBackend(directory)
+        elif get_shared_state() is not None:
+            # Ids handed out by one worker must resolve on every other
+            self.backend = SharedBackend(get_shared_state(), self.ttl)
+        else:
+            self.backend = None
+        logger.info(f"🗄️ Transcript store configured - memory: {self.max_bytes} chars, ttl: {self.ttl:.0f}s, backend: {type(self.backend).__name__ if self.backend else 'none'}")
+
+    async def put(self, text: str, doc_id: Optional[str] = None) -> str:
+        """
+        Store a document
+
+        Args:
+            text (str): Transcript or summary text
+            doc_id (str, optional): Precomputed ``make_id(text)``, e.g. from a streamed upload
+
+        Returns:
+            str: The document id
+        """
+        doc_id = doc_id or make_id(text)
+        with self._lock:
+            known = doc_id in self._memory
+            # Documents larger than the whole budget only live in the backend
+            if not known and len(text) <= self.max_bytes:
+                self._memory[doc_id] = text
+        if self.backend is not None and not known:
+            await asyncio.to_thread(self.backend.set, doc_id, text)
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                removed = await asyncio.to_thread(self.backend.purge, self.ttl)
+                if removed:
+                    logger.debug(f"🗄️ Purged {removed} expired documents")
+        return doc_id
+
+    async def get(self, doc_id: str) -> Optional[str]:
+        """Return a stored document, or None if unknown or expired"""
+        with self._lock:
+            text = self._memory.get(doc_id)
+        if text is None and self.backend is not None and is_valid_id(doc_id):
+            text = await asyncio.to_thread(self.backend.get, doc_id, self.ttl)
+            if text is not None and len(text) <= self.max_bytes:
+                with self._lock:
+                    self._memory[doc_id] = text
+        return text
+
+    def stats(self) -> dict:
+        """Return current occupancy of the in-memory tier"""
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "size": self._memory.currsize,
+                "max_size": self._memory.maxsize,
+                "persistent": self.backend is not None,
+            }
+
+    def close(self) -> None:
+        """Close the persistent tier"""
+        if self.backend is not None:
+            self.backend.close()
@@ -0,0 +1,37 @@
+"""
+Shared test setup: backend modules are imported flat, as main.py runs them,
+and every test runs against the stub AI provider with no .env side effects
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.update({
+    "AI_PROVIDER": "stub",
+    "AI_STUB_LATENCY": "0",
+    "EMAIL_ADDRESS": "recapflow@example.com",
+    "EMAIL_PASSWORD": "test",
+    "LOG_FILE": "",
+    "SUMMARY_CACHE_ENABLED": "false",
+    "GEMINI_RPM": "0",
+    "GEMINI_TPM": "0",
+    "SHARED_STATE_URL": "",
+})
+
+@pytest.fixture(autouse=True)
+def settings():
+    """Parse settings afresh for each test, after its ``monkeypatch.setenv`` calls"""
+    import config
+    config.reset_settings()
+    yield
+    config.reset_settings()
+
+@pytest.fixture
+def ai():
+    """A RecapFlowAI on the stub provider"""
+    from ai import RecapFlowAI
+    return RecapFlowAI()
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from admission import BudgetExceeded, RequestTooLarge, TokenEstimator
+from ai import RecapFlowAI
+from chunking import chunk_transcript
+
+# Long words: about five characters per token by length, but one word each to the estimator
+LONG_WORDS = "Sarah: " + " ".join(["internationalization"] * 1500)
+
+def test_estimator_caches_and_calibrates():
+    estimator = TokenEstimator()
+    text = "Sarah: we ship on Friday, pending review. " * 100
+    first = estimator.estimate(text)
+    assert estimator.estimate(text) == first
+    estimator.calibrate(text, first * 2)
+    assert estimator.estimate(text) == pytest.approx(first * 2, rel=0.01)
+
+def test_estimate_names_the_model_that_is_called(ai):
+    info = {}
+    asyncio.run(ai.summarize_transcript(LONG_WORDS, info=info))
+    assert info["estimate"]["calls"] == 1
+    assert info["estimate"]["model"] == info["model"]
+
+def test_oversized_requests_are_chunked_or_rejected(monkeypatch):
+    monkeypatch.setenv("ADMISSION_MAX_PROMPT_TOKENS", "500")
+    monkeypatch.setenv("ADMISSION_MAX_REQUEST_TOKENS", "5000")
+    monkeypatch.setenv("SUMMARY_CHUNK_TOKENS", "300")
+    ai = RecapFlowAI()
+    transcript = "\n".join(f"Speaker {i}: item {i} is due on day {i}." for i in range(100))
+
+    info = {}
+    asyncio.run(ai.summarize_transcript(transcript, info=info))
+    assert info["chunks"] > 1
+    assert info["estimate"]["calls"] > 1
+    with pytest.raises(RequestTooLarge):
+        asyncio.run(ai.summarize_transcript(transcript, chunked=False))
+    with pytest.raises(RequestTooLarge):
+        asyncio.run(ai.summarize_transcript(transcript * 20))
+
+def test_live_updates_and_revisions_are_charged(monkeypatch):
+    monkeypatch.setenv("CLIENT_TOKEN_BUDGET", "2000")
+    ai = RecapFlowAI()
+
+    async def scenario():
+        summary = await ai.update_summary(None, "Sarah: kickoff", client="live")
+        with pytest.raises(BudgetExceeded):
+            for i in range(100):
+                summary = await ai.update_summary(summary, f"Mike: item {i}", client="live")
+        with pytest.raises(BudgetExceeded):
+            await ai.revise_summary(summary, ["Old line"], ["New line"], client="live")
+        # Other clients and uncharged callers are unaffected
+        await ai.revise_summary(summary, ["Old line"], ["New line"], client="other")
+        await ai.update_summary(summary, "Mike: internal", client=None)
+
+    asyncio.run(scenario())
+
+def test_routes_reject_with_413_and_429(monkeypatch):
+    monkeypatch.setenv("CLIENT_TOKEN_BUDGET", "2000")
+    monkeypatch.setenv("CLIENT_ID_HEADER", "X-Client")
+    monkeypatch.setenv("ADMISSION_MAX_REQUEST_TOKENS", "4000")
+    import main
+
+    with TestClient(main.app) as client:
+        headers = {"X-Client": "team-a"}
+        response = client.post("/summarize", json={"transcript": "Sarah: ship it Friday."}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["estimate"]["input_tokens"] > 0
+
+        response = client.post("/summarize", json={"transcript": LONG_WORDS * 3}, headers=headers)
+        assert response.status_code == 413
+
+        for i in range(100):
+            response = client.post("/summarize/stream", json={"transcript": f"Sarah: update {i}."}, headers=headers)
+            if response.status_code != 200:
+                break
+        assert response.status_code == 429
+        response = client.post("/summarize", json={"transcript": "Sarah: again."}, headers=headers)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) > 0
+        # Budgets are per client
+        response = client.post("/summarize", json={"transcript": "Sarah: again."}, headers={"X-Client": "team-b"})
+        assert response.status_code == 200
+
+def test_rephrases_are_charged(monkeypatch):
+    monkeypatch.setenv("CLIENT_TOKEN_BUDGET", "2000")
+    monkeypatch.setenv("CLIENT_ID_HEADER", "X-Client")
+    import main
+
+    with TestClient(main.app) as client:
+        headers = {"X-Client": "team-c"}
+        for i in range(100):
+            response = client.post("/rephrase", json={"summary": f"- Item {i} ships Friday", "style": "casual"}, headers=headers)
+            if response.status_code != 200:
+                break
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) > 0
+        # Rejected before the stream starts, not as an error event inside it
+        response = client.post("/rephrase/stream", json={"summary": "- Another item", "style": "casual"}, headers=headers)
+        assert response.status_code == 429
+        response = client.post("/rephrase/stream", json={"summary": "- Another item", "style": "casual"}, headers={"X-Client": "team-d"})
+        assert response.status_code == 200
+        assert "event: done" in response.text
+
+def test_stream_chunks_what_admission_chunked(monkeypatch):
+    # The prompt limit, not the chunk threshold, makes this transcript chunked
+    monkeypatch.setenv("ADMISSION_MAX_PROMPT_TOKENS", "500")
+    monkeypatch.setenv("SUMMARY_CHUNK_THRESHOLD", "100000")
+    monkeypatch.setenv("SUMMARY_CHUNK_TOKENS", "300")
+    ai = RecapFlowAI()
+    transcript = "\n".join(f"Speaker {i}: item {i} is due on day {i}." for i in range(100))
+
+    async def stream():
+        _, chunked, _ = await ai.admit(transcript)
+        info = {}
+        async for _ in ai.stream_summary(transcript, info=info, compact=False):
+            pass
+        return chunked, info
+
+    chunked, info = asyncio.run(stream())
+    assert chunked and info["chunks"] > 1
+
+def test_chunks_are_budgeted_with_the_estimator(ai):
+    segments = chunk_transcript(LONG_WORDS, 300, ai.estimator.estimate)
+    # By characters these words would need about five times as many segments
+    assert all(ai.estimator.estimate(segment) <= 300 for segment in segments)
+    assert len(segments) == pytest.approx(ai.estimator.estimate(LONG_WORDS) / 300, abs=1)
@@ -0,0 +1,176 @@
+"""
+Tests for model calls on the stub provider: retries, fallback, coalescing,
+caching and map-reduce summarization
+"""
+import asyncio
+
+import pytest
+
+import config
+from admission import RequestTooLarge
+from ai import RecapFlowAI
+from metrics import AI_MODEL_FALLBACKS, AI_RETRIES
+from providers import StubProvider
+from ratelimit import UpstreamUnavailable
+
+FAST = "gemini-2.5-flash-lite"
+STRONG = "gemini-2.5-flash"
+
+class UpstreamError(Exception):
+    """An SDK error carrying an HTTP status, as the Gemini client raises"""
+
+    def __init__(self, code: int):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+# Scripted failure that makes a call outlive the AI timeout
+HANG = "hang"
+
+class FlakyProvider(StubProvider):
+    """Stub provider that fails each model's first calls as scripted and records every call"""
+
+    def __init__(self, failures=None, latency: float = 0.0):
+        super().__init__(latency=latency)
+        self.failures = failures or {}
+        self.calls = []
+
+    async def generate(self, model, prompt, context=None):
+        self.calls.append((model, prompt))
+        scripted = self.failures.get(model)
+        if scripted:
+            failure = scripted.pop(0)
+            if failure == HANG:
+                await asyncio.sleep(10)
+            raise failure
+        return await super().generate(model, prompt, context)
+
+    def models(self):
+        return [model for model, _ in self.calls]
+
+def is_segment_prompt(prompt: str) -> bool:
+    # Map-step notes quote their prompt, so only the opening line identifies one
+    return prompt.lstrip().startswith("You are reading part")
+
+def make_ai(monkeypatch, provider, **env) -> RecapFlowAI:
+    env = {"GEMINI_RETRY_BASE_DELAY": "0.001", **env}
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    # Building the provider already parsed settings; parse them again with ``env``
+    config.reset_settings()
+    ai = RecapFlowAI()
+    ai.provider = provider
+    return ai
+
+def test_transient_errors_are_retried(monkeypatch):
+    provider = FlakyProvider({FAST: [UpstreamError(503), UpstreamError(500)]})
+    ai = make_ai(monkeypatch, provider, AI_FALLBACK_ENABLED="false")
+    retries = AI_RETRIES.value(reason="503")
+
+    info = {}
+    assert asyncio.run(ai.invoke("- Ship on Friday", info, task="rephrase"))
+    assert provider.models() == [FAST, FAST, FAST]
+    assert info["model"] == FAST
+    assert AI_RETRIES.value(reason="503") - retries == 1
+
+def test_retries_give_up_as_upstream_unavailable(monkeypatch):
+    provider = FlakyProvider({FAST: [UpstreamError(503)] * 3})
+    ai = make_ai(monkeypatch, provider, AI_FALLBACK_ENABLED="false", GEMINI_MAX_RETRIES="2")
+
+    with pytest.raises(UpstreamUnavailable):
+        asyncio.run(ai.invoke("- Ship on Friday", task="rephrase"))
+    assert len(provider.calls) == 3
+
+def test_rate_limited_model_falls_back(monkeypatch):
+    provider = FlakyProvider({FAST: [UpstreamError(429)]})
+    ai = make_ai(monkeypatch, provider)
+    fallbacks = AI_MODEL_FALLBACKS.value(model=FAST, reason="UpstreamUnavailable")
+
+    info = {}
+    text = asyncio.run(ai.invoke("- Ship on Friday", info, task="rephrase"))
+    # The preferred model is not retried; the next one answers straight away
+    assert provider.models() == [FAST, STRONG]
+    assert info["model"] == STRONG
+    assert STRONG in text
+    assert AI_MODEL_FALLBACKS.value(model=FAST, reason="UpstreamUnavailable") - fallbacks == 1
+
+def test_timed_out_model_falls_back(monkeypatch):
+    provider = FlakyProvider({FAST: [HANG]})
+    ai = make_ai(monkeypatch, provider, GEMINI_TIMEOUT="0.05")
+
+    info = {}
+    asyncio.run(ai.invoke("- Ship on Friday", info, task="rephrase"))
+    assert provider.models() == [FAST, STRONG]
+    assert info["model"] == STRONG
+
+def test_bad_request_is_not_retried_or_moved(monkeypatch):
+    provider = FlakyProvider({FAST: [UpstreamError(400)]})
+    ai = make_ai(monkeypatch, provider)
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(ai.invoke("- Ship on Friday", task="rephrase"))
+    assert provider.models() == [FAST]
+
+def test_identical_prompts_in_flight_are_coalesced(monkeypatch):
+    provider = FlakyProvider(latency=0.05)
+    ai = make_ai(monkeypatch, provider)
+    infos = [{} for _ in range(5)]
+
+    async def scenario():
+        return await asyncio.gather(*(ai.invoke("- Ship on Friday", info, task="rephrase") for info in infos))
+
+    results = asyncio.run(scenario())
+    assert len(provider.calls) == 1
+    assert len(set(results)) == 1
+    assert sorted(info["coalesced"] for info in infos) == [False, True, True, True, True]
+
+def test_repeated_prompt_is_served_from_cache(monkeypatch):
+    provider = FlakyProvider()
+    ai = make_ai(monkeypatch, provider, SUMMARY_CACHE_ENABLED="true", SUMMARY_CACHE_DB="")
+
+    async def scenario():
+        first, second = {}, {}
+        results = [await ai.invoke("- Ship on Friday", info, task="rephrase") for info in (first, second)]
+        return results, first, second
+
+    (first_text, second_text), first, second = asyncio.run(scenario())
+    assert len(provider.calls) == 1
+    assert first["cached"] is False and second["cached"] is True
+    assert first_text == second_text
+
+def test_long_transcript_is_summarized_map_reduce(monkeypatch):
+    provider = FlakyProvider()
+    ai = make_ai(monkeypatch, provider, SUMMARY_CHUNK_TOKENS="300")
+    transcript = "\n".join(f"Speaker {i % 3}: Item {i} is on track for the release." for i in range(300))
+
+    info = {}
+    summary = asyncio.run(ai.summarize_transcript(transcript, info=info, chunked=True))
+    segment_prompts = [prompt for _, prompt in provider.calls if is_segment_prompt(prompt)]
+    assert info["chunks"] > 1
+    # Every segment is summarized, then one reduce call combines the notes
+    assert len(segment_prompts) >= info["chunks"]
+    assert "Notes for part 1:" in provider.calls[-1][1]
+    assert len(provider.calls) > len(segment_prompts)
+    assert summary.startswith("## Summary")
+
+def test_map_reduce_stops_when_notes_stop_shrinking(monkeypatch):
+    provider = FlakyProvider()
+    # Stub notes are longer than a whole chunk, so regrouping never shrinks them
+    ai = make_ai(monkeypatch, provider, SUMMARY_CHUNK_TOKENS="20")
+    transcript = "\n".join(f"Item {i} is on track." for i in range(40))
+
+    info = {}
+    summary = asyncio.run(ai.summarize_transcript(transcript, info=info, chunked=True))
+    segment_calls = sum(1 for _, prompt in provider.calls if is_segment_prompt(prompt))
+    # The map round, no regrouping rounds that would not help, then the reduce call
+    assert segment_calls == info["chunks"]
+    assert len(provider.calls) == info["chunks"] + 1
+    assert summary.startswith("## Summary")
+
+def test_map_reduce_rejects_notes_too_large_for_one_call(monkeypatch):
+    provider = FlakyProvider()
+    ai = make_ai(monkeypatch, provider, SUMMARY_CHUNK_TOKENS="20", ADMISSION_MAX_PROMPT_TOKENS="200")
+    transcript = "\n".join(f"Item {i} is on track." for i in range(40))
+
+    with pytest.raises(RequestTooLarge):
+        asyncio.run(ai.summarize_transcript(transcript, chunked=True))
+    assert not any("Notes for part" in prompt for _, prompt in provider.calls)
@@ -0,0 +1,101 @@
+"""
+Tests for the NDJSON batch summarization endpoint on the stub provider
+"""
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+import routes
+from providers import StubProvider
+from store import make_id
+
+def transcript(n: int) -> str:
+    return f"Speaker {n}: Item {n} ships on Friday.\nSpeaker {n + 1}: Agreed, item {n} is ready."
+
+def results(response) -> list:
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+class CountingProvider(StubProvider):
+    """Stub provider that records the most calls it had in flight at once"""
+
+    def __init__(self, latency: float):
+        super().__init__(latency=latency)
+        self.active = 0
+        self.peak = 0
+
+    async def generate(self, model, prompt, context=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            # Prompts marked slow take three times as long
+            if "slow" in prompt:
+                await asyncio.sleep(self.latency * 2)
+            return await super().generate(model, prompt, context)
+        finally:
+            self.active -= 1
+
+def test_each_item_gets_one_line_and_failures_do_not_stop_the_batch():
+    with TestClient(main.app) as client:
+        stored = client.post("/summarize", json={"transcript": transcript(7)}).json()["transcript_id"]
+        response = client.post("/summarize/batch", json={"items": [
+            {"id": "inline", "transcript": transcript(1)},
+            {"id": "by-id", "transcript_id": stored},
+            {"id": "unknown", "transcript_id": "0" * 64},
+            {"id": "empty"},
+        ]})
+
+    assert response.status_code == 200
+    lines = {line["id"]: line for line in results(response)}
+    assert [lines[name]["index"] for name in ("inline", "by-id", "unknown", "empty")] == [0, 1, 2, 3]
+
+    assert lines["inline"]["success"] is True
+    assert lines["inline"]["summary_id"] == make_id(lines["inline"]["summary"])
+    assert lines["inline"]["transcript_id"] == make_id(transcript(1))
+    assert lines["by-id"]["success"] is True
+    assert lines["by-id"]["transcript_id"] == stored
+    assert lines["by-id"]["original_length"] == len(transcript(7))
+    assert lines["unknown"] == {**lines["unknown"], "success": False, "error": "transcript_id not found or expired"}
+    assert lines["empty"]["success"] is False and "transcript_id is required" in lines["empty"]["error"]
+
+def test_lines_arrive_as_items_finish_within_the_concurrency_limit(monkeypatch):
+    monkeypatch.setenv("SUMMARY_BATCH_CONCURRENCY", "3")
+    with TestClient(main.app) as client:
+        provider = CountingProvider(latency=0.05)
+        monkeypatch.setattr(routes.ai_service, "provider", provider)
+        items = [{"transcript": "Sarah: this one is slow."}] + [{"transcript": transcript(n)} for n in range(7)]
+        order = [line["index"] for line in results(client.post("/summarize/batch", json={"items": items}))]
+        assert sorted(order) == list(range(8))
+        assert order[0] != 0
+        assert provider.peak == 3
+
+        # A request may lower the limit but never raise it
+        provider.peak = 0
+        client.post("/summarize/batch", json={"items": items, "concurrency": 2})
+        assert provider.peak == 2
+        provider.peak = 0
+        client.post("/summarize/batch", json={"items": items, "concurrency": 50})
+        assert provider.peak == 3
+
+def test_items_are_charged_one_by_one(monkeypatch):
+    monkeypatch.setenv("CLIENT_TOKEN_BUDGET", "2000")
+    monkeypatch.setenv("SUMMARY_BATCH_CONCURRENCY", "1")
+    monkeypatch.setenv("SUMMARY_BATCH_RPM", "6000")
+    with TestClient(main.app) as client:
+        items = [{"transcript": transcript(n)} for n in range(30)]
+        lines = results(client.post("/summarize/batch", json={"items": items}))
+
+    outcomes = [line["success"] for line in sorted(lines, key=lambda line: line["index"])]
+    # Items succeed until the budget is spent, then each one fails on its own
+    spent = outcomes.index(False)
+    assert spent > 0 and not any(outcomes[spent:])
+    assert "budget" in lines[-1]["error"]
+
+def test_batch_size_is_validated(monkeypatch):
+    monkeypatch.setenv("SUMMARY_BATCH_MAX_ITEMS", "2")
+    with TestClient(main.app) as client:
+        assert client.post("/summarize/batch", json={"items": []}).status_code == 422
+        items = [{"transcript": transcript(n)} for n in range(3)]
+        assert client.post("/summarize/batch", json={"items": items}).status_code == 413
@@ -0,0 +1,143 @@
+"""
+Tests for the content-addressed response cache
+"""
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from cache import PURGE_EVERY, SummaryCache
+from shared_state import SQLiteState
+
+KEY = SummaryCache.make_key("gemini-2.5-flash-lite", "- Ship on Friday")
+
+def test_key_depends_on_model_and_prompt():
+    assert KEY == SummaryCache.make_key("gemini-2.5-flash-lite", "- Ship on Friday")
+    assert KEY != SummaryCache.make_key("gemini-2.5-flash", "- Ship on Friday")
+    # The separator keeps model and prompt from running into each other
+    assert SummaryCache.make_key("a", "bc") != SummaryCache.make_key("ab", "c")
+
+def test_memory_tier_counts_hits_and_misses():
+    cache = SummaryCache(max_bytes=1000)
+
+    async def scenario():
+        assert await cache.get(KEY) is None
+        await cache.set(KEY, "Shipping Friday.")
+        return await cache.get(KEY)
+
+    assert asyncio.run(scenario()) == "Shipping Friday."
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert stats["entries"] == 1 and stats["size"] == len("Shipping Friday.")
+    assert stats["persistent"] is False
+
+def test_memory_tier_stays_within_budget():
+    cache = SummaryCache(max_bytes=10)
+
+    async def scenario():
+        await cache.set("too-big", "x" * 11)
+        for n in range(5):
+            await cache.set(f"key-{n}", "abcd")
+        return await cache.get("too-big"), await cache.get("key-0"), await cache.get("key-4")
+
+    assert asyncio.run(scenario()) == (None, None, "abcd")
+    assert cache.stats()["size"] <= 10
+
+def test_sqlite_tier_survives_restart_and_expires(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "cache.db")
+    first = SummaryCache(db_path=db_path)
+    asyncio.run(first.set(KEY, "Shipping Friday."))
+    first.close()
+
+    restarted = SummaryCache(db_path=db_path)
+    assert asyncio.run(restarted.get(KEY)) == "Shipping Friday."
+    assert restarted.stats()["disk_hits"] == 1
+    restarted.close()
+
+    expired = SummaryCache(ttl=60, db_path=db_path)
+    later = time.time() + 120
+    monkeypatch.setattr("cache.time.time", lambda: later)
+    assert asyncio.run(expired.get(KEY)) is None
+    expired.close()
+
+def test_sqlite_tier_evicts_oldest_beyond_budget(tmp_path):
+    cache = SummaryCache(max_bytes=1, db_path=str(tmp_path / "cache.db"), disk_max_bytes=10)
+
+    async def scenario():
+        for n in range(4):
+            await cache.set(f"key-{n}", "abcd")
+        return [await cache.get(f"key-{n}") for n in range(4)]
+
+    assert asyncio.run(scenario()) == [None, None, "abcd", "abcd"]
+    assert cache.stats()["disk_size"] == 8
+    cache.close()
+
+def test_sqlite_tier_evicts_in_one_pass(tmp_path):
+    cache = SummaryCache(max_bytes=1, db_path=str(tmp_path / "cache.db"), disk_max_bytes=1000)
+
+    async def scenario():
+        for n in range(200):
+            await cache.set(f"key-{n}", "abcd")
+        # Half of the tier goes to make room for one large entry
+        await cache.set("large", "x" * 500)
+
+    asyncio.run(scenario())
+    keys = {row[0] for row in cache._db.execute("SELECT key FROM responses")}
+    assert keys == {"large"} | {f"key-{n}" for n in range(75, 200)}
+    assert cache.stats()["disk_size"] == 1000
+    cache.close()
+
+def test_memory_hits_do_not_wait_for_the_sqlite_tier(tmp_path):
+    cache = SummaryCache(db_path=str(tmp_path / "cache.db"))
+    asyncio.run(cache.set(KEY, "Shipping Friday."))
+    # As if a sweep were running in a worker thread
+    with cache._db_lock:
+        assert asyncio.run(cache.get(KEY)) == "Shipping Friday."
+        assert cache.stats()["hits"] == 1
+    cache.close()
+
+def test_sqlite_tier_sweeps_expired_rows(tmp_path, monkeypatch):
+    cache = SummaryCache(ttl=60, db_path=str(tmp_path / "cache.db"))
+    asyncio.run(cache.set(KEY, "Shipping Friday."))
+    later = time.time() + 120
+    monkeypatch.setattr("cache.time.time", lambda: later)
+
+    async def fill():
+        for n in range(PURGE_EVERY - 1):
+            await cache.set(f"key-{n}", "abcd")
+
+    asyncio.run(fill())
+    # The expired row went without ever being read again
+    keys = {row[0] for row in cache._db.execute("SELECT key FROM responses")}
+    assert KEY not in keys and len(keys) == PURGE_EVERY - 1
+    assert cache.stats()["disk_size"] == 4 * (PURGE_EVERY - 1)
+    cache.close()
+
+def test_shared_tier_is_seen_by_every_worker(tmp_path):
+    state = SQLiteState(str(tmp_path / "state.db"))
+    workers = [SummaryCache(shared=state) for _ in range(2)]
+    asyncio.run(workers[0].set(KEY, "Shipping Friday."))
+    assert asyncio.run(workers[1].get(KEY)) == "Shipping Friday."
+    assert workers[1].stats()["disk_hits"] == 1
+    state.close()
+
+def test_repeated_rephrase_is_served_from_cache(monkeypatch):
+    monkeypatch.setenv("SUMMARY_CACHE_ENABLED", "true")
+    monkeypatch.setenv("SUMMARY_CACHE_DB", "")
+    import main
+
+    with TestClient(main.app) as client:
+        request = {"summary": "## Decisions\n- Ship on Friday", "style": "concise"}
+        first = client.post("/rephrase", json=request).json()
+        second = client.post("/rephrase", json=request).json()
+        stats = client.get("/cache/stats").json()
+
+    assert first["cached"] is False and second["cached"] is True
+    assert second["rephrased_summary"] == first["rephrased_summary"]
+    assert stats["enabled"] is True and stats["hits"] >= 1
+
+def test_cache_stats_when_disabled():
+    import main
+
+    with TestClient(main.app) as client:
+        assert client.get("/cache/stats").json() == {"enabled": False}
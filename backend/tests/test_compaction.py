@@ -0,0 +1,40 @@
+from compaction import compact_transcript, drop_fillers, normalize_speakers, strip_timestamps
+
+def test_strips_timestamps_before_speaker_labels_and_separators():
+    text = "[00:12:31] Sarah: Hello\n(12:32) - Welcome back\n00:12:33.500 | Next item\n12:34:05 MIKE: Agreed"
+    assert strip_timestamps(text) == "Sarah: Hello\nWelcome back\nNext item\nMIKE: Agreed"
+
+def test_keeps_clock_times_in_speech():
+    assert strip_timestamps("2:30 PM works for me") == "2:30 PM works for me"
+    assert strip_timestamps("10:00 is the deadline for the draft") == "10:00 is the deadline for the draft"
+    assert strip_timestamps("[10:00] is the deadline") == "[10:00] is the deadline"
+
+def test_drops_standalone_fillers():
+    assert " ".join(drop_fillers("Um, so we, uh, agreed. Mm-hmm.").split()) == "so we, agreed. ."
+
+def test_keeps_words_that_contain_fillers():
+    assert drop_fillers("the HMM model") == "the HMM model"
+    assert drop_fillers("an um-brella and a hummus") == "an um-brella and a hummus"
+    assert drop_fillers("UM is a university") == "UM is a university"
+
+def test_compact_transcript_keeps_meaning():
+    text = "[00:00:01] SARAH: Um, 2:30 PM works for me.\n[00:00:05] SARAH: The HMM model ships Friday."
+    compacted, report = compact_transcript(text)
+    assert compacted == "SARAH: 2:30 PM works for me. The HMM model ships Friday."
+    assert report["saved_chars"] == len(text) - len(compacted)
+
+def test_section_headers_are_not_speakers():
+    text = "Sarah: We agreed on Friday.\nDecision: ship Friday\nDecision: hire two engineers\nAction items:\nNote: budget is fixed\nSarah: Thanks all."
+    assert normalize_speakers(text) == text
+
+def test_one_off_labels_are_left_alone():
+    text = "Sarah: Welcome.\nMike: Hi.\nSarah: Let's start.\nReminder: lunch at noon"
+    assert normalize_speakers(text) == "Sarah: Welcome.\nMike: Hi.\nSarah: Let's start.\nReminder: lunch at noon"
+
+def test_speakers_keep_their_casing_and_merge_across_it():
+    text = "[CEO]: Revenue is up.\nCEO : Costs are flat.\nSarah Chen: Good.\nSARAH CHEN: Next item.\nCEO: Agreed."
+    assert normalize_speakers(text) == "CEO: Revenue is up. Costs are flat.\nSarah Chen: Good. Next item.\nCEO: Agreed."
+
+def test_turns_continue_over_plain_lines_but_not_over_headers():
+    text = "Sarah: First point\nsecond line of it\nSarah: third\nNote: off the record\nSarah: fourth"
+    assert normalize_speakers(text) == "Sarah: First point\nsecond line of it third\nNote: off the record\nSarah: fourth"
@@ -0,0 +1,33 @@
+"""
+Tests for parsing settings from the environment
+"""
+import pytest
+
+import config
+from config import Settings, get_settings
+
+def test_values_are_parsed_by_type(monkeypatch):
+    monkeypatch.setenv("GEMINI_MAX_RETRIES", "7")
+    monkeypatch.setenv("GEMINI_TIMEOUT", "2.5")
+    monkeypatch.setenv("AI_FALLBACK_ENABLED", "False")
+    monkeypatch.setenv("SUMMARY_CACHE_DB", "")
+    monkeypatch.setenv("AI_MODEL_FAST", "gemini-test")
+    settings = Settings.from_env()
+    assert (settings.gemini_max_retries, settings.gemini_timeout) == (7, 2.5)
+    assert settings.ai_fallback_enabled is False
+    # Empty optional values count as unset
+    assert settings.summary_cache_db is None
+    assert settings.ai_model_fast == "gemini-test"
+    assert settings.ai_model_strong == Settings().ai_model_strong
+
+def test_invalid_value_names_the_variable(monkeypatch):
+    monkeypatch.setenv("GEMINI_RPM", "lots")
+    with pytest.raises(ValueError, match="GEMINI_RPM"):
+        Settings.from_env()
+
+def test_settings_are_parsed_once(monkeypatch):
+    first = get_settings()
+    monkeypatch.setenv("GEMINI_MAX_RETRIES", "9")
+    assert get_settings() is first
+    config.reset_settings()
+    assert get_settings().gemini_max_retries == 9
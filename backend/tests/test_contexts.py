@@ -0,0 +1,71 @@
+"""
+Tests for provider-side transcript contexts on the stub provider
+"""
+import asyncio
+
+from ai import RecapFlowAI
+from metrics import CONTEXT_CACHE
+
+TRANSCRIPT = "\n".join(f"Speaker {i % 4}: Point {i} about the quarterly roadmap review." for i in range(60))
+
+def make_ai(monkeypatch) -> RecapFlowAI:
+    monkeypatch.setenv("CONTEXT_CACHE_ENABLED", "true")
+    monkeypatch.setenv("CONTEXT_CACHE_MIN_TOKENS", "100")
+    monkeypatch.setenv("AI_STUB_LATENCY", "0.02")
+    return RecapFlowAI()
+
+def test_concurrent_prompts_share_one_upload(monkeypatch):
+    ai = make_ai(monkeypatch)
+    created = CONTEXT_CACHE.value(outcome="created")
+    prompts = ("List the decisions", "List the action items", "List the open questions")
+    infos = [{} for _ in prompts]
+
+    async def scenario():
+        return await asyncio.gather(*(
+            ai.summarize_transcript(TRANSCRIPT, prompt, info) for prompt, info in zip(prompts, infos)
+        ))
+
+    asyncio.run(scenario())
+    assert CONTEXT_CACHE.value(outcome="created") - created == 1
+    assert len(ai.provider.contexts) == 1
+    assert all(info["context_cached"] for info in infos)
+
+def test_expired_context_is_recreated(monkeypatch):
+    ai = make_ai(monkeypatch)
+    expired = CONTEXT_CACHE.value(outcome="expired")
+
+    async def scenario():
+        await ai.summarize_transcript(TRANSCRIPT, "List the decisions")
+        # The provider drops the context before its TTL, as Gemini may
+        ai.provider.contexts.clear()
+        info = {}
+        # The call still succeeds by sending the full prompt...
+        assert await ai.summarize_transcript(TRANSCRIPT, "List the action items", info)
+        assert info["context_cached"] is False
+        # ...and the next one uploads a fresh context
+        info = {}
+        await ai.summarize_transcript(TRANSCRIPT, "List the open questions", info)
+        return info
+
+    assert asyncio.run(scenario())["context_cached"] is True
+    assert CONTEXT_CACHE.value(outcome="expired") - expired == 1
+    assert len(ai.provider.contexts) == 1
+
+def test_stop_deletes_contexts(monkeypatch):
+    ai = make_ai(monkeypatch)
+
+    async def scenario():
+        ai.contexts.start()
+        await ai.summarize_transcript(TRANSCRIPT, "List the decisions")
+        assert ai.provider.contexts
+        await ai.contexts.stop()
+
+    asyncio.run(scenario())
+    assert ai.provider.contexts == {}
+
+def test_short_transcript_is_sent_inline(monkeypatch):
+    ai = make_ai(monkeypatch)
+    info = {}
+    asyncio.run(ai.summarize_transcript("Sarah: Ship it on Friday.", "List the decisions", info))
+    assert ai.provider.contexts == {}
+    assert "context_cached" not in info
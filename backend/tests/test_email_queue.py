@@ -0,0 +1,125 @@
+"""
+Tests for the background email queue
+"""
+import asyncio
+import time
+
+from benchmarks.load_test import SMTPSink
+from email_queue import EmailQueue, FAILED, PARTIAL, SENDING, SENT
+from emailer import RecapFlowEmailer
+from shared_state import SQLiteState
+
+class FakeEmailer:
+    """Records deliveries; fan-out sends raise until ``broken`` is cleared"""
+
+    def __init__(self, dropped: int = 0):
+        self.broken = True
+        self.dropped = dropped
+        self.sent = []
+
+    async def deliver(self, **payload):
+        if self.dropped:
+            self.dropped -= 1
+            raise ConnectionResetError("connection dropped")
+        self.sent.append(payload)
+        return {}
+
+    async def deliver_fanout(self, **payload):
+        if self.broken:
+            raise RuntimeError("template exploded")
+        self.sent.append(payload)
+        return {recipient: {"status": "sent"} for recipient in payload["recipients"]}
+
+async def wait_finished(queue, job_id):
+    for _ in range(200):
+        job = await queue.get(job_id)
+        if job["status"] in (SENT, PARTIAL, FAILED):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} stuck in {job['status']}")
+
+def test_unexpected_error_fails_job_and_keeps_workers(monkeypatch):
+    monkeypatch.setenv("EMAIL_QUEUE_WORKERS", "1")
+
+    async def scenario():
+        emailer = FakeEmailer()
+        queue = EmailQueue(emailer)
+        await queue.start()
+        crashed = await queue.enqueue({"recipients": ["a@example.com"], "fanout": True})
+        job = await wait_finished(queue, crashed)
+        assert job["status"] == FAILED
+        assert "template exploded" in job["error"]
+
+        # The single worker survived and picks up the next jobs
+        emailer.broken = False
+        fanout = await queue.enqueue({"recipients": ["b@example.com"], "fanout": True})
+        single = await queue.enqueue({"recipients": ["c@example.com"]})
+        assert (await wait_finished(queue, fanout))["status"] == SENT
+        assert (await wait_finished(queue, single))["status"] == SENT
+        assert all(not task.done() for task in queue._tasks)
+        await queue.stop(timeout=1)
+
+    asyncio.run(scenario())
+
+def test_stop_waits_for_pending_retries(monkeypatch):
+    monkeypatch.setenv("EMAIL_QUEUE_RETRY_DELAY", "0.1")
+    monkeypatch.setenv("EMAIL_QUEUE_POLL_INTERVAL", "0.01")
+
+    async def scenario():
+        emailer = FakeEmailer(dropped=1)
+        queue = EmailQueue(emailer)
+        await queue.start()
+        job_id = await queue.enqueue({"recipients": ["a@example.com"]})
+        while not queue._retry_timers:
+            await asyncio.sleep(0.01)
+        # Nothing is queued while the retry timer runs, but the job is not done
+        await queue.stop(timeout=5)
+        job = await queue.get(job_id)
+        assert job["status"] == SENT
+        assert job["attempts"] == 2
+
+    asyncio.run(scenario())
+
+def test_requeue_stale_updates_job_status(tmp_path):
+    state = SQLiteState(str(tmp_path / "state.db"))
+    now = time.time()
+    for job_id, updated in (("stale", now - 600), ("fresh", now)):
+        state.save_job({"id": job_id, "status": "queued", "updated_at": updated, "available_at": 0.0, "payload": {}})
+    claimed = state.claim_jobs(10)
+    assert {job["id"] for job in claimed} == {"stale", "fresh"}
+    # Backdate one claim, as if its worker died long ago
+    state._db.execute("UPDATE jobs SET updated = ? WHERE id = 'stale'", (now - 600,))
+
+    assert state.requeue_stale(300) == 1
+    assert state.load_job("stale")["status"] == "queued"
+    assert state.load_job("fresh")["status"] == SENDING
+    assert [job["id"] for job in state.claim_jobs(10)] == ["stale"]
+    state.close()
+
+def test_refused_recipients_are_reported(monkeypatch):
+    monkeypatch.setenv("SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setenv("SMTP_STARTTLS", "false")
+
+    async def scenario():
+        sink = SMTPSink(refuse=["gone@example.com", "left@example.com"])
+        monkeypatch.setenv("SMTP_PORT", str(await sink.start()))
+        emailer = RecapFlowEmailer()
+        queue = EmailQueue(emailer)
+        await queue.start()
+        try:
+            partial = await queue.enqueue({"recipients": ["a@example.com", "gone@example.com"], "summary": "- Ship Friday"})
+            failed = await queue.enqueue({"recipients": ["gone@example.com", "left@example.com"], "summary": "- Ship Friday"})
+            return await wait_finished(queue, partial), await wait_finished(queue, failed)
+        finally:
+            await queue.stop(timeout=1)
+            await emailer.close()
+            await sink.stop()
+
+    partial, failed = asyncio.run(scenario())
+    assert partial["status"] == PARTIAL
+    assert partial["report"]["a@example.com"] == {"status": "sent"}
+    assert partial["report"]["gone@example.com"]["status"] == "refused"
+    assert partial["report"]["gone@example.com"]["error"].startswith("550")
+    # Refused by every address: nothing was sent, and it is not retried
+    assert failed["status"] == FAILED and failed["attempts"] == 1
+    assert {entry["status"] for entry in failed["report"].values()} == {"refused"}
@@ -0,0 +1,49 @@
+"""
+Tests for the summary email markdown renderer
+"""
+from cachetools import LRUCache
+
+import emailer
+from emailer import clear_render_cache, markdown_to_html, render_markdown
+
+def test_table_cells_split_before_inline_rendering():
+    html = markdown_to_html("| Flag | Meaning |\n| --- | --- |\n| `a|b` | **either** |")
+    # A code span cannot cross a cell boundary; each cell is rendered on its own
+    assert "<code" not in html
+    assert '>`a</td>' in html and '>b`</td>' in html
+    assert '><strong>either</strong></td>' in html
+
+def test_escaped_pipe_stays_in_cell():
+    html = markdown_to_html("| Cmd |\n| --- |\n| `x \\| y` |")
+    assert html.count("<td") == 1
+    assert ">x | y</code></td>" in html
+
+def test_disallowed_link_dropped_whole():
+    html = markdown_to_html("See [link](javascript:alert(1)) now")
+    assert "See link now" in html
+    assert "href" not in html and "alert" not in html
+
+def test_link_with_parentheses():
+    html = markdown_to_html("[Rust](https://en.wikipedia.org/wiki/Rust_(programming_language))")
+    assert '<a href="https://en.wikipedia.org/wiki/Rust_(programming_language)">Rust</a>' in html
+
+def test_fast_paths_render_like_the_block_patterns():
+    text = "- a\n-b\n- - -\n* **x**\n  - nested\n1. one\nplain *text*"
+    assert render_markdown(text) == (
+        "<ul><li>a\n</li></ul>\n<p>-b</p>\n<hr>\n<ul><li><strong>x</strong>\n<ul><li>nested\n</li></ul>\n"
+        "</li></ul>\n<ol><li>one\n</li></ol>\n<p>plain <em>text</em></p>"
+    )
+
+def test_render_cache_is_keyed_by_digest_and_bounded(monkeypatch):
+    monkeypatch.setattr(emailer, "_render_cache", LRUCache(maxsize=64, getsizeof=len))
+    summary = "- Ship on **Friday**"
+    assert markdown_to_html(summary) == render_markdown(summary)
+    assert summary not in emailer._render_cache and len(emailer._render_cache) == 1
+    # Renders larger than the whole budget are not kept
+    markdown_to_html("- " + "long " * 20)
+    assert len(emailer._render_cache) == 1
+
+    monkeypatch.setattr(emailer, "render_markdown", lambda text: "stale")
+    assert markdown_to_html(summary) != "stale"
+    clear_render_cache()
+    assert markdown_to_html(summary) == "stale"
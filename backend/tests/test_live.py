@@ -0,0 +1,108 @@
+"""
+Tests for live incremental summarization over WebSocket on the stub provider
+"""
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import main
+from store import make_id
+
+SEGMENTS = [
+    "Sarah: Welcome, let's review the launch plan.",
+    "Mike: Marketing assets are ready for Friday.",
+    "Sarah: Great, then we ship on Friday.",
+]
+
+def segment(text: str) -> dict:
+    return {"type": "segment", "text": text}
+
+def closed_with(websocket) -> int:
+    """Close code the server ended the session with"""
+    with pytest.raises(WebSocketDisconnect) as closed:
+        websocket.receive_json()
+    return closed.value.code
+
+def test_summary_is_updated_per_segment_and_final_is_ready(monkeypatch):
+    monkeypatch.setenv("LIVE_SUMMARY_INTERVAL", "0")
+    with TestClient(main.app) as client, client.websocket_connect("/summarize/live") as websocket:
+        updates = []
+        for text in SEGMENTS:
+            websocket.send_json(segment(text))
+            updates.append(websocket.receive_json())
+        websocket.send_json({"type": "end"})
+        final = websocket.receive_json()
+        assert closed_with(websocket) == 1000
+
+    assert [(update["type"], update["version"], update["segments"]) for update in updates] == [
+        ("summary", 1, 1), ("summary", 2, 2), ("summary", 3, 3)
+    ]
+    # Each update folds in only the new segment
+    assert "launch plan" in updates[0]["summary"] and "ship on Friday" in updates[2]["summary"]
+    assert final["type"] == "final" and final["success"] is True
+    # Nothing was pending, so the last rolling summary is the final one
+    assert final["summary"] == updates[-1]["summary"]
+    assert (final["segments"], final["updates"]) == (3, 3)
+    assert final["transcript_id"] == make_id("\n".join(SEGMENTS))
+    assert final["summary_id"] == make_id(final["summary"])
+
+def test_segments_within_the_interval_are_batched(monkeypatch):
+    monkeypatch.setenv("LIVE_SUMMARY_INTERVAL", "60")
+    with TestClient(main.app) as client, client.websocket_connect("/summarize/live") as websocket:
+        websocket.send_json(segment(SEGMENTS[0]))
+        first = websocket.receive_json()
+        # Too soon for another update; ending the meeting folds both at once
+        websocket.send_json(segment(SEGMENTS[1]))
+        websocket.send_json(segment(SEGMENTS[2]))
+        websocket.send_json({"type": "end"})
+        second = websocket.receive_json()
+        final = websocket.receive_json()
+
+    assert (first["version"], first["segments"]) == (1, 1)
+    assert (second["version"], second["segments"], second["pending_segments"]) == (2, 3, 0)
+    assert (final["type"], final["updates"], final["summary"]) == ("final", 2, second["summary"])
+
+def test_bad_messages_are_reported_without_ending_the_session(monkeypatch):
+    monkeypatch.setenv("LIVE_SUMMARY_INTERVAL", "0")
+    with TestClient(main.app) as client, client.websocket_connect("/summarize/live") as websocket:
+        websocket.send_text("not json")
+        assert websocket.receive_json() == {"type": "error", "detail": "Messages must be JSON"}
+        websocket.send_json({"type": "segment", "text": 42})
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_json(segment(SEGMENTS[0]))
+        assert websocket.receive_json()["type"] == "summary"
+
+def test_session_without_segments_fails(monkeypatch):
+    with TestClient(main.app) as client, client.websocket_connect("/summarize/live") as websocket:
+        websocket.send_json({"type": "end"})
+        assert "No transcript segments" in websocket.receive_json()["detail"]
+        assert closed_with(websocket) == 1011
+
+def test_oversized_session_is_closed(monkeypatch):
+    monkeypatch.setenv("LIVE_SESSION_MAX_CHARS", "60")
+    monkeypatch.setenv("LIVE_SUMMARY_INTERVAL", "60")
+    with TestClient(main.app) as client, client.websocket_connect("/summarize/live") as websocket:
+        websocket.send_json(segment(SEGMENTS[0]))
+        assert websocket.receive_json()["type"] == "summary"
+        websocket.send_json(segment(SEGMENTS[1]))
+        assert websocket.receive_json() == {"type": "error", "detail": "Live transcript exceeds 60 characters"}
+        assert closed_with(websocket) == 1009
+
+def test_updates_are_charged_to_the_client(monkeypatch):
+    monkeypatch.setenv("LIVE_SUMMARY_INTERVAL", "0")
+    monkeypatch.setenv("CLIENT_TOKEN_BUDGET", "2000")
+    monkeypatch.setenv("CLIENT_ID_HEADER", "X-Client")
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/summarize/live", headers={"X-Client": "team-live"}) as websocket:
+            for i in range(100):
+                websocket.send_json(segment(f"Mike: Item {i} is on track."))
+                message = websocket.receive_json()
+                if message["type"] != "summary":
+                    break
+        # Out of budget: the update fails, but the session stays open
+        assert message["type"] == "error" and message["retry_after"] > 0
+        assert i > 0
+        # Larger than the update that was turned away, so it cannot fit in what is left
+        transcript = "\n".join(f"Sarah: Item {i} again." for i in range(100))
+        response = client.post("/summarize", json={"transcript": transcript}, headers={"X-Client": "team-live"})
+        assert response.status_code == 429
@@ -0,0 +1,38 @@
+"""
+Offline end-to-end tests: the API with the stub AI provider and an SMTP sink
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks import load_test
+from metrics import HTTP_REQUESTS
+
+def test_load_test_runs_every_scenario_cleanly():
+    args = argparse.Namespace(
+        requests=6, concurrency=3, workers=1, scenarios=list(load_test.SCENARIOS),
+        ai_latency=0.0, response_chars=200, smtp_latency=0.0, timeout=20.0,
+        cache=False, verbose=False
+    )
+    start = time.perf_counter()
+    report = asyncio.run(load_test.run(args))
+
+    for scenario in load_test.SCENARIOS:
+        result = report["scenarios"][scenario]
+        assert result["requests"] == 6
+        assert result["errors"] == {}, scenario
+    assert report["scenarios"]["send-email"]["smtp"]["delivered"] == 6
+    # The server shuts down promptly rather than being killed after a timeout
+    assert time.perf_counter() - start < 10
+
+def test_metrics_label_requests_by_route_template():
+    with TestClient(main.app) as client:
+        for job_id in ("0" * 32, "f" * 32):
+            assert client.get(f"/send-email/{job_id}").status_code == 404
+        metrics = client.get("/metrics").text
+
+    assert HTTP_REQUESTS.value(route="/send-email/{job_id}", method="GET", status=404) >= 2
+    assert "0" * 32 not in metrics
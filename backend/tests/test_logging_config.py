@@ -0,0 +1,84 @@
+"""
+Tests for the queue-based logging pipeline
+"""
+import json
+import logging
+import os
+import queue
+
+import pytest
+
+import logging_config
+from logging_config import DebugSampler, NonBlockingQueueHandler, setup_logging, shutdown_logging
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path):
+    """Run ``setup_logging`` from scratch; returns the log file path, with ``{pid}`` filled in"""
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level, logging_config._listener
+    logging_config._listener = None
+    monkeypatch.setenv("LOG_FILE", str(tmp_path / "app.{pid}.log"))
+    monkeypatch.setenv("LOG_LEVEL", "DEBUG")
+    yield str(tmp_path / f"app.{os.getpid()}.log")
+    shutdown_logging()
+    root.handlers[:] = saved[0]
+    root.setLevel(saved[1])
+    logging_config._listener = saved[2]
+
+def read_lines(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+def test_records_are_written_as_json_on_shutdown(pipeline, capsys):
+    setup_logging()
+    logger = logging.getLogger("RecapFlow.Test")
+    logger.info("Summarized %d chars", 120, extra={"request_id": "abc"})
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Call failed")
+    # Stopping the listener writes everything still queued
+    shutdown_logging()
+
+    first, second = (json.loads(line) for line in read_lines(pipeline))
+    assert (first["level"], first["logger"], first["message"]) == ("INFO", "RecapFlow.Test", "Summarized 120 chars")
+    assert first["request_id"] == "abc"
+    assert second["message"] == "Call failed" and "ValueError: boom" in second["exception"]
+    assert "RecapFlow.Test - INFO - Summarized 120 chars" in capsys.readouterr().out
+
+def test_text_file_format_and_single_setup(pipeline, monkeypatch):
+    monkeypatch.setenv("LOG_FORMAT", "text")
+    setup_logging()
+    setup_logging()
+    assert len(logging.getLogger().handlers) == 1
+    logging.getLogger("RecapFlow.Test").warning("Queue is %s", "full")
+    shutdown_logging()
+    assert read_lines(pipeline)[-1].endswith("RecapFlow.Test - WARNING - Queue is full")
+
+def test_arguments_are_merged_when_queued():
+    log_queue = queue.Queue()
+    handler = NonBlockingQueueHandler(log_queue)
+    items = ["first"]
+    record = logging.LogRecord("RecapFlow.Test", logging.INFO, __file__, 1, "Items: %s", (items,), None)
+    handler.handle(record)
+    items.append("second")
+    assert log_queue.get_nowait().getMessage() == "Items: ['first']"
+
+def test_full_queue_drops_instead_of_blocking():
+    log_queue = queue.Queue(maxsize=1)
+    handler = NonBlockingQueueHandler(log_queue)
+    for n in range(3):
+        handler.handle(logging.LogRecord("RecapFlow.Test", logging.INFO, __file__, n, "record %d", (n,), None))
+    assert log_queue.qsize() == 1
+    assert log_queue.get_nowait().getMessage() == "record 0"
+
+def test_debug_records_are_sampled_per_call_site():
+    sampler = DebugSampler(3)
+
+    def record(level, line):
+        return logging.LogRecord("RecapFlow.Test", level, __file__, line, "message", (), None)
+
+    assert [sampler.filter(record(logging.DEBUG, 1)) for _ in range(6)] == [True, False, False, True, False, False]
+    # Another call site has its own count, and INFO always passes
+    assert sampler.filter(record(logging.DEBUG, 2))
+    assert all(sampler.filter(record(logging.INFO, 1)) for _ in range(3))
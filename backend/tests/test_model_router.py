@@ -0,0 +1,52 @@
+"""
+Tests for model routing
+"""
+import model_router
+from model_router import ModelRouter
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+def test_demoted_model_is_preferred_again_once_it_recovers(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(model_router.time, "monotonic", clock.monotonic)
+    monkeypatch.setenv("AI_ROUTING_LATENCY_BUDGET", "5")
+    monkeypatch.setenv("AI_ROUTING_LATENCY_WINDOW", "60")
+    router = ModelRouter()
+    fast, strong = router.fast_model, router.strong_model
+
+    for _ in range(10):
+        router.record(fast, 30.0, 100, 50)
+        router.record(strong, 2.0, 100, 50)
+    assert router.candidates("summary", 100) == [strong, fast]
+
+    # Demoted, the fast model gets no calls; its slow samples age out
+    clock.now += 30
+    router.record(strong, 2.0, 100, 50)
+    assert router.candidates("summary", 100) == [strong, fast]
+    clock.now += 31
+    assert router.candidates("summary", 100) == [fast, strong]
+
+    # Back in front and fast again, it stays there
+    router.record(fast, 1.0, 100, 50)
+    assert router.candidates("summary", 100) == [fast, strong]
+
+def test_still_slow_model_is_demoted_again(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(model_router.time, "monotonic", clock.monotonic)
+    monkeypatch.setenv("AI_ROUTING_LATENCY_BUDGET", "5")
+    monkeypatch.setenv("AI_ROUTING_LATENCY_WINDOW", "60")
+    router = ModelRouter()
+    fast, strong = router.fast_model, router.strong_model
+
+    router.record(fast, 30.0, 100, 50)
+    router.record(strong, 2.0, 100, 50)
+    clock.now += 61
+    router.record(strong, 2.0, 100, 50)
+    assert router.candidates("rephrase", 100) == [fast, strong]
+    router.record(fast, 30.0, 100, 50)
+    assert router.candidates("rephrase", 100) == [strong, fast]
@@ -0,0 +1,169 @@
+"""
+Tests for the near-duplicate transcript index
+"""
+import hashlib
+import random
+
+from fastapi.testclient import TestClient
+
+from near_duplicates import BUCKET_SIZE, NearDuplicateIndex, _BandTable, signature, similarity, transcript_diff
+
+TRANSCRIPT = "\n".join(
+    f"[00:{i // 60:02d}:{i % 60:02d}] Speaker {i % 5}: item {i} covers the {['budget', 'launch', 'hiring', 'roadmap'][i % 4]} plan for week {i}"
+    for i in range(120)
+)
+
+def make_id(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def edited(text: str, lines: int) -> str:
+    """``text`` with its first ``lines`` lines reworded"""
+    parts = text.split("\n")
+    for i in range(lines):
+        parts[i] = f"Speaker 9: something entirely different number {i} was said here instead"
+    return "\n".join(parts)
+
+# _BandTable
+
+def test_band_table_remove_keeps_colliding_keys_reachable():
+    table = _BandTable(8)
+    size = table.mask + 1
+    # Same home position, plus neighbours whose probe chains run through it
+    keys = [3, 3 + size, 3 + 2 * size, 4, 3 + 3 * size, 5 + size]
+    for slot, key in enumerate(keys):
+        table.add(key, slot)
+    for removed in (keys[0], keys[2]):
+        table.remove(removed, keys.index(removed))
+        assert table.get(removed) == []
+    for slot, key in enumerate(keys):
+        if key not in (keys[0], keys[2]):
+            assert table.get(key) == [slot]
+
+def test_band_table_remove_across_wraparound():
+    table = _BandTable(8)
+    last = table.mask
+    keys = [last, last + table.mask + 1, 0, last + 2 * (table.mask + 1)]
+    for slot, key in enumerate(keys):
+        table.add(key, slot)
+    table.remove(keys[0], 0)
+    assert [table.get(key) for key in keys] == [[], [1], [2], [3]]
+
+def test_band_table_keeps_every_entry_sharing_a_key():
+    table = _BandTable(8)
+    table.add(7, 1)
+    table.add(7, 2)
+    assert sorted(table.get(7)) == [1, 2]
+    table.remove(7, 1)
+    assert table.get(7) == [2]
+    # Removing an entry that is not there leaves the others
+    table.remove(7, 1)
+    assert table.get(7) == [2]
+
+def test_band_table_caps_entries_per_key_and_grows():
+    table = _BandTable()
+    assert all(table.add(7, slot) for slot in range(BUCKET_SIZE))
+    assert not table.add(7, BUCKET_SIZE)
+    initial = table.mask
+    for slot in range(100):
+        table.add(1000 + slot, slot)
+    assert table.mask > initial
+    assert len(table.get(7)) == BUCKET_SIZE
+    assert all(table.get(1000 + slot) == [slot] for slot in range(100))
+
+def test_band_table_matches_a_dict_under_churn():
+    rng = random.Random(7)
+    table = _BandTable(64)
+    size = table.mask + 1
+    # Few home positions, so nearly every operation runs through a collision chain
+    pool = [rng.randrange(4) + size * rng.randrange(1 << 20) for _ in range(50)]
+    reference = {}
+    stored = 0
+    for step in range(5000):
+        key = rng.choice(pool)
+        if reference.get(key) and rng.random() < 0.5:
+            slot = rng.choice(sorted(reference[key]))
+            table.remove(key, slot)
+            reference[key].discard(slot)
+            stored -= 1
+        elif stored < 48 and len(reference.get(key, ())) < BUCKET_SIZE:
+            assert table.add(key, step)
+            reference.setdefault(key, set()).add(step)
+            stored += 1
+        for probe in rng.sample(pool, 5):
+            assert set(table.get(probe)) == reference.get(probe, set())
+
+# NearDuplicateIndex
+
+def test_index_evicts_oldest_entry_when_full(monkeypatch):
+    monkeypatch.setenv("NEAR_DUPLICATE_CAPACITY", "3")
+    index = NearDuplicateIndex()
+    texts = [TRANSCRIPT.replace("Speaker", f"Team{n} speaker") for n in range(4)]
+    for text in texts:
+        index.add(signature(text), 0, make_id(text), make_id(text + "summary"))
+
+    assert len(index) == 3
+    assert index.query(signature(texts[0]), 0) is None
+    for text in texts[1:]:
+        match = index.query(signature(text), 0)
+        assert match["transcript_id"] == make_id(text)
+        assert match["summary_id"] == make_id(text + "summary")
+
+def test_entries_sharing_bands_are_both_found():
+    index = NearDuplicateIndex()
+    original = signature(TRANSCRIPT)
+    # The same transcript summarized with two sets of options shares every band
+    index.add(original, 1, make_id(TRANSCRIPT), make_id("summary 1"))
+    index.add(original, 2, make_id(TRANSCRIPT), make_id("summary 2"))
+    assert index.query(original, 1)["summary_id"] == make_id("summary 1")
+    assert index.query(original, 2)["summary_id"] == make_id("summary 2")
+
+def test_query_honours_threshold_and_options():
+    index = NearDuplicateIndex()
+    original = signature(TRANSCRIPT)
+    index.add(original, 1, make_id(TRANSCRIPT), make_id("summary"))
+
+    # Only timestamps differ: an exact match
+    retimed = TRANSCRIPT.replace("[00:", "[01:")
+    assert index.query(signature(retimed), 1)["similarity"] == 1.0
+
+    near = signature(edited(TRANSCRIPT, 6))
+    score = similarity(near, original)
+    assert 0.8 <= score < 1.0
+    index.threshold = score
+    assert index.query(near, 1)["similarity"] == score
+    index.threshold = score + 1 / 64
+    assert index.query(near, 1) is None
+
+    index.threshold = 0.8
+    assert index.query(near, 2) is None
+    assert index.query(signature(edited(TRANSCRIPT, 90)), 1) is None
+
+def test_transcript_diff_ignores_formatting():
+    old = "[00:00:01] Sarah: Ship it Friday.\n[00:00:05] Mike: Budget is fine.\nSarah: Thanks."
+    new = "[00:10:01] sarah: ship it friday\nMike: Budget is over by 5%.\nSarah: Thanks!"
+    assert transcript_diff(old, new) == (["[00:00:05] Mike: Budget is fine."], ["Mike: Budget is over by 5%."])
+    assert transcript_diff(old, old.upper()) == ([], [])
+
+# /summarize
+
+def test_summarize_reuses_and_revises_near_duplicates(monkeypatch):
+    monkeypatch.setenv("NEAR_DUPLICATE_ENABLED", "true")
+    monkeypatch.setenv("NEAR_DUPLICATE_CAPACITY", "100")
+    import main
+
+    with TestClient(main.app) as client:
+        first = client.post("/summarize", json={"transcript": TRANSCRIPT}).json()
+        assert first["near_duplicate"] is None
+
+        retimed = client.post("/summarize", json={"transcript": TRANSCRIPT.replace("[00:", "[02:")}).json()
+        assert retimed["near_duplicate"]["outcome"] == "reused"
+        assert retimed["summary"] == first["summary"]
+
+        revised = client.post("/summarize", json={"transcript": edited(TRANSCRIPT, 2)}).json()
+        assert revised["near_duplicate"]["outcome"] == "revised"
+        assert revised["near_duplicate"]["removed_lines"] == 2
+        assert revised["near_duplicate"]["added_lines"] == 2
+
+        # Different options never reuse a summary made with others
+        custom = client.post("/summarize", json={"transcript": TRANSCRIPT, "custom_prompt": "Only decisions"}).json()
+        assert custom["near_duplicate"] is None
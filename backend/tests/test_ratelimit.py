@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from ratelimit import RateLimiter, SharedTokenBucket, TokenBucket
+from shared_state import SQLiteState
+
+def test_try_acquire_keeps_reserve():
+    bucket = TokenBucket(rate=0.001, capacity=100)
+    assert bucket.try_acquire(70, reserve=20)
+    assert not bucket.try_acquire(20, reserve=20)
+    assert bucket.try_acquire(10, reserve=20)
+
+def test_take_reports_wait_without_taking():
+    bucket = TokenBucket(rate=10, capacity=100)
+    assert bucket.take(100) == 0
+    assert bucket.take(50) == pytest.approx(5, rel=0.01)
+    assert bucket.available() < 1
+
+def test_shared_take_keeps_reserve(tmp_path):
+    state = SQLiteState(str(tmp_path / "state.db"))
+    try:
+        assert state.take("b", 0.001, 100, 70, reserve=20) == 0
+        assert state.take("b", 0.001, 100, 20, reserve=20) > 0
+        assert state.take("b", 0.001, 100, 20) == 0
+    finally:
+        state.close()
+
+def test_limiter_acquire_spare_leaves_headroom():
+    limiter = RateLimiter(requests_per_minute=10, tokens_per_minute=1000)
+
+    async def spare():
+        return [await limiter.acquire_spare(100, reserve=0.5) for _ in range(8)]
+
+    # Five calls use half of the token bucket; the rest is left to users
+    assert asyncio.run(spare()) == [True] * 5 + [False] * 3
+
+def test_failed_shared_pause_is_logged(caplog):
+    class LockedState:
+        def block(self, bucket, seconds):
+            raise RuntimeError("database is locked")
+
+    async def pause():
+        SharedTokenBucket(LockedState(), "gemini", rate=1, capacity=1).pause(5)
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if caplog.records:
+                break
+
+    asyncio.run(pause())
+    assert "database is locked" in caplog.text
@@ -0,0 +1,34 @@
+"""
+Tests for the server entry point
+"""
+import os
+
+import pytest
+import uvicorn
+
+import main
+
+@pytest.fixture
+def started(monkeypatch):
+    """Run ``run_server`` without starting uvicorn; returns the LOG_FILE each worker would use"""
+    monkeypatch.setattr(uvicorn, "run", lambda *args, **kwargs: None)
+    monkeypatch.setenv("SHARED_STATE_URL", "sqlite:///unused.db")
+
+    def start(*argv):
+        main.run_server(list(argv))
+        return os.environ.get("LOG_FILE")
+    return start
+
+@pytest.mark.parametrize("configured, expected", [
+    ("recapflow.log", "recapflow.{pid}.log"),
+    ("logs/app.json", "logs/app.{pid}.json"),
+    ("app.{pid}.log", "app.{pid}.log"),
+    ("", ""),
+])
+def test_workers_get_their_own_log_file(monkeypatch, started, configured, expected):
+    monkeypatch.setenv("LOG_FILE", configured)
+    assert started("--workers", "2") == expected
+
+def test_single_worker_keeps_log_file(monkeypatch, started):
+    monkeypatch.setenv("LOG_FILE", "recapflow.log")
+    assert started("--workers", "1") == "recapflow.log"
@@ -0,0 +1,53 @@
+"""
+Tests for the shared state and provider interfaces
+"""
+import time
+
+import pytest
+
+from providers import Provider, StubProvider
+from shared_state import PURGE_EVERY, SharedState, SQLiteState
+
+def test_incomplete_backends_fail_when_created():
+    class NoJobs(SharedState):
+        def get(self, namespace, key, ttl):
+            return None
+
+    class NoContexts(Provider):
+        async def generate(self, model, prompt, context=None):
+            return {"text": ""}
+
+        async def stream(self, model, prompt, usage=None, context=None):
+            yield ""
+
+    with pytest.raises(TypeError, match="claim_jobs"):
+        NoJobs()
+    with pytest.raises(TypeError, match="create_context"):
+        NoContexts()
+    StubProvider()
+
+def test_block_never_shortens_a_longer_block(tmp_path):
+    state = SQLiteState(str(tmp_path / "state.db"))
+    state.block("gemini", 60)
+    state.block("gemini", 1)
+    assert state.take("gemini", rate=10, capacity=10, amount=1) > 30
+    state.close()
+
+def test_expired_cache_entries_are_deleted(tmp_path, monkeypatch):
+    state = SQLiteState(str(tmp_path / "state.db"))
+    state.set("cache", "old", "summary", ttl=60)
+    monkeypatch.setattr("shared_state.time.time", lambda: 10**10)
+    assert state.get("cache", "old", ttl=60) is None
+    assert state._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 0
+    state.close()
+
+def test_writes_sweep_expired_entries_of_their_namespace(tmp_path, monkeypatch):
+    state = SQLiteState(str(tmp_path / "state.db"))
+    state.set("rephrase", "stale", "text", ttl=60)
+    clock = [time.time() + 120]
+    monkeypatch.setattr("shared_state.time.time", lambda: clock[0])
+    for i in range(PURGE_EVERY - 1):
+        state.set("rephrase", f"fresh-{i}", "text", ttl=60)
+    keys = {row[0] for row in state._db.execute("SELECT key FROM entries")}
+    assert "stale" not in keys and len(keys) == PURGE_EVERY - 1
+    state.close()
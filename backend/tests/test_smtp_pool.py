@@ -0,0 +1,220 @@
+"""
+Tests for the pooled SMTP sessions
+"""
+import asyncio
+import smtplib
+import time
+from email.message import EmailMessage
+
+import pytest
+
+import smtp_pool
+from benchmarks.load_test import SMTPSink
+from smtp_pool import SMTPConnectionPool, is_transient
+
+class FakeSMTP:
+    """In-memory stand-in for ``smtplib.SMTP`` that records what the pool does with it"""
+
+    opened = []
+    # Failures scripted for every new session
+    drops = []
+
+    def __init__(self, host, port, timeout=None):
+        self.logins = 0
+        self.noops = 0
+        self.sent = 0
+        self.quit_called = False
+        self.alive = True
+        # Exceptions raised by the next sends, in order
+        self.failures = list(self.drops)
+        FakeSMTP.opened.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        self.logins += 1
+
+    def noop(self):
+        self.noops += 1
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        return 250, b"OK"
+
+    def send_message(self, msg, from_addr=None, to_addrs=None):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent += 1
+        return {}
+
+    def quit(self):
+        self.quit_called = True
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    FakeSMTP.opened = []
+    monkeypatch.setattr(smtp_pool.smtplib, "SMTP", FakeSMTP)
+    return FakeSMTP.opened
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable ``time.monotonic`` for idle ages"""
+    now = [1000.0]
+    monkeypatch.setattr(smtp_pool.time, "monotonic", lambda: now[0])
+    return now
+
+def make_pool(**kwargs) -> SMTPConnectionPool:
+    return SMTPConnectionPool("smtp.example.com", 587, "recapflow@example.com", "secret", **kwargs)
+
+def message(n: int = 0) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "recapflow@example.com"
+    msg["To"] = "team@example.com"
+    msg["Subject"] = f"Meeting Summary {n}"
+    msg.set_content("- Ship on Friday")
+    return msg
+
+def test_sequential_sends_reuse_one_session(fake_smtp):
+    pool = make_pool()
+
+    async def scenario():
+        for n in range(5):
+            await pool.send_message(message(n))
+        await pool.close()
+
+    asyncio.run(scenario())
+    assert len(fake_smtp) == 1
+    assert (fake_smtp[0].logins, fake_smtp[0].sent) == (1, 5)
+    assert fake_smtp[0].quit_called
+
+def test_concurrent_sends_stay_within_pool_size(fake_smtp, monkeypatch):
+    pool = make_pool(max_size=2)
+    in_flight = []
+    peak = [0]
+    send = FakeSMTP.send_message
+
+    def slow_send(self, msg, from_addr=None, to_addrs=None):
+        in_flight.append(self)
+        peak[0] = max(peak[0], len(in_flight))
+        try:
+            time.sleep(0.02)
+            return send(self, msg, from_addr, to_addrs)
+        finally:
+            in_flight.remove(self)
+
+    monkeypatch.setattr(FakeSMTP, "send_message", slow_send)
+
+    async def scenario():
+        await asyncio.gather(*(pool.send_message(message(n)) for n in range(8)))
+
+    asyncio.run(scenario())
+    assert peak[0] == 2
+    assert len(fake_smtp) == 2
+    assert sum(server.sent for server in fake_smtp) == 8
+
+def test_idle_sessions_are_checked_and_expired(fake_smtp, clock):
+    pool = make_pool(idle_timeout=60, health_check_after=5)
+
+    async def scenario():
+        await pool.send_message(message())
+        # Recently used: reused without a health check
+        clock[0] += 1
+        await pool.send_message(message())
+        assert (len(fake_smtp), fake_smtp[0].noops) == (1, 0)
+
+        # Idle for a while: NOOP first, and replaced when that fails
+        clock[0] += 10
+        fake_smtp[0].alive = False
+        await pool.send_message(message())
+        assert fake_smtp[0].noops == 1 and len(fake_smtp) == 2
+
+        # Idle past the timeout: closed without a health check
+        clock[0] += 120
+        await pool.send_message(message())
+        assert fake_smtp[1].noops == 0 and fake_smtp[1].quit_called
+        assert len(fake_smtp) == 3
+
+    asyncio.run(scenario())
+
+def test_dropped_session_is_reconnected_once(fake_smtp, monkeypatch):
+    pool = make_pool()
+
+    async def scenario():
+        await pool.send_message(message())
+        fake_smtp[0].failures = [smtplib.SMTPServerDisconnected("Connection unexpectedly closed")]
+        await pool.send_message(message())
+        assert len(fake_smtp) == 2 and fake_smtp[1].sent == 1
+
+        # Both the pooled session and its replacement drop: the error surfaces
+        fake_smtp[1].failures = [ConnectionResetError()]
+        monkeypatch.setattr(FakeSMTP, "drops", [ConnectionResetError()])
+        with pytest.raises(ConnectionResetError):
+            await pool.send_message(message())
+        # Neither dropped session goes back to the pool
+        assert len(fake_smtp) == 3 and not pool._idle
+
+    asyncio.run(scenario())
+
+def test_rejections_keep_the_session_other_errors_drop_it(fake_smtp):
+    pool = make_pool()
+
+    async def scenario():
+        await pool.send_message(message())
+        fake_smtp[0].failures = [smtplib.SMTPRecipientsRefused({"nobody@example.com": (550, b"No such user")})]
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            await pool.send_message(message())
+        await pool.send_message(message())
+        assert len(fake_smtp) == 1 and not fake_smtp[0].quit_called
+
+        fake_smtp[0].failures = [smtplib.SMTPResponseException(451, b"Try again later")]
+        with pytest.raises(smtplib.SMTPResponseException):
+            await pool.send_message(message())
+        assert fake_smtp[0].quit_called
+        await pool.send_message(message())
+        assert len(fake_smtp) == 2
+
+    asyncio.run(scenario())
+
+def test_closed_pool_refuses_sends(fake_smtp):
+    pool = make_pool()
+
+    async def scenario():
+        await pool.warm_up()
+        await pool.close()
+        with pytest.raises(RuntimeError):
+            await pool.send_message(message())
+
+    asyncio.run(scenario())
+    assert len(fake_smtp) == 1 and fake_smtp[0].quit_called and fake_smtp[0].sent == 0
+
+@pytest.mark.parametrize("error, transient", [
+    (smtplib.SMTPServerDisconnected("gone"), True),
+    (ConnectionRefusedError(), True),
+    (asyncio.TimeoutError(), True),
+    (smtplib.SMTPResponseException(421, b"Service not available"), True),
+    (smtplib.SMTPResponseException(554, b"Transaction failed"), False),
+    (smtplib.SMTPAuthenticationError(535, b"Bad credentials"), False),
+    (smtplib.SMTPRecipientsRefused({}), False),
+    (ValueError("bad address"), False),
+])
+def test_transient_errors(error, transient):
+    assert is_transient(error) is transient
+
+def test_messages_share_a_session_over_a_real_socket():
+    async def scenario():
+        sink = SMTPSink()
+        port = await sink.start()
+        pool = SMTPConnectionPool("127.0.0.1", port, "recapflow@example.com", "secret", starttls=False)
+        try:
+            for n in range(3):
+                assert await pool.send_message(message(n)) == {}
+            open_sessions = len(sink._sessions)
+        finally:
+            await pool.close()
+            await sink.stop()
+        return sink.messages, open_sessions
+
+    assert asyncio.run(scenario()) == (3, 1)
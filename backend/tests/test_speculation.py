@@ -0,0 +1,38 @@
+import asyncio
+
+from ai import RecapFlowAI
+from metrics import REPHRASE_PRECOMPUTE
+from speculation import RephrasePrecomputer
+
+SUMMARY = "- Launch moved to October\n- Sarah owns the budget review"
+
+def test_precomputes_every_style(ai):
+    async def scenario():
+        precomputer = RephrasePrecomputer(ai)
+        assert precomputer.schedule(SUMMARY) == len(precomputer.styles)
+        info = {}
+        text = await precomputer.get(SUMMARY, "casual", info)
+        await precomputer.stop()
+        return text, info
+
+    text, info = asyncio.run(scenario())
+    assert text is not None
+    assert info["precomputed"] is True
+
+def test_speculation_leaves_quota_headroom_to_users(monkeypatch):
+    # Four requests per minute, of which GEMINI_BACKGROUND_RESERVE keeps 0.8 for users
+    monkeypatch.setenv("GEMINI_RPM", "4")
+    ai = RecapFlowAI()
+    skipped = REPHRASE_PRECOMPUTE.value(outcome="skipped")
+
+    async def scenario():
+        for style in ("professional", "casual", "technical"):
+            await ai.rephrase_summary("- Earlier summary", style)
+        precomputer = RephrasePrecomputer(ai)
+        precomputer.schedule(SUMMARY)
+        assert await precomputer.get(SUMMARY, "casual") is None
+        # The last request slot is still there for a user
+        return await asyncio.wait_for(ai.rephrase_summary(SUMMARY, "casual"), 1)
+
+    assert asyncio.run(scenario())
+    assert REPHRASE_PRECOMPUTE.value(outcome="skipped") - skipped == 4
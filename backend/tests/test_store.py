@@ -0,0 +1,107 @@
+"""
+Tests for the content-addressed transcript store and the routes that accept its ids
+"""
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from shared_state import SQLiteState
+from store import TranscriptStore, is_valid_id, make_id
+
+TRANSCRIPT = "Sarah: Ship it on Friday.\nMike: Budget is fine.\nSarah: Thanks, everyone."
+
+@pytest.fixture
+def store_env(monkeypatch):
+    """Clear persistent store settings so each test picks its own backend"""
+    for name in ("TRANSCRIPT_STORE_DB", "TRANSCRIPT_STORE_DIR"):
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+def test_ids_are_content_addresses():
+    doc_id = make_id(TRANSCRIPT)
+    assert is_valid_id(doc_id)
+    assert doc_id == make_id(TRANSCRIPT) != make_id(TRANSCRIPT + " ")
+    assert not is_valid_id("../" + doc_id[3:])
+    assert not is_valid_id(doc_id.upper())
+
+def test_memory_tier_stores_each_text_once(store_env):
+    store_env.setenv("TRANSCRIPT_STORE_MAX_BYTES", "100")
+    store = TranscriptStore()
+    assert store.backend is None
+
+    async def scenario():
+        first = await store.put(TRANSCRIPT)
+        second = await store.put(TRANSCRIPT)
+        # Larger than the whole budget, and there is no backend to hold it
+        big = await store.put("x" * 101)
+        return first, second, big, await store.get(first), await store.get(big)
+
+    first, second, big, text, missing = asyncio.run(scenario())
+    assert first == second == make_id(TRANSCRIPT)
+    assert text == TRANSCRIPT
+    assert big == make_id("x" * 101) and missing is None
+    assert store.stats()["entries"] == 1
+
+def test_sqlite_backend_survives_restart(store_env, tmp_path):
+    store_env.setenv("TRANSCRIPT_STORE_DB", str(tmp_path / "store.db"))
+    store_env.setenv("TRANSCRIPT_STORE_MAX_BYTES", "100")
+    store = TranscriptStore()
+    doc_id = asyncio.run(store.put(TRANSCRIPT))
+    big_id = asyncio.run(store.put("x" * 101))
+    store.close()
+
+    restarted = TranscriptStore()
+    assert asyncio.run(restarted.get(doc_id)) == TRANSCRIPT
+    # Too big for memory, still served from the backend
+    assert asyncio.run(restarted.get(big_id)) == "x" * 101
+    assert restarted.stats()["entries"] == 1
+    restarted.close()
+
+def test_file_backend_survives_restart_and_expires(store_env, tmp_path):
+    store_env.setenv("TRANSCRIPT_STORE_DIR", str(tmp_path / "documents"))
+    store_env.setenv("TRANSCRIPT_STORE_TTL", "60")
+    doc_id = asyncio.run(TranscriptStore().put(TRANSCRIPT))
+    assert os.listdir(tmp_path / "documents") == [f"{doc_id}.txt"]
+
+    assert asyncio.run(TranscriptStore().get(doc_id)) == TRANSCRIPT
+    stale = time.time() - 120
+    os.utime(tmp_path / "documents" / f"{doc_id}.txt", (stale, stale))
+    assert asyncio.run(TranscriptStore().get(doc_id)) is None
+    # Ids that are not content addresses never reach the file system
+    assert asyncio.run(TranscriptStore().get("../" + doc_id)) is None
+
+def test_shared_backend_is_seen_by_every_worker(store_env, tmp_path):
+    state = SQLiteState(str(tmp_path / "state.db"))
+    store_env.setattr("store.get_shared_state", lambda: state)
+    doc_id = asyncio.run(TranscriptStore().put(TRANSCRIPT))
+    assert asyncio.run(TranscriptStore().get(doc_id)) == TRANSCRIPT
+    state.close()
+
+def test_routes_accept_ids_in_place_of_text():
+    with TestClient(main.app) as client:
+        upload = client.post(
+            "/upload", params={"echo": "false"}, files={"file": ("notes.txt", TRANSCRIPT.encode("utf-8"), "text/plain")}
+        ).json()
+        assert "transcript" not in upload
+        assert upload["transcript_id"] == make_id(TRANSCRIPT)
+
+        summarized = client.post("/summarize", json={"transcript_id": upload["transcript_id"]}).json()
+        assert summarized["transcript_id"] == upload["transcript_id"]
+        assert summarized["original_length"] == len(TRANSCRIPT)
+        assert summarized["summary_id"] == make_id(summarized["summary"])
+
+        rephrased = client.post("/rephrase", json={"summary_id": summarized["summary_id"], "style": "casual"}).json()
+        assert rephrased["success"] is True
+        assert rephrased["summary_id"] == make_id(rephrased["rephrased_summary"])
+
+def test_routes_reject_missing_or_unknown_ids():
+    with TestClient(main.app) as client:
+        assert client.post("/summarize", json={}).status_code == 422
+        assert client.post("/summarize", json={"transcript_id": "0" * 64}).status_code == 404
+        assert client.post("/rephrase", json={"summary_id": "0" * 64}).status_code == 404
+        response = client.post("/send-email", json={"recipients": ["a@example.com"], "summary_id": "0" * 64})
+        assert response.status_code == 404
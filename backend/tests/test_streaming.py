@@ -0,0 +1,95 @@
+"""
+Tests for the Server-Sent Events endpoints on the stub provider
+"""
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+import routes
+from providers import StubProvider
+from store import make_id
+
+TRANSCRIPT = "\n".join(f"Speaker {i % 3}: Item {i} ships on Friday." for i in range(20))
+
+def events(body: str) -> list:
+    """(event, data) pairs of an SSE response body"""
+    parsed = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        parsed.append((fields["event"], json.loads(fields["data"])))
+    return parsed
+
+class BrokenStreamProvider(StubProvider):
+    """Stub provider whose streams fail after the first piece"""
+
+    async def stream(self, model, prompt, usage=None, context=None):
+        yield "## Summary\n"
+        raise RuntimeError("connection reset")
+
+def test_summary_streams_chunks_then_metadata():
+    with TestClient(main.app) as client:
+        response = client.post("/summarize/stream", json={"transcript": TRANSCRIPT})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        stream = events(response.text)
+
+        names = [name for name, _ in stream]
+        assert names[-1] == "done" and set(names[:-1]) == {"chunk"} and len(names) > 2
+        summary = "".join(data["text"] for name, data in stream if name == "chunk")
+        done = stream[-1][1]
+        assert done["success"] is True
+        assert done["summary_length"] == len(summary)
+        assert done["summary_id"] == make_id(summary)
+        assert done["transcript_id"] == make_id(TRANSCRIPT)
+
+        # The streamed summary is stored, so it can be rephrased by id
+        response = client.post("/rephrase/stream", json={"summary_id": done["summary_id"], "style": "casual"})
+        stream = events(response.text)
+        rephrased = "".join(data["text"] for name, data in stream if name == "chunk")
+        assert stream[-1][0] == "done"
+        assert stream[-1][1]["style"] == "casual"
+        assert stream[-1][1]["original_length"] == len(summary)
+        assert stream[-1][1]["summary_id"] == make_id(rephrased)
+
+def test_oversized_transcript_is_rejected_before_the_stream(monkeypatch):
+    monkeypatch.setenv("ADMISSION_MAX_REQUEST_TOKENS", "100")
+    with TestClient(main.app) as client:
+        response = client.post("/summarize/stream", json={"transcript": TRANSCRIPT * 10})
+    # A plain JSON error, not an error event inside a 200 stream
+    assert response.status_code == 413
+    assert response.headers["content-type"].startswith("application/json")
+
+def test_spent_budget_is_rejected_before_the_stream(monkeypatch):
+    monkeypatch.setenv("CLIENT_TOKEN_BUDGET", "5000")
+    monkeypatch.setenv("CLIENT_ID_HEADER", "X-Client")
+    headers = {"X-Client": "team-stream"}
+    with TestClient(main.app) as client:
+        for _ in range(100):
+            response = client.post("/summarize/stream", json={"transcript": TRANSCRIPT}, headers=headers)
+            if response.status_code != 200:
+                break
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) > 0
+        # A summary as long as the transcript costs more than the leftover budget
+        response = client.post("/rephrase/stream", json={"summary": TRANSCRIPT, "style": "casual"}, headers=headers)
+        assert response.status_code == 429
+
+def test_unknown_summary_id_is_a_404():
+    with TestClient(main.app) as client:
+        response = client.post("/rephrase/stream", json={"summary_id": "0" * 64, "style": "casual"})
+    assert response.status_code == 404
+
+def test_failure_mid_stream_ends_with_an_error_event(monkeypatch):
+    with TestClient(main.app) as client:
+        monkeypatch.setattr(routes.ai_service, "provider", BrokenStreamProvider())
+        for path, body in (
+            ("/summarize/stream", {"transcript": TRANSCRIPT}),
+            ("/rephrase/stream", {"summary": "- Ship it on Friday", "style": "formal"}),
+        ):
+            response = client.post(path, json=body)
+            assert response.status_code == 200
+            stream = events(response.text)
+            assert stream[0] == ("chunk", {"text": "## Summary\n"})
+            assert stream[-1][0] == "error"
+            assert "connection reset" in stream[-1][1]["detail"]
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from transcript_formats import SubtitleParser, TranscriptDecodeError, read_upload
+
+def parse(text: str, piece: int = 7) -> str:
+    parser = SubtitleParser()
+    # Fed in small pieces, as uploads arrive
+    output = "".join(parser.feed(text[i:i + piece]) for i in range(0, len(text), piece))
+    return output + parser.close()
+
+def test_srt_drops_identifiers_and_timings():
+    srt = "1\n00:00:01,000 --> 00:00:03,000\nHello everyone.\n\n2\n00:00:03,500 --> 00:00:05,000\nLet's begin.\n"
+    assert parse(srt) == "Hello everyone.\nLet's begin.\n"
+
+def test_srt_keeps_caption_lines_starting_with_header_keywords():
+    srt = (
+        "1\n00:00:01,000 --> 00:00:03,000\nREGIONAL SALES ARE UP.\nWE HIT TARGET.\n\n"
+        "2\n00:00:03,500 --> 00:00:05,000\nNOTED, THANKS.\n\n"
+        "3\n00:00:05,500 --> 00:00:07,000\nSTYLE GUIDE IS DONE.\n"
+    )
+    assert parse(srt) == "REGIONAL SALES ARE UP.\nWE HIT TARGET.\nNOTED, THANKS.\nSTYLE GUIDE IS DONE.\n"
+
+def test_vtt_skips_header_and_metadata_blocks():
+    vtt = (
+        "WEBVTT - Weekly sync\nKind: captions\n\n"
+        "NOTE exported by the meeting tool\nsecond comment line\n\n"
+        "STYLE\n::cue { color: white }\n\n"
+        "00:01.000 --> 00:03.000\n<v Sarah Chen>NOTE the new deadline</v>\n\n"
+        "intro\n00:03.500 --> 00:05.000\n<v Mike>Sounds good.</v>\n"
+    )
+    assert parse(vtt) == "Sarah Chen: NOTE the new deadline\nMike: Sounds good.\n"
+
+class Upload:
+    """Minimal stand-in for FastAPI's UploadFile"""
+
+    def __init__(self, filename: str, data: bytes):
+        self.filename = filename
+        self._data = data
+
+    async def read(self, size: int) -> bytes:
+        chunk, self._data = self._data[:size], self._data[size:]
+        return chunk
+
+def test_truncated_multibyte_tail_is_a_decode_error():
+    data = "Zoë: the café opens at 9.\n".encode("utf-8") + "é".encode("utf-8")[:1]
+    with pytest.raises(TranscriptDecodeError):
+        asyncio.run(read_upload(Upload("notes.txt", data), max_bytes=1024, chunk_size=8))
+
+def test_upload_route_rejects_truncated_utf8_with_400():
+    data = "Zoë: the café opens at 9.\n".encode("utf-8") + "€".encode("utf-8")[:2]
+    with TestClient(main.app) as client:
+        response = client.post("/upload", files={"file": ("notes.txt", data, "text/plain")})
+    assert response.status_code == 400
@@ -0,0 +1,288 @@
+"""
+Transcript Formats Module for RecapFlow
+Streams uploaded transcripts through incremental decoding and format parsers
+"""
+
+import codecs
+import hashlib
+import io
+import json
+import logging
+import re
+import zipfile
+from typing import List, Optional
+from xml.etree import ElementTree
+
+# Configure logger
+logger = logging.getLogger("RecapFlow.Transcripts")
+
+SUPPORTED_EXTENSIONS = ('.txt', '.md', '.vtt', '.srt', '.docx', '.json')
+
+# "00:01:02,500 --> 00:01:05,000" (SRT) or "01:02.500 --> 01:05.000 align:start" (WebVTT)
+CUE_TIMING_PATTERN = re.compile(r'^\s*(?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3}\s+-->\s+(?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3}')
+# WebVTT header and metadata blocks: the keyword alone or followed by a space, at the start of a block
+VTT_HEADER_PATTERN = re.compile(r'^(?:WEBVTT|NOTE|STYLE|REGION)(?:[ \t]|$)')
+VTT_VOICE_PATTERN = re.compile(r'<v(?:\.[^\s>]+)?\s+([^>]+)>')
+MARKUP_TAG_PATTERN = re.compile(r'</?[^>]+>')
+
+# Keys commonly used by meeting tools' JSON exports
+JSON_TEXT_KEYS = ('text', 'content', 'transcript', 'utterance', 'sentence')
+JSON_SPEAKER_KEYS = ('speaker', 'speaker_name', 'speakerName', 'name', 'participant', 'user')
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+
+class TranscriptDecodeError(Exception):
+    """Raised when an upload cannot be decoded or parsed"""
+
+class TextParser:
+    """Pass-through parser for plain text and Markdown"""
+
+    def feed(self, text: str) -> str:
+        return text
+
+    def close(self) -> str:
+        return ""
+
+class LineParser(TextParser):
+    """
+    Incremental line-based parser
+
+    ``feed`` accepts decoded text in arbitrary pieces and returns the cleaned
+    text for every complete line seen so far; ``close`` flushes the rest.
+    """
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, text: str) -> str:
+        lines = (self._pending + text).split('\n')
+        self._pending = lines.pop()
+        return ''.join(self._emit(line.rstrip('\r')) for line in lines)
+
+    def close(self) -> str:
+        pending, self._pending = self._pending, ""
+        return self._emit(pending.rstrip('\r')) if pending else ""
+
+    def _emit(self, line: str) -> str:
+        return line + '\n'
+
+class SubtitleParser(LineParser):
+    """SRT/WebVTT parser that drops cue identifiers, timings and markup"""
+
+    def __init__(self):
+        super().__init__()
+        self._skip_block = False
+        self._last_line = None
+        self._block_started = False
+        # First line of a block, held back until we know it is not a cue identifier
+        self._held = None
+
+    def close(self) -> str:
+        return super().close() + self._release()
+
+    def _release(self) -> str:
+        held, self._held = self._held, None
+        return self._text(held) if held is not None else ""
+
+    def _emit(self, line: str) -> str:
+        stripped = line.strip()
+        if not stripped:
+            self._skip_block = False
+            released = self._release()
+            self._block_started = False
+            return released
+        if self._skip_block:
+            return ""
+        # Only a block's first line can open a header or metadata block; later
+        # lines are caption text, even "NOTED, THANKS." or "REGIONAL SALES ARE UP."
+        if not self._block_started and VTT_HEADER_PATTERN.match(stripped):
+            self._skip_block = True
+            return ""
+        if CUE_TIMING_PATTERN.match(stripped):
+            # Whatever preceded the timing line in this block was its identifier
+            self._held = None
+            self._block_started = True
+            return ""
+        if not self._block_started:
+            self._held = stripped
+            self._block_started = True
+            return ""
+        return self._release() + self._text(stripped)
+
+    def _text(self, line: str) -> str:
+        text = VTT_VOICE_PATTERN.sub(r'\1: ', line)
+        text = MARKUP_TAG_PATTERN.sub('', text).strip()
+        # Rolling captions often repeat the previous cue's text verbatim
+        if not text or text == self._last_line:
+            return ""
+        self._last_line = text
+        return text + '\n'
+
+def parser_for(filename: str) -> Optional[TextParser]:
+    """Return a streaming parser for text formats, or None for whole-file formats"""
+    name = filename.lower()
+    if name.endswith(('.srt', '.vtt')):
+        return SubtitleParser()
+    if name.endswith(('.txt', '.md')):
+        return TextParser()
+    return None
+
+def detect_encoding(head: bytes) -> str:
+    """Pick a text encoding from the first bytes of an upload"""
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        # Trailing bytes may be a multi-byte character cut off by the chunk boundary
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    # Statistical detection guesses wildly on very little text
+    if len(head) >= 256:
+        try:
+            from charset_normalizer import from_bytes
+            best = from_bytes(head).best()
+            if best is not None:
+                return best.encoding
+        except ImportError:
+            pass
+    return 'cp1252'
+
+def extract_docx_text(data: bytes) -> str:
+    """Return the paragraphs of a .docx document as plain text"""
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            with archive.open('word/document.xml') as document:
+                paragraphs = []
+                current = []
+                for event, element in ElementTree.iterparse(document, events=('end',)):
+                    if element.tag == f'{WORD_NAMESPACE}t' and element.text:
+                        current.append(element.text)
+                    elif element.tag == f'{WORD_NAMESPACE}p':
+                        if current:
+                            paragraphs.append(''.join(current))
+                        current = []
+                        element.clear()
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise TranscriptDecodeError(f"Invalid .docx file: {e}")
+    return '\n'.join(paragraphs) + '\n'
+
+def _json_entries(node) -> List[str]:
+    """Find utterance-like objects anywhere in a JSON export"""
+    if isinstance(node, list):
+        lines = []
+        for item in node:
+            lines.extend(_json_entries(item))
+        return lines
+    if isinstance(node, dict):
+        text = next((node[key] for key in JSON_TEXT_KEYS if isinstance(node.get(key), str)), None)
+        if text is not None:
+            speaker = next((node[key] for key in JSON_SPEAKER_KEYS if isinstance(node.get(key), str)), None)
+            return [f"{speaker}: {text.strip()}" if speaker else text.strip()]
+        lines = []
+        for value in node.values():
+            if isinstance(value, (list, dict)):
+                lines.extend(_json_entries(value))
+        return lines
+    return []
+
+def extract_json_text(text: str) -> str:
+    """Return speaker-labelled lines from a JSON transcript export"""
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise TranscriptDecodeError(f"Invalid JSON transcript: {e}")
+    lines = [line for line in _json_entries(data) if line]
+    return '\n'.join(lines) + '\n' if lines else ''
+
+async def read_upload(file, max_bytes: int, chunk_size: int = 64 * 1024) -> dict:
+    """
+    Stream an uploaded transcript into plain text
+
+    The upload is read in ``chunk_size`` pieces, decoded incrementally and
+    run through a format parser as it arrives, while the text length and a
+    SHA-256 of the resulting text are computed on the fly. Only .docx and
+    .json, which need the whole document to parse, are buffered.
+
+    Args:
+        file: FastAPI ``UploadFile``
+        max_bytes (int): Upload size limit
+        chunk_size (int): Bytes read per chunk
+
+    Returns:
+        dict: ``text``, ``sha256``, ``length``, ``bytes``, ``encoding`` and ``format``
+
+    Raises:
+        UploadTooLarge: If the upload exceeds ``max_bytes``
+        TranscriptDecodeError: If the upload cannot be decoded or parsed
+    """
+    filename = file.filename.lower()
+    file_format = filename.rsplit('.', 1)[-1]
+    parser = parser_for(filename)
+    digest = hashlib.sha256()
+    pieces = []
+    buffered = []
+    decoder = None
+    encoding = None
+    total_bytes = 0
+    length = 0
+
+    def emit(text: str) -> None:
+        nonlocal length
+        if text:
+            pieces.append(text)
+            digest.update(text.encode('utf-8'))
+            length += len(text)
+
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        total_bytes += len(chunk)
+        if total_bytes > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit")
+
+        if file_format == 'docx':
+            buffered.append(chunk)
+            continue
+        if decoder is None:
+            encoding = detect_encoding(chunk)
+            decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            text = decoder.decode(chunk)
+        except UnicodeDecodeError as e:
+            raise TranscriptDecodeError(f"File is not valid {encoding} text: {e}")
+        if parser is not None:
+            emit(parser.feed(text))
+        else:
+            buffered.append(text)
+
+    if file_format == 'docx':
+        emit(extract_docx_text(b''.join(buffered)))
+        encoding = 'utf-8'
+    else:
+        try:
+            tail = decoder.decode(b'', final=True) if decoder else ''
+        except UnicodeDecodeError as e:
+            # The upload ended part-way through a multi-byte character
+            raise TranscriptDecodeError(f"File is not valid {encoding} text: {e}")
+        if parser is not None:
+            emit(parser.feed(tail))
+            emit(parser.close())
+        else:
+            emit(extract_json_text(''.join(buffered) + tail))
+
+    logger.debug("Parsed %s upload - %d bytes in, %d chars out, encoding: %s", file_format, total_bytes, length, encoding)
+    return {
+        "text": ''.join(pieces),
+        "sha256": digest.hexdigest(),
+        "length": length,
+        "bytes": total_bytes,
+        "encoding": encoding,
+        "format": file_format,
+    }
@@ -24,6 +24,10 @@ import { colors } from '@/utils/colors';
 import { markdownToPlainText, plainTextToMarkdown } from '@/utils/markdown';
 import Config from '@/config';
 
+// How often and how long to follow a queued email job
+const EMAIL_JOB_POLL_MS = 1500;
+const EMAIL_JOB_TIMEOUT_MS = 3 * 60 * 1000;
+
 // Alert Message Component
 const AlertMessage = ({ type, message, onClose }: { 
   type: 'error' | 'success'; 
@@ -335,17 +339,51 @@ export default function FlowPage() {
         throw new Error(`Email sending failed: ${response.statusText}`);
       }
       
-      // Success toast
-      toast.success(`📨 Email sent successfully to ${emailRecipients.length} recipient${emailRecipients.length > 1 ? 's' : ''}!`, {
+      // The server only queues the email; follow the job until it is delivered
+      const { job_id: jobId } = await response.json();
+      toast.loading('📬 Email queued, waiting for delivery...', {
         id: loadingToast,
         style: {
           borderRadius: '10px',
-          background: '#10B981',
+          background: colors.darkPurple,
           color: '#fff',
         },
-        duration: 4000,
       });
-      setSuccess(`Email sent successfully to ${emailRecipients.length} recipients!`);
+      const job = await waitForEmailJob(jobId);
+      // Recipients the server refused or could not be sent to, for single and fan-out jobs alike
+      const failed = Object.entries(job.report || {})
+        .filter(([, entry]: [string, any]) => entry.status !== 'sent')
+        .map(([recipient]) => recipient);
+      
+      if (job.status === 'failed') {
+        throw new Error(job.error || (failed.length ? `refused by the mail server for ${failed.join(', ')}` : 'no recipient could be reached'));
+      }
+      
+      const recipientCount = emailRecipients.length;
+      if (job.status === 'partial') {
+        toast.error(`⚠️ Email sent, but ${failed.length} of ${recipientCount} recipients could not be reached`, {
+          id: loadingToast,
+          style: {
+            borderRadius: '10px',
+            background: '#F59E0B',
+            color: '#fff',
+          },
+          duration: 6000,
+        });
+        setError(`Email could not be delivered to: ${failed.join(', ')}`);
+      } else {
+        // Success toast
+        toast.success(`📨 Email sent successfully to ${recipientCount} recipient${recipientCount > 1 ? 's' : ''}!`, {
+          id: loadingToast,
+          style: {
+            borderRadius: '10px',
+            background: '#10B981',
+            color: '#fff',
+          },
+          duration: 4000,
+        });
+        setSuccess(`Email sent successfully to ${recipientCount} recipients!`);
+      }
       
       // Scroll to top to show success message
       scrollToTop();
@@ -366,6 +404,23 @@ export default function FlowPage() {
     }
   };
 
+  // Poll a queued email job until it is sent, partially sent or failed
+  const waitForEmailJob = async (jobId: string) => {
+    const deadline = Date.now() + EMAIL_JOB_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+      await new Promise((resolve) => setTimeout(resolve, EMAIL_JOB_POLL_MS));
+      const response = await fetch(`${API_BASE}/send-email/${jobId}`);
+      if (!response.ok) {
+        throw new Error(`Could not check email status: ${response.statusText}`);
+      }
+      const job = await response.json();
+      if (['sent', 'partial', 'failed'].includes(job.status)) {
+        return job;
+      }
+    }
+    throw new Error('Email is still queued; delivery is taking longer than expected');
+  };
+
   // Utility function to scroll to top smoothly
   const scrollToTop = () => {
     window.scrollTo({
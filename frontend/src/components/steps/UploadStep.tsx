@@ -152,7 +152,7 @@ Deal. Meeting adjourned 🚀`);
             <p 
               className="text-sm text-gray-500 mt-1"
             >
-              Supports .txt, .md, and .docx files
+              Supports .txt, .md, .vtt, .srt, .docx and .json files
             </p>
           </div>
           
@@ -160,7 +160,7 @@ Deal. Meeting adjourned 🚀`);
             <label className="cursor-pointer">
               <input
                 type="file"
-                accept=".txt,.md,.docx"
+                accept=".txt,.md,.vtt,.srt,.docx,.json"
                 onChange={handleFileSelect}
                 className="hidden"
                 disabled={loading}